@@ -36,10 +36,10 @@ locales = list({voice["ShortName"] for voice in voices_data})
 
 
 @lru_cache(maxsize=None)
-def import_voice_converter():
+def import_voice_converter(backend: str = "torch"):
     from rvc.infer.infer import VoiceConverter
 
-    return VoiceConverter()
+    return VoiceConverter(backend)
 
 
 @lru_cache(maxsize=1)
@@ -110,6 +110,13 @@ def run_infer_script(
     delay_feedback: float = 0.0,
     delay_mix: float = 0.5,
     sid: int = 0,
+    batch_size: int = 1,
+    f0_autotune_key: str = None,
+    f0_autotune_scale: str = "chromatic",
+    output_cache: bool = False,
+    progressive: bool = False,
+    analysis_cache: bool = False,
+    backend: str = "torch",
 ):
     kwargs = {
         "audio_input_path": input_path,
@@ -173,8 +180,17 @@ def run_infer_script(
         "delay_feedback": delay_feedback,
         "delay_mix": delay_mix,
         "sid": sid,
+        "batch_size": batch_size,
+        "f0_autotune_key": f0_autotune_key,
+        "f0_autotune_scale": f0_autotune_scale,
+        "output_cache": output_cache,
+        "progressive": progressive,
     }
-    infer_pipeline = import_voice_converter()
+    infer_pipeline = import_voice_converter(backend)
+    if analysis_cache:
+        from rvc.infer.analysis_cache import enable_analysis_cache
+
+        enable_analysis_cache()
     infer_pipeline.convert_audio(
         **kwargs,
     )
@@ -244,6 +260,14 @@ def run_batch_infer_script(
     delay_feedback: float = 0.0,
     delay_mix: float = 0.5,
     sid: int = 0,
+    batch_size: int = 1,
+    f0_autotune_key: str = None,
+    f0_autotune_scale: str = "chromatic",
+    num_workers: int = 1,
+    output_cache: bool = False,
+    progressive: bool = False,
+    analysis_cache: bool = False,
+    backend: str = "torch",
 ):
     kwargs = {
         "audio_input_paths": input_folder,
@@ -307,8 +331,18 @@ def run_batch_infer_script(
         "delay_feedback": delay_feedback,
         "delay_mix": delay_mix,
         "sid": sid,
+        "batch_size": batch_size,
+        "f0_autotune_key": f0_autotune_key,
+        "f0_autotune_scale": f0_autotune_scale,
+        "num_workers": num_workers,
+        "output_cache": output_cache,
+        "progressive": progressive,
     }
-    infer_pipeline = import_voice_converter()
+    infer_pipeline = import_voice_converter(backend)
+    if analysis_cache:
+        from rvc.infer.analysis_cache import enable_analysis_cache
+
+        enable_analysis_cache()
     infer_pipeline.convert_audio_batch(
         **kwargs,
     )
@@ -508,6 +542,8 @@ def run_train_script(
     d_pretrained_path: str = None,
     vocoder: str = "HiFi-GAN",
     checkpointing: bool = False,
+    index_type: str = "Auto",
+    index_per_speaker: bool = False,
 ):
 
     if pretrained == True:
@@ -551,30 +587,117 @@ def run_train_script(
         ),
     ]
     subprocess.run(command)
-    run_index_script(model_name, index_algorithm)
+    run_index_script(model_name, index_algorithm, index_type, index_per_speaker)
     return f"Model {model_name} trained successfully."
 
 
 # Index
-def run_index_script(model_name: str, index_algorithm: str):
+def run_index_script(
+    model_name: str,
+    index_algorithm: str,
+    index_type: str = "Auto",
+    index_per_speaker: bool = False,
+):
     index_script_path = os.path.join("rvc", "train", "process", "extract_index.py")
     command = [
         python,
         index_script_path,
         os.path.join(logs_path, model_name),
         index_algorithm,
+        index_type,
+        str(index_per_speaker),
     ]
 
     subprocess.run(command)
     return f"Index file for {model_name} generated successfully."
 
 
+# Index benchmark
+def run_index_benchmark_script(
+    model_name: str = None,
+    configs: list = None,
+    max_vectors: int = 200000,
+    queries: int = 10000,
+    synthetic_dim: int = 768,
+    output_path: str = None,
+):
+    from rvc.lib.tools.index_benchmark import benchmark_indexes
+
+    feature_dir = index_path = None
+    if model_name:
+        feature_dir = os.path.join(logs_path, model_name, "extracted")
+        index_path = os.path.join(logs_path, model_name, f"{model_name}.index")
+        output_path = output_path or os.path.join(
+            logs_path, model_name, "index_benchmark.json"
+        )
+    return benchmark_indexes(
+        feature_dir,
+        index_path,
+        configs,
+        max_vectors,
+        queries,
+        synthetic_dim,
+        output_path=output_path,
+    )
+
+
 # Model information
 def run_model_information_script(pth_path: str):
     print(model_information(pth_path))
     return model_information(pth_path)
 
 
+# Convert model
+def run_convert_model_script(input_path: str, output_path: str = None):
+    from rvc.lib.model_format import convert_model
+
+    output_path = convert_model(input_path, output_path)
+    message = f"Model converted to '{output_path}'."
+    print(message)
+    return message
+
+
+# Optimize model
+def run_optimize_model_script(pth_path: str):
+    from rvc.infer.materialize import optimize_model
+
+    message = optimize_model(pth_path)
+    print(message)
+    return message
+
+
+# Export ONNX
+def run_export_onnx_script(
+    pth_path: str,
+    embedder_model: str = "contentvec",
+    embedder_model_custom: str = None,
+    compare: bool = False,
+):
+    from rvc.infer.onnx_backend import export_onnx, compare_backends
+
+    output_paths = export_onnx(pth_path, embedder_model, embedder_model_custom)
+    message = f"Exported ONNX models to {', '.join(output_paths)}."
+    print(message)
+    if compare:
+        compare_backends(pth_path, embedder_model, embedder_model_custom)
+    return message
+
+
+# Quantize model
+def run_quantize_model_script(
+    pth_path: str,
+    embedder_model: str = "contentvec",
+    embedder_model_custom: str = None,
+    reference_path: str = None,
+):
+    from rvc.infer.quantize import quantize_model
+
+    report = quantize_model(
+        pth_path, embedder_model, embedder_model_custom, reference_path
+    )
+    return report
+
+
 # Model blender
 def run_model_blender_script(
     model_name: str, pth_path_1: str, pth_path_2: str, ratio: float
@@ -620,6 +743,33 @@ def run_audio_analyzer_script(
     return audio_info, plot_path
 
 
+# Serve
+def run_serve_script(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_queue_size: int = 16,
+    max_batch_jobs: int = 4,
+    batch_timeout: float = 0.05,
+    batch_size: int = 8,
+    backend: str = "torch",
+):
+    from rvc.infer.server import InferenceServer
+
+    server = InferenceServer(
+        host=host,
+        port=port,
+        max_queue_size=max_queue_size,
+        max_batch_jobs=max_batch_jobs,
+        batch_timeout=batch_timeout,
+        batch_size=batch_size,
+        backend=backend,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Inference server stopped.")
+
+
 # Parse arguments
 def parse_arguments():
     parser = argparse.ArgumentParser(
@@ -1152,6 +1302,73 @@ def parse_arguments():
         default=0.5,
         required=False,
     )
+    batch_size_description = "Number of audio chunks converted together in one forward pass. Higher values improve throughput on multi-core CPUs at the cost of memory."
+    infer_parser.add_argument(
+        "--batch_size",
+        type=int,
+        help=batch_size_description,
+        default=1,
+        required=False,
+    )
+    f0_autotune_key_description = "Root note of the scale the autotune snaps to (for example A or Bb). Ignored for the chromatic scale."
+    infer_parser.add_argument(
+        "--f0_autotune_key",
+        type=str,
+        help=f0_autotune_key_description,
+        default=None,
+        required=False,
+    )
+    f0_autotune_scale_description = (
+        "Scale the autotune snaps to. The chromatic scale allows every note."
+    )
+    infer_parser.add_argument(
+        "--f0_autotune_scale",
+        type=str,
+        help=f0_autotune_scale_description,
+        choices=[
+            "chromatic",
+            "major",
+            "minor",
+            "harmonic_minor",
+            "pentatonic_major",
+            "pentatonic_minor",
+            "blues",
+        ],
+        default="chromatic",
+        required=False,
+    )
+    output_cache_description = "Reuse the result of an earlier conversion of the same audio with the same model, index and settings instead of converting again."
+    infer_parser.add_argument(
+        "--output_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=output_cache_description,
+        default=False,
+    )
+    progressive_description = "Decode, convert and write long audio chunk by chunk, so memory stays bounded by the chunk size and the output file can be played while it is being rendered."
+    infer_parser.add_argument(
+        "--progressive",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=progressive_description,
+        default=False,
+    )
+    analysis_cache_description = "Keep the decoded audio, raw F0 and embedder features of inputs in memory and under assets/analysis_cache, so rendering the same input again with other settings skips the analysis."
+    infer_parser.add_argument(
+        "--analysis_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=analysis_cache_description,
+        default=False,
+    )
+    backend_description = "Inference backend of the embedder, RMVPE and the voice model. 'onnx' runs their ONNX exports on ONNX Runtime's CPU execution provider, exporting them on first use. 'int8' runs int8-quantized embedder and voice models on the CPU, quantizing them on first use. 'compile' runs the embedder encoder and the voice model as graphs compiled by torch.compile's inductor backend for a few input lengths, compiling them all on first use."
+    infer_parser.add_argument(
+        "--backend",
+        type=str,
+        help=backend_description,
+        choices=["torch", "onnx", "int8", "compile"],
+        default="torch",
+    )
 
     # Parser for 'batch_infer' mode
     batch_infer_parser = subparsers.add_parser(
@@ -1615,6 +1832,71 @@ def parse_arguments():
         default=0.5,
         required=False,
     )
+    batch_infer_parser.add_argument(
+        "--batch_size",
+        type=int,
+        help=batch_size_description,
+        default=1,
+        required=False,
+    )
+    batch_infer_parser.add_argument(
+        "--f0_autotune_key",
+        type=str,
+        help=f0_autotune_key_description,
+        default=None,
+        required=False,
+    )
+    batch_infer_parser.add_argument(
+        "--f0_autotune_scale",
+        type=str,
+        help=f0_autotune_scale_description,
+        choices=[
+            "chromatic",
+            "major",
+            "minor",
+            "harmonic_minor",
+            "pentatonic_major",
+            "pentatonic_minor",
+            "blues",
+        ],
+        default="chromatic",
+        required=False,
+    )
+    batch_infer_parser.add_argument(
+        "--num_workers",
+        type=int,
+        help="Number of worker processes converting files in parallel, each with its own loaded model and an equal share of the CPU threads.",
+        default=1,
+        required=False,
+    )
+    batch_infer_parser.add_argument(
+        "--output_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=output_cache_description,
+        default=False,
+    )
+    batch_infer_parser.add_argument(
+        "--progressive",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=progressive_description,
+        default=False,
+    )
+    batch_infer_parser.add_argument(
+        "--analysis_cache",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=analysis_cache_description,
+        default=False,
+    )
+    batch_infer_parser.add_argument(
+        "--backend",
+        type=str,
+        help=backend_description,
+        choices=["torch", "onnx", "int8", "compile"],
+        default="torch",
+    )
 
     # Parser for 'tts' mode
     tts_parser = subparsers.add_parser("tts", help="Run TTS inference")
@@ -1921,6 +2203,8 @@ def parse_arguments():
     )
 
     # Parser for 'train' mode
+    index_per_speaker_description = "Also build one index per speaker of a multi-speaker dataset. Inference then searches only the index of the selected speaker ID."
+    index_type_description = "Type of the FAISS index. 'Auto' uses exact search while it is fast enough, then IVF-Flat, and OPQ-IVF-PQ (compressed vectors) for very large datasets. IVF and HNSW search parameters are sized for the target search latency and stored in the index."
     train_parser = subparsers.add_parser("train", help="Train an RVC model.")
     train_parser.add_argument(
         "--model_name", type=str, help="Name of the model to be trained.", required=True
@@ -2052,10 +2336,26 @@ def parse_arguments():
         default="Auto",
         required=False,
     )
+    train_parser.add_argument(
+        "--index_type",
+        type=str,
+        choices=["Auto", "Flat", "IVF-Flat", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"],
+        help=index_type_description,
+        default="Auto",
+        required=False,
+    )
+    train_parser.add_argument(
+        "--index_per_speaker",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=index_per_speaker_description,
+        default=False,
+    )
 
     # Parser for 'index' mode
     index_parser = subparsers.add_parser(
-        "index", help="Generate an index file for an RVC model."
+        "index",
+        help="Generate an index file for an RVC model, or add newly extracted features to an existing one.",
     )
     index_parser.add_argument(
         "--model_name", type=str, help="Name of the model.", required=True
@@ -2068,6 +2368,64 @@ def parse_arguments():
         default="Auto",
         required=False,
     )
+    index_parser.add_argument(
+        "--index_type",
+        type=str,
+        choices=["Auto", "Flat", "IVF-Flat", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"],
+        help=index_type_description,
+        default="Auto",
+        required=False,
+    )
+    index_parser.add_argument(
+        "--index_per_speaker",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help=index_per_speaker_description,
+        default=False,
+    )
+
+    # Parser for 'index_benchmark' mode
+    index_benchmark_parser = subparsers.add_parser(
+        "index_benchmark",
+        help="Compare FAISS index configurations by build time, file size, memory, search latency and recall on the CPU.",
+    )
+    index_benchmark_parser.add_argument(
+        "--model_name",
+        type=str,
+        help="Name of the model whose extracted features are used; its existing index is measured too. Synthetic features are used without it.",
+        default=None,
+    )
+    index_benchmark_parser.add_argument(
+        "--configs",
+        type=str,
+        nargs="+",
+        help="Candidates as '<index type>[:<param>=<value>,...]', for example 'IVF-Flat:nprobe=8' or 'HNSW:efSearch=64'.",
+        default=None,
+    )
+    index_benchmark_parser.add_argument(
+        "--max_vectors",
+        type=int,
+        help="Largest number of indexed vectors.",
+        default=200000,
+    )
+    index_benchmark_parser.add_argument(
+        "--queries",
+        type=int,
+        help="Number of held-out query vectors.",
+        default=10000,
+    )
+    index_benchmark_parser.add_argument(
+        "--synthetic_dim",
+        type=int,
+        help="Dimension of synthetic features.",
+        default=768,
+    )
+    index_benchmark_parser.add_argument(
+        "--output_path",
+        type=str,
+        help="Path of the JSON report, defaults to logs/<model_name>/index_benchmark.json.",
+        default=None,
+    )
 
     # Parser for 'model_information' mode
     model_information_parser = subparsers.add_parser(
@@ -2077,6 +2435,102 @@ def parse_arguments():
         "--pth_path", type=str, help="Path to the .pth model file.", required=True
     )
 
+    # Parser for 'convert_model' mode
+    convert_model_parser = subparsers.add_parser(
+        "convert_model",
+        help="Convert a .pth model or an embedder folder to the fast-loading .safetensors format.",
+    )
+    convert_model_parser.add_argument(
+        "--input_path",
+        type=str,
+        help="Path to the .pth model file or the embedder folder.",
+        required=True,
+    )
+    convert_model_parser.add_argument(
+        "--output_path",
+        type=str,
+        help="Path of the converted model file. Defaults to the input path with the .safetensors extension.",
+        default=None,
+    )
+
+    # Parser for 'optimize_model' mode
+    optimize_model_parser = subparsers.add_parser(
+        "optimize_model",
+        help="Fold weight norm into a trained model and store it next to the .pth for faster loading and inference.",
+    )
+    optimize_model_parser.add_argument(
+        "--pth_path", type=str, help="Path to the .pth model file.", required=True
+    )
+
+    # Parser for 'export_onnx' mode
+    export_onnx_parser = subparsers.add_parser(
+        "export_onnx",
+        help="Export a trained model, its embedder and RMVPE to ONNX for the 'onnx' inference backend.",
+    )
+    export_onnx_parser.add_argument(
+        "--pth_path", type=str, help="Path to the .pth model file.", required=True
+    )
+    export_onnx_parser.add_argument(
+        "--embedder_model",
+        type=str,
+        help=embedder_model_description,
+        choices=[
+            "contentvec",
+            "chinese-hubert-base",
+            "japanese-hubert-base",
+            "korean-hubert-base",
+            "custom",
+        ],
+        default="contentvec",
+    )
+    export_onnx_parser.add_argument(
+        "--embedder_model_custom",
+        type=str,
+        help=embedder_model_custom_description,
+        default=None,
+    )
+    export_onnx_parser.add_argument(
+        "--compare",
+        type=lambda x: bool(strtobool(x)),
+        choices=[True, False],
+        help="Check the exports against PyTorch and print the real-time factor of both backends.",
+        default=False,
+    )
+
+    # Parser for 'quantize_model' mode
+    quantize_model_parser = subparsers.add_parser(
+        "quantize_model",
+        help="Quantize a trained model and its embedder to int8 for the 'int8' inference backend and report the quality difference.",
+    )
+    quantize_model_parser.add_argument(
+        "--pth_path", type=str, help="Path to the .pth model file.", required=True
+    )
+    quantize_model_parser.add_argument(
+        "--embedder_model",
+        type=str,
+        help=embedder_model_description,
+        choices=[
+            "contentvec",
+            "chinese-hubert-base",
+            "japanese-hubert-base",
+            "korean-hubert-base",
+            "custom",
+        ],
+        default="contentvec",
+    )
+    quantize_model_parser.add_argument(
+        "--embedder_model_custom",
+        type=str,
+        help=embedder_model_custom_description,
+        default=None,
+    )
+    quantize_model_parser.add_argument(
+        "--reference_path",
+        type=str,
+        help="Audio clip used for calibration and the quality report. Defaults to logs/reference/ref*.wav.",
+        default=None,
+    )
+
     # Parser for 'model_blender' mode
     model_blender_parser = subparsers.add_parser(
         "model_blender", help="Fuse two RVC models together."
@@ -2151,6 +2605,46 @@ def parse_arguments():
         "--input_path", type=str, help="Path to the input audio file.", required=True
     )
 
+    # Parser for 'serve' mode
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a local HTTP inference server that keeps models loaded."
+    )
+    serve_parser.add_argument(
+        "--host", type=str, help="Address to bind.", default="127.0.0.1"
+    )
+    serve_parser.add_argument("--port", type=int, help="Port to bind.", default=8000)
+    serve_parser.add_argument(
+        "--max_queue_size",
+        type=int,
+        help="Maximum number of queued jobs before new requests are rejected with 503.",
+        default=16,
+    )
+    serve_parser.add_argument(
+        "--max_batch_jobs",
+        type=int,
+        help="Maximum number of requests for the same model converted together.",
+        default=4,
+    )
+    serve_parser.add_argument(
+        "--batch_timeout",
+        type=float,
+        help="Seconds to wait for more requests for the same model before converting.",
+        default=0.05,
+    )
+    serve_parser.add_argument(
+        "--batch_size",
+        type=int,
+        help="Number of audio chunks converted together in one forward pass.",
+        default=8,
+    )
+    serve_parser.add_argument(
+        "--backend",
+        type=str,
+        help=backend_description,
+        choices=["torch", "onnx", "int8", "compile"],
+        default="torch",
+    )
+
     return parser.parse_args()
 
 
@@ -2223,6 +2717,13 @@ def main():
                 delay_seconds=args.delay_seconds,
                 delay_feedback=args.delay_feedback,
                 delay_mix=args.delay_mix,
+                batch_size=args.batch_size,
+                f0_autotune_key=args.f0_autotune_key,
+                f0_autotune_scale=args.f0_autotune_scale,
+                output_cache=args.output_cache,
+                progressive=args.progressive,
+                analysis_cache=args.analysis_cache,
+                backend=args.backend,
             )
         elif args.mode == "batch_infer":
             run_batch_infer_script(
@@ -2285,6 +2786,14 @@ def main():
                 delay_seconds=args.delay_seconds,
                 delay_feedback=args.delay_feedback,
                 delay_mix=args.delay_mix,
+                batch_size=args.batch_size,
+                f0_autotune_key=args.f0_autotune_key,
+                f0_autotune_scale=args.f0_autotune_scale,
+                num_workers=args.num_workers,
+                output_cache=args.output_cache,
+                progressive=args.progressive,
+                analysis_cache=args.analysis_cache,
+                backend=args.backend,
             )
         elif args.mode == "tts":
             run_tts_script(
@@ -2353,6 +2862,8 @@ def main():
                 custom_pretrained=args.custom_pretrained,
                 cleanup=args.cleanup,
                 index_algorithm=args.index_algorithm,
+                index_type=args.index_type,
+                index_per_speaker=args.index_per_speaker,
                 cache_data_in_gpu=args.cache_data_in_gpu,
                 g_pretrained_path=args.g_pretrained_path,
                 d_pretrained_path=args.d_pretrained_path,
@@ -2363,6 +2874,40 @@ def main():
             run_index_script(
                 model_name=args.model_name,
                 index_algorithm=args.index_algorithm,
+                index_type=args.index_type,
+                index_per_speaker=args.index_per_speaker,
+            )
+        elif args.mode == "index_benchmark":
+            run_index_benchmark_script(
+                model_name=args.model_name,
+                configs=args.configs,
+                max_vectors=args.max_vectors,
+                queries=args.queries,
+                synthetic_dim=args.synthetic_dim,
+                output_path=args.output_path,
+            )
+        elif args.mode == "convert_model":
+            run_convert_model_script(
+                input_path=args.input_path,
+                output_path=args.output_path,
+            )
+        elif args.mode == "optimize_model":
+            run_optimize_model_script(
+                pth_path=args.pth_path,
+            )
+        elif args.mode == "export_onnx":
+            run_export_onnx_script(
+                pth_path=args.pth_path,
+                embedder_model=args.embedder_model,
+                embedder_model_custom=args.embedder_model_custom,
+                compare=args.compare,
+            )
+        elif args.mode == "quantize_model":
+            run_quantize_model_script(
+                pth_path=args.pth_path,
+                embedder_model=args.embedder_model,
+                embedder_model_custom=args.embedder_model_custom,
+                reference_path=args.reference_path,
             )
         elif args.mode == "model_information":
             run_model_information_script(
@@ -2391,6 +2936,16 @@ def main():
             run_audio_analyzer_script(
                 input_path=args.input_path,
             )
+        elif args.mode == "serve":
+            run_serve_script(
+                host=args.host,
+                port=args.port,
+                max_queue_size=args.max_queue_size,
+                max_batch_jobs=args.max_batch_jobs,
+                batch_timeout=args.batch_timeout,
+                batch_size=args.batch_size,
+                backend=args.backend,
+            )
     except Exception as error:
         print(f"An error occurred during execution: {error}")
 
@@ -0,0 +1,277 @@
+import os
+import sys
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+DEFAULT_CACHE_DIR = os.path.join(now_dir, "assets", "analysis_cache")
+# budgets of `enable_analysis_cache`; the process-wide cache starts disabled
+DEFAULT_MAX_MEMORY_MB = 512
+DEFAULT_MAX_DISK_MB = 4096
+
+
+class AnalysisCache:
+    """
+    A process-wide, content-addressed cache of analysis results that do not depend on the
+    voice model: the decoded input audio, the raw F0 contour and the pre-retrieval
+    embedder features.
+
+    Keys are hashes of the analysed audio samples and the settings that affect the result,
+    so re-rendering the same input with another `index_rate`, `protect`, `pitch`,
+    `volume_envelope` or autotune setting skips straight to retrieval and synthesis.
+    Entries live in an in-memory LRU and in `cache_dir` as `.npy` files; both are bounded
+    and evict the least recently used entries first.
+
+    Args:
+        cache_dir (str): Directory of the on-disk entries.
+        max_memory_mb (float): RAM budget in megabytes, 0 disables the in-memory cache.
+        max_disk_mb (float): Disk budget in megabytes, 0 disables the on-disk cache.
+    """
+
+    def __init__(
+        self,
+        cache_dir=DEFAULT_CACHE_DIR,
+        max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+        max_disk_mb=DEFAULT_MAX_DISK_MB,
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory = int(max_memory_mb * 1024**2)
+        self.max_disk = int(max_disk_mb * 1024**2)
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.disk_entries = None
+        self.disk = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        self.lock = threading.RLock()
+
+    @property
+    def enabled(self):
+        return self.max_memory > 0 or self.max_disk > 0
+
+    def configure(self, cache_dir=None, max_memory_mb=None, max_disk_mb=None):
+        """
+        Updates the cache settings, evicting entries if a new budget is smaller.
+
+        Args:
+            cache_dir (str, optional): New directory of the on-disk entries.
+            max_memory_mb (float, optional): New RAM budget in megabytes.
+            max_disk_mb (float, optional): New disk budget in megabytes.
+        """
+        with self.lock:
+            if cache_dir is not None and cache_dir != self.cache_dir:
+                self.cache_dir = cache_dir
+                self.disk_entries = None
+            if max_memory_mb is not None:
+                self.max_memory = int(max_memory_mb * 1024**2)
+                self._enforce_memory_budget()
+            if max_disk_mb is not None:
+                self.max_disk = int(max_disk_mb * 1024**2)
+                if self.disk_entries is not None:
+                    self._enforce_disk_budget()
+
+    @staticmethod
+    def get_key(kind, *parts):
+        """
+        Returns the content-addressed key of an analysis result.
+
+        Args:
+            kind (str): Kind of result, for example "f0" or "feats".
+            *parts: Arrays, whose samples are hashed, and settings, whose repr is hashed.
+        """
+        digest = hashlib.sha1(kind.encode("utf-8"))
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                part = np.ascontiguousarray(part)
+                digest.update(f"{part.dtype.str}{part.shape}".encode("utf-8"))
+                digest.update(part.data)
+            else:
+                digest.update(repr(part).encode("utf-8"))
+        return f"{kind}-{digest.hexdigest()}"
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        """
+        Returns the cached array for a key, or None on a miss.
+
+        Args:
+            key (str): Key returned by `get_key`.
+        """
+        with self.lock:
+            array = self.entries.get(key)
+            if array is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return array
+            if self.max_disk > 0:
+                self._scan_disk()
+                if key in self.disk_entries:
+                    try:
+                        array = np.load(self.get_path(key))
+                        os.utime(self.get_path(key))
+                        self.disk_entries.move_to_end(key)
+                        self._remember(key, array)
+                        self.stats["disk_hits"] += 1
+                        return array
+                    except Exception as error:
+                        print(f"An error occurred reading the analysis cache: {error}")
+                        self._remove_disk_entry(key)
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, array):
+        """
+        Stores an array under a key in memory and on disk.
+
+        Args:
+            key (str): Key returned by `get_key`.
+            array (numpy.ndarray): The analysis result.
+        """
+        array = np.ascontiguousarray(array)
+        with self.lock:
+            self._remember(key, array)
+            if self.max_disk <= 0 or array.nbytes > self.max_disk:
+                return
+            self._scan_disk()
+            if key in self.disk_entries:
+                return
+            path = self.get_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_path, "wb") as file:
+                    np.save(file, array, allow_pickle=False)
+                os.replace(tmp_path, path)
+            except Exception as error:
+                print(f"An error occurred writing the analysis cache: {error}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            size = os.path.getsize(path)
+            self.disk_entries[key] = size
+            self.disk += size
+            self._enforce_disk_budget()
+
+    def get_settings(self):
+        """
+        Returns the directory and budgets of the cache, as `configure` arguments.
+        """
+        with self.lock:
+            return {
+                "cache_dir": self.cache_dir,
+                "max_memory_mb": self.max_memory / 1024**2,
+                "max_disk_mb": self.max_disk / 1024**2,
+            }
+
+    def get_stats(self):
+        """
+        Returns the hit, miss and size statistics of the cache.
+        """
+        with self.lock:
+            return {
+                **self.stats,
+                "memory_entries": len(self.entries),
+                "memory_mb": round(self.memory / 1024**2, 1),
+                "disk_entries": len(self.disk_entries or ()),
+                "disk_mb": round(self.disk / 1024**2, 1),
+            }
+
+    def clear(self):
+        """
+        Removes every entry from memory and disk.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.memory = 0
+            if os.path.isdir(self.cache_dir):
+                self._scan_disk()
+                for key in list(self.disk_entries):
+                    self._remove_disk_entry(key)
+
+    def _remember(self, key, array):
+        if self.max_memory <= 0 or array.nbytes > self.max_memory:
+            return
+        if key in self.entries:
+            self.memory -= self.entries.pop(key).nbytes
+        self.entries[key] = array
+        self.memory += array.nbytes
+        self._enforce_memory_budget()
+
+    def _scan_disk(self):
+        # built once per directory, then kept up to date by `put` and evictions
+        if self.disk_entries is not None:
+            return
+        files = []
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".npy"):
+                    continue
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime_ns, name[: -len(".npy")], stat.st_size))
+        self.disk_entries = OrderedDict((key, size) for _, key, size in sorted(files))
+        self.disk = sum(self.disk_entries.values())
+        self._enforce_disk_budget()
+
+    def _remove_disk_entry(self, key):
+        self.disk -= self.disk_entries.pop(key, 0)
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            pass
+
+    def _enforce_memory_budget(self):
+        while self.memory > self.max_memory and self.entries:
+            _, array = self.entries.popitem(last=False)
+            self.memory -= array.nbytes
+
+    def _enforce_disk_budget(self):
+        while self.disk > self.max_disk and self.disk_entries:
+            self._remove_disk_entry(next(iter(self.disk_entries)))
+
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache(cache_dir=None, max_memory_mb=None, max_disk_mb=None):
+    """
+    Returns the process-wide analysis cache, creating it on first use.
+
+    The cache is created disabled, with no budget, unless budgets are given; see
+    `enable_analysis_cache`.
+
+    Args:
+        cache_dir (str, optional): Directory of the on-disk entries.
+        max_memory_mb (float, optional): RAM budget in megabytes.
+        max_disk_mb (float, optional): Disk budget in megabytes.
+    """
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisCache(
+                cache_dir or DEFAULT_CACHE_DIR,
+                max_memory_mb or 0,
+                max_disk_mb or 0,
+            )
+        else:
+            _analysis_cache.configure(cache_dir, max_memory_mb, max_disk_mb)
+        return _analysis_cache
+
+
+def enable_analysis_cache(
+    cache_dir=None, max_memory_mb=DEFAULT_MAX_MEMORY_MB, max_disk_mb=DEFAULT_MAX_DISK_MB
+):
+    """
+    Turns on the process-wide analysis cache, which is disabled by default.
+
+    Args:
+        cache_dir (str, optional): Directory of the on-disk entries.
+        max_memory_mb (float, optional): RAM budget in megabytes.
+        max_disk_mb (float, optional): Disk budget in megabytes.
+    """
+    return get_analysis_cache(cache_dir, max_memory_mb, max_disk_mb)
@@ -0,0 +1,353 @@
+import os
+import sys
+import math
+import time
+import torch
+import torch.nn.functional as F
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.materialize import get_rate_head, get_test_inputs
+from rvc.infer.onnx_backend import time_call
+
+COMPILE_BACKEND = "inductor"
+BUCKET_GROWTH = 1.5
+MIN_BUCKET_SECONDS = 2.0
+BUCKET_STEP_SECONDS = 0.1
+SYNTHESIZER_FRAME_RATE = 100  # pitch frames per second of 16 kHz input
+EMBEDDER_FRAME_RATE = 50  # embedder frames per second of 16 kHz input
+
+
+def get_max_chunk_seconds(x_pad, x_query, x_center, x_max):
+    """
+    Returns the length in seconds of the longest chunk the pipeline passes to the models.
+
+    Args:
+        x_pad (float): Padding around each chunk in seconds.
+        x_query (float): Search radius around each split point in seconds.
+        x_center (float): Distance between split points in seconds.
+        x_max (float): Input length in seconds above which the audio is split.
+    """
+    # split points move up to `x_query` each way, and every chunk ends one window late
+    return max(x_center + 2 * x_query, x_max) + 2 * x_pad + 0.01
+
+
+def get_length_buckets(
+    max_seconds, min_seconds=MIN_BUCKET_SECONDS, growth=BUCKET_GROWTH
+):
+    """
+    Returns the bucket lengths in seconds, ascending, that compiled models pad inputs to.
+
+    Buckets shrink geometrically from `max_seconds`, so padding never adds more than
+    `growth - 1` of the input length, except for inputs shorter than the smallest bucket.
+
+    Args:
+        max_seconds (float): Length of the largest bucket.
+        min_seconds (float, optional): Length below which no smaller bucket is added.
+        growth (float, optional): Ratio between neighbouring buckets.
+    """
+    buckets = set()
+    seconds = max_seconds
+    while seconds >= min_seconds or not buckets:
+        steps = math.ceil(round(seconds / BUCKET_STEP_SECONDS, 6))
+        buckets.add(round(steps * BUCKET_STEP_SECONDS, 1))
+        seconds /= growth
+    return sorted(buckets)
+
+
+def get_default_buckets():
+    """
+    Returns the length buckets covering every chunk of the default split sizes.
+    """
+    from rvc.configs.config import Config
+
+    config = Config()
+    return get_length_buckets(
+        get_max_chunk_seconds(
+            config.x_pad, config.x_query, config.x_center, config.x_max
+        )
+    )
+
+
+def get_bucket(buckets, length):
+    for bucket in buckets:
+        if length <= bucket:
+            return bucket
+    return None
+
+
+def get_graph_cache_hits():
+    from torch._dynamo.utils import counters
+
+    return counters["inductor"]["fxgraph_cache_hit"]
+
+
+def configure_inductor(graphs):
+    # one graph per bucket is expected, so dynamo must not give up recompiling early,
+    # and the on-disk graph cache lets later processes skip code generation
+    torch._dynamo.config.cache_size_limit = max(
+        torch._dynamo.config.cache_size_limit, 2 * graphs
+    )
+    torch._inductor.config.fx_graph_cache = True
+
+
+class CompileStats:
+    """
+    Counts the graphs a compiled model builds and the calls they serve.
+
+    The first call of every input shape compiles a graph; its time is the compile time.
+    Later calls of that shape are cache hits. Graphs restored from the inductor cache on
+    disk are counted separately, and inputs longer than every bucket as eager fallbacks.
+
+    Args:
+        name (str): Name of the model in log messages.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.shapes = set()
+        self.compiles = 0
+        self.compile_time = 0.0
+        self.restored = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.speedups = {}
+
+    def run(self, shape, function, *args):
+        if shape in self.shapes:
+            self.hits += 1
+            return function(*args)
+        restored = get_graph_cache_hits()
+        start_time = time.perf_counter()
+        outputs = function(*args)
+        elapsed = time.perf_counter() - start_time
+        self.shapes.add(shape)
+        self.compiles += 1
+        self.compile_time += elapsed
+        self.restored += get_graph_cache_hits() > restored
+        print(
+            f"Compiled the {self.name} for inputs of shape {shape} in {elapsed:.1f} seconds."
+        )
+        return outputs
+
+    def summary(self):
+        text = (
+            f"Compiled {self.name}: {self.compiles} graphs in {self.compile_time:.1f} seconds "
+            f"({self.restored} restored from the inductor cache), {self.hits} cache hits, "
+            f"{self.fallbacks} eager fallbacks"
+        )
+        if self.speedups:
+            speedup = sum(self.speedups.values()) / len(self.speedups)
+            text += f", {speedup:.2f}x faster than eager"
+        return text + "."
+
+
+class CompiledSynthesizer(torch.nn.Module):
+    """
+    A voice model whose `infer` runs as inductor graphs compiled for fixed lengths.
+
+    Inputs are zero-padded along time to the next length bucket while `phone_lengths`
+    keeps their true length, so the text encoder and the flow mask the padding, and the
+    output is cut back to the input length. Only the last frames before the padding can
+    differ from eager inference; the pipeline discards them with the chunk padding.
+    With `rate`, the graph decodes every frame and the audio of the frames before the
+    decoded tail is dropped. Inputs longer than every bucket run eagerly.
+
+    Args:
+        net_g (Synthesizer): The prepared generator network.
+        metadata (dict): Metadata returned by `build_synthesizer`.
+        buckets (list): Bucket lengths in seconds.
+    """
+
+    def __init__(self, net_g, metadata, buckets):
+        super().__init__()
+        self.net_g = net_g
+        self.metadata = metadata
+        self.buckets = [round(seconds * SYNTHESIZER_FRAME_RATE) for seconds in buckets]
+        self.stats = CompileStats("synthesizer")
+        self.compiled = torch.compile(
+            net_g.infer, backend=COMPILE_BACKEND, dynamic=False
+        )
+
+    def infer(
+        self,
+        phone,
+        phone_lengths,
+        pitch=None,
+        nsff0=None,
+        sid=None,
+        rate=None,
+        noise=None,
+    ):
+        frames = phone.shape[1]
+        bucket = get_bucket(self.buckets, frames)
+        if bucket is None:
+            self.stats.fallbacks += 1
+            return self.net_g.infer(
+                phone, phone_lengths, pitch, nsff0, sid, rate=rate, noise=noise
+            )
+        phone = F.pad(phone, (0, 0, 0, bucket - frames))
+        if pitch is not None:
+            pitch = F.pad(pitch, (0, bucket - pitch.shape[1]))
+        if nsff0 is not None:
+            nsff0 = F.pad(nsff0, (0, bucket - nsff0.shape[1]))
+        if noise is not None:
+            noise = F.pad(noise, (0, bucket - noise.shape[2]))
+        audio, x_mask, _ = self.stats.run(
+            (phone.shape[0], bucket),
+            self.compiled,
+            phone,
+            phone_lengths,
+            pitch,
+            nsff0,
+            sid,
+            None,
+            noise,
+        )
+        upsampling = audio.shape[-1] // bucket
+        head = 0 if rate is None else get_rate_head(frames, rate)
+        return (
+            audio[..., head * upsampling : frames * upsampling],
+            x_mask[..., head:frames],
+            None,
+        )
+
+    def warmup(self):
+        """
+        Compiles the graph of every bucket and measures its speedup over eager inference.
+        """
+        device = next(self.net_g.parameters()).device
+        hits = self.stats.hits
+        with torch.no_grad():
+            for bucket in self.buckets:
+                inputs = get_test_inputs(self.metadata, bucket, device=device)
+                compiled_time = time_call(lambda: self.infer(*inputs), 1)
+                eager_time = time_call(lambda: self.net_g.infer(*inputs), 1)
+                self.stats.speedups[bucket] = eager_time / compiled_time
+        # warmup calls are not cache hits of real inputs
+        self.stats.hits = hits
+        print(self.stats.summary())
+
+
+class CompiledEmbedder(torch.nn.Module):
+    """
+    An embedder whose transformer encoder runs as inductor graphs compiled for fixed lengths.
+
+    The convolutional feature extractor runs eagerly on the true input, since its group
+    norm would see any padding. Its output is zero-padded to the next length bucket and
+    the attention mask hides the padding from the encoder, so the features match eager
+    inference. Inputs longer than every bucket run eagerly.
+
+    Args:
+        model (HubertModelWithFinalProj): The embedder model.
+        buckets (list): Bucket lengths in seconds.
+    """
+
+    def __init__(self, model, buckets):
+        super().__init__()
+        self.model = model
+        self.config = model.config
+        self.final_proj = model.final_proj
+        self.buckets = [round(seconds * EMBEDDER_FRAME_RATE) for seconds in buckets]
+        self.stats = CompileStats("embedder")
+        self.compiled = torch.compile(
+            self.encode, backend=COMPILE_BACKEND, dynamic=False
+        )
+
+    def encode(self, features, attention_mask):
+        hidden_states = self.model.feature_projection(features)
+        return self.model.encoder(hidden_states, attention_mask=attention_mask)[0]
+
+    def forward(self, source, attention_mask=None):
+        features = self.model.feature_extractor(source).transpose(1, 2)
+        if attention_mask is None:
+            mask = torch.ones(
+                features.shape[:2], dtype=torch.bool, device=features.device
+            )
+        else:
+            mask = self.model._get_feature_vector_attention_mask(
+                features.shape[1], attention_mask
+            )
+        return {"last_hidden_state": self.encode_features(features, mask)}
+
+    def encode_features(self, features, mask):
+        """
+        Runs the projection and encoder on extracted features, in the graph of the next
+        length bucket.
+
+        Args:
+            features (torch.Tensor): The (batch, frames, channels) extracted features.
+            mask (torch.Tensor): The (batch, frames) boolean mask of the valid frames.
+        """
+        frames = features.shape[1]
+        bucket = get_bucket(self.buckets, frames)
+        if bucket is None:
+            self.stats.fallbacks += 1
+            return self.encode(features, mask)
+        features = F.pad(features, (0, 0, 0, bucket - frames))
+        mask = F.pad(mask.long(), (0, bucket - frames)).bool()
+        hidden_states = self.stats.run(
+            (features.shape[0], bucket), self.compiled, features, mask
+        )
+        return hidden_states[:, :frames]
+
+    def _get_feat_extract_output_lengths(self, input_lengths):
+        return self.model._get_feat_extract_output_lengths(input_lengths)
+
+    def warmup(self):
+        """
+        Compiles the graph of every bucket and measures its speedup over eager inference.
+        """
+        device = next(self.model.parameters()).device
+        hits = self.stats.hits
+        with torch.no_grad():
+            for bucket in self.buckets:
+                features = torch.randn(
+                    1, bucket, self.config.conv_dim[-1], device=device
+                )
+                mask = torch.ones(1, bucket, dtype=torch.bool, device=device)
+                shape = (1, bucket)
+                compiled_time = time_call(
+                    lambda: self.stats.run(shape, self.compiled, features, mask), 1
+                )
+                eager_time = time_call(lambda: self.encode(features, mask), 1)
+                self.stats.speedups[bucket] = eager_time / compiled_time
+        # warmup calls are not cache hits of real inputs
+        self.stats.hits = hits
+        print(self.stats.summary())
+
+
+def compile_voice(net_g, metadata, buckets=None, warmup=True):
+    """
+    Wraps a prepared voice model in a `CompiledSynthesizer`.
+
+    Args:
+        net_g (Synthesizer): The prepared generator network.
+        metadata (dict): Metadata returned by `build_synthesizer`.
+        buckets (list, optional): Bucket lengths in seconds, see `get_default_buckets`.
+        warmup (bool, optional): Whether to compile every bucket right away.
+    """
+    buckets = buckets or get_default_buckets()
+    configure_inductor(len(buckets))
+    model = CompiledSynthesizer(net_g, metadata, buckets)
+    if warmup:
+        model.warmup()
+    return model
+
+
+def compile_embedder(model, buckets=None, warmup=True):
+    """
+    Wraps an embedder in a `CompiledEmbedder`.
+
+    Args:
+        model (HubertModelWithFinalProj): The embedder model.
+        buckets (list, optional): Bucket lengths in seconds, see `get_default_buckets`.
+        warmup (bool, optional): Whether to compile every bucket right away.
+    """
+    buckets = buckets or get_default_buckets()
+    configure_inductor(len(buckets))
+    model = CompiledEmbedder(model, buckets)
+    if warmup:
+        model.warmup()
+    return model
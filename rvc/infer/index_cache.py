@@ -0,0 +1,175 @@
+import os
+import sys
+import threading
+import faiss
+import numpy as np
+from collections import OrderedDict
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+import logging
+
+logging.getLogger("faiss").setLevel(logging.WARNING)
+
+DEFAULT_MAX_MEMORY_MB = 2048
+RECONSTRUCT_BATCH_SIZE = 65536
+
+
+class IndexCache:
+    """
+    A process-wide LRU cache of FAISS indexes and their retrieval vectors.
+
+    Entries are keyed by the real path, modification time and size of the index file, so an
+    index that is rebuilt on disk is reloaded automatically. The vectors returned by
+    `index.reconstruct_n` are written once to a memory-mapped sidecar next to the index
+    (`<index>.<dtype>.npy`), which lets repeated conversions and worker processes share the
+    same pages instead of each holding a private copy.
+
+    Args:
+        max_memory_mb (float): RAM budget for the cached indexes in megabytes.
+        vectors_dtype (str): Storage dtype of the retrieval vectors ("float32" or "float16").
+    """
+
+    def __init__(self, max_memory_mb=DEFAULT_MAX_MEMORY_MB, vectors_dtype="float32"):
+        self.max_memory = int(max_memory_mb * 1024**2)
+        self.vectors_dtype = np.dtype(vectors_dtype)
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.lock = threading.RLock()
+
+    def configure(self, max_memory_mb=None, vectors_dtype=None):
+        """
+        Updates the cache settings, evicting entries if the new budget is smaller.
+
+        Args:
+            max_memory_mb (float, optional): New RAM budget in megabytes.
+            vectors_dtype (str, optional): New storage dtype of the retrieval vectors.
+        """
+        with self.lock:
+            if (
+                vectors_dtype is not None
+                and np.dtype(vectors_dtype) != self.vectors_dtype
+            ):
+                self.vectors_dtype = np.dtype(vectors_dtype)
+                self.clear()
+            if max_memory_mb is not None:
+                self.max_memory = int(max_memory_mb * 1024**2)
+                self._enforce_budget()
+
+    @staticmethod
+    def get_key(index_path):
+        stat = os.stat(index_path)
+        return (os.path.realpath(index_path), stat.st_mtime_ns, stat.st_size)
+
+    def get_vectors_path(self, index_path):
+        return f"{index_path}.{self.vectors_dtype.name}.npy"
+
+    def get(self, index_path):
+        """
+        Returns the FAISS index and its retrieval vectors, loading them on a cache miss.
+
+        Args:
+            index_path (str): Path to the FAISS index file.
+        """
+        key = self.get_key(index_path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[0], entry[1]
+
+            index = faiss.read_index(index_path)
+            big_npy = self.load_vectors(index_path, index, key[1])
+            size = key[2] + (0 if isinstance(big_npy, np.memmap) else big_npy.nbytes)
+
+            for stale_key in [k for k in self.entries if k[0] == key[0]]:
+                self._evict(stale_key)
+            self.entries[key] = (index, big_npy, size)
+            self.memory += size
+            self._enforce_budget()
+            return index, big_npy
+
+    def load_vectors(self, index_path, index, index_mtime_ns):
+        """
+        Opens the memory-mapped retrieval vectors of an index, creating the sidecar if needed.
+
+        Args:
+            index_path (str): Path to the FAISS index file.
+            index (faiss.Index): The loaded index.
+            index_mtime_ns (int): Modification time of the index file in nanoseconds.
+        """
+        vectors_path = self.get_vectors_path(index_path)
+        shape = (index.ntotal, index.d)
+        if index.ntotal == 0:
+            return np.zeros(shape, dtype=self.vectors_dtype)
+
+        if (
+            os.path.exists(vectors_path)
+            and os.stat(vectors_path).st_mtime_ns >= index_mtime_ns
+        ):
+            try:
+                big_npy = np.load(vectors_path, mmap_mode="r")
+                if big_npy.shape == shape and big_npy.dtype == self.vectors_dtype:
+                    return big_npy
+            except Exception as error:
+                print(f"An error occurred reading the index vectors: {error}")
+
+        tmp_path = f"{vectors_path}.{os.getpid()}.tmp"
+        try:
+            vectors = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=self.vectors_dtype, shape=shape
+            )
+            for start in range(0, index.ntotal, RECONSTRUCT_BATCH_SIZE):
+                count = min(RECONSTRUCT_BATCH_SIZE, index.ntotal - start)
+                vectors[start : start + count] = index.reconstruct_n(start, count)
+            vectors.flush()
+            del vectors
+            os.replace(tmp_path, vectors_path)
+            return np.load(vectors_path, mmap_mode="r")
+        except Exception as error:
+            print(f"An error occurred writing the index vectors: {error}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return index.reconstruct_n(0, index.ntotal).astype(self.vectors_dtype)
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self.lock:
+            for key in list(self.entries):
+                self._evict(key)
+
+    def _evict(self, key):
+        _, _, size = self.entries.pop(key)
+        self.memory -= size
+
+    def _enforce_budget(self):
+        # The most recently used entry is always kept, even if it exceeds the budget alone.
+        while self.memory > self.max_memory and len(self.entries) > 1:
+            self._evict(next(iter(self.entries)))
+
+
+_index_cache = None
+_index_cache_lock = threading.Lock()
+
+
+def get_index_cache(max_memory_mb=None, vectors_dtype=None):
+    """
+    Returns the process-wide index cache, creating it on first use.
+
+    Args:
+        max_memory_mb (float, optional): RAM budget for the cached indexes in megabytes.
+        vectors_dtype (str, optional): Storage dtype of the retrieval vectors.
+    """
+    global _index_cache
+    with _index_cache_lock:
+        if _index_cache is None:
+            _index_cache = IndexCache(
+                max_memory_mb if max_memory_mb is not None else DEFAULT_MAX_MEMORY_MB,
+                vectors_dtype or "float32",
+            )
+        else:
+            _index_cache.configure(max_memory_mb, vectors_dtype)
+        return _index_cache
@@ -1,35 +1,42 @@
 import os
 import sys
 import soxr
+import multiprocessing
+import concurrent.futures
 import time
+import inspect
+import itertools
 import torch
 import librosa
 import logging
 import traceback
 import numpy as np
 import soundfile as sf
-import noisereduce as nr
-from pedalboard import (
-    Pedalboard,
-    Chorus,
-    Distortion,
-    Reverb,
-    PitchShift,
-    Limiter,
-    Gain,
-    Bitcrush,
-    Clipping,
-    Compressor,
-    Delay,
-)
 
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
-from rvc.infer.pipeline import Pipeline as VC
-from rvc.lib.utils import load_audio_infer, load_embedding
+from rvc.infer.pipeline import Pipeline as VC, AudioProcessor
+from rvc.infer.model_pool import get_model_pool
+from rvc.infer.analysis_cache import get_analysis_cache
+from rvc.infer.output_cache import get_output_cache
+from rvc.infer.stages import Stage, StagedPipeline
+from rvc.infer.progressive import (
+    CROSSFADE_SECONDS,
+    AudioStreamReader,
+    OverlapStitcher,
+    get_input_gain,
+    iter_chunks,
+)
+from rvc.infer.postprocess import (
+    COMMON_SAMPLE_RATES,
+    PostProcessor,
+    build_effect_chain,
+    get_effect_chains,
+)
+from rvc.lib.denoise import reduce_noise
+from rvc.lib.utils import load_audio_infer
 from rvc.lib.tools.split_audio import process_audio, merge_audio
-from rvc.lib.algorithm.synthesizers import Synthesizer
 from rvc.configs.config import Config
 
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -37,17 +44,38 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 logging.getLogger("faiss").setLevel(logging.WARNING)
 logging.getLogger("faiss.loader").setLevel(logging.WARNING)
 
+AUDIO_EXTENSIONS = (
+    "wav",
+    "mp3",
+    "flac",
+    "ogg",
+    "opus",
+    "m4a",
+    "mp4",
+    "aac",
+    "alac",
+    "wma",
+    "aiff",
+    "webm",
+    "ac3",
+)
+COMPRESSED_BYTES_PER_SECOND = 16000  # 128 kbps, to order files whose length is unknown
+
 
 class VoiceConverter:
     """
     A class for performing voice conversion using the Retrieval-Based Voice Conversion (RVC) method.
     """
 
-    def __init__(self):
+    def __init__(self, backend: str = "torch"):
         """
         Initializes the VoiceConverter with default configuration, and sets up models and parameters.
+
+        Args:
+            backend (str, optional): Inference backend, "torch", "onnx" (ONNX Runtime on the CPU), "int8" (quantized models on the CPU) or "compile" (models compiled with torch.compile).
         """
         self.config = Config()  # Load configuration
+        self.backend = backend  # Inference backend
         self.hubert_model = (
             None  # Initialize the Hubert model (for embedding extraction)
         )
@@ -60,23 +88,28 @@ class VoiceConverter:
         self.n_spk = None  # Number of speakers in the model
         self.use_f0 = None  # Whether the model uses F0
         self.loaded_model = None
+        self.model_pool = get_model_pool(device=self.config.device)
 
     def load_hubert(self, embedder_model: str, embedder_model_custom: str = None):
         """
-        Loads the HuBERT model for speaker embedding extraction.
+        Loads the HuBERT model for speaker embedding extraction from the model pool.
 
         Args:
             embedder_model (str): Path to the pre-trained HuBERT model.
             embedder_model_custom (str): Path to the custom HuBERT model.
         """
-        self.hubert_model = load_embedding(embedder_model, embedder_model_custom)
-        self.hubert_model = self.hubert_model.to(self.config.device).float()
-        self.hubert_model.eval()
+        self.hubert_model = self.model_pool.get_embedder(
+            embedder_model, embedder_model_custom, self.backend
+        )
 
     @staticmethod
     def remove_audio_noise(data, sr, reduction_strength=0.7):
         """
-        Removes noise from an audio file using the NoiseReduce library.
+        Removes noise from an audio file by spectral gating on all CPU cores.
+
+        Like `noisereduce.reduce_noise`, which this replaces, the gate is non-stationary:
+        each frequency bin is gated against its own running floor, so no noise profile is
+        estimated up front.
 
         Args:
             data (numpy.ndarray): The audio data as a NumPy array.
@@ -84,9 +117,7 @@ class VoiceConverter:
             reduction_strength (float): Strength of the noise reduction. Default is 0.7.
         """
         try:
-            reduced_noise = nr.reduce_noise(
-                y=data, sr=sr, prop_decrease=reduction_strength
-            )
+            reduced_noise = reduce_noise(data, sr, prop_decrease=reduction_strength)
             return reduced_noise
         except Exception as error:
             print(f"An error occurred removing audio noise: {error}")
@@ -106,18 +137,7 @@ class VoiceConverter:
             if output_format != "WAV":
                 print(f"Saving audio as {output_format}...")
                 audio, sample_rate = librosa.load(input_path, sr=None)
-                common_sample_rates = [
-                    8000,
-                    11025,
-                    12000,
-                    16000,
-                    22050,
-                    24000,
-                    32000,
-                    44100,
-                    48000,
-                ]
-                target_sr = min(common_sample_rates, key=lambda x: abs(x - sample_rate))
+                target_sr = min(COMMON_SAMPLE_RATES, key=lambda x: abs(x - sample_rate))
                 audio = librosa.resample(
                     audio, orig_sr=sample_rate, target_sr=target_sr, res_type="soxr_vhq"
                 )
@@ -132,62 +152,7 @@ class VoiceConverter:
         sample_rate,
         **kwargs,
     ):
-        board = Pedalboard()
-        if kwargs.get("reverb", False):
-            reverb = Reverb(
-                room_size=kwargs.get("reverb_room_size", 0.5),
-                damping=kwargs.get("reverb_damping", 0.5),
-                wet_level=kwargs.get("reverb_wet_level", 0.33),
-                dry_level=kwargs.get("reverb_dry_level", 0.4),
-                width=kwargs.get("reverb_width", 1.0),
-                freeze_mode=kwargs.get("reverb_freeze_mode", 0),
-            )
-            board.append(reverb)
-        if kwargs.get("pitch_shift", False):
-            pitch_shift = PitchShift(semitones=kwargs.get("pitch_shift_semitones", 0))
-            board.append(pitch_shift)
-        if kwargs.get("limiter", False):
-            limiter = Limiter(
-                threshold_db=kwargs.get("limiter_threshold", -6),
-                release_ms=kwargs.get("limiter_release", 0.05),
-            )
-            board.append(limiter)
-        if kwargs.get("gain", False):
-            gain = Gain(gain_db=kwargs.get("gain_db", 0))
-            board.append(gain)
-        if kwargs.get("distortion", False):
-            distortion = Distortion(drive_db=kwargs.get("distortion_gain", 25))
-            board.append(distortion)
-        if kwargs.get("chorus", False):
-            chorus = Chorus(
-                rate_hz=kwargs.get("chorus_rate", 1.0),
-                depth=kwargs.get("chorus_depth", 0.25),
-                centre_delay_ms=kwargs.get("chorus_delay", 7),
-                feedback=kwargs.get("chorus_feedback", 0.0),
-                mix=kwargs.get("chorus_mix", 0.5),
-            )
-            board.append(chorus)
-        if kwargs.get("bitcrush", False):
-            bitcrush = Bitcrush(bit_depth=kwargs.get("bitcrush_bit_depth", 8))
-            board.append(bitcrush)
-        if kwargs.get("clipping", False):
-            clipping = Clipping(threshold_db=kwargs.get("clipping_threshold", 0))
-            board.append(clipping)
-        if kwargs.get("compressor", False):
-            compressor = Compressor(
-                threshold_db=kwargs.get("compressor_threshold", 0),
-                ratio=kwargs.get("compressor_ratio", 1),
-                attack_ms=kwargs.get("compressor_attack", 1.0),
-                release_ms=kwargs.get("compressor_release", 100),
-            )
-            board.append(compressor)
-        if kwargs.get("delay", False):
-            delay = Delay(
-                delay_seconds=kwargs.get("delay_seconds", 0.5),
-                feedback=kwargs.get("delay_feedback", 0.0),
-                mix=kwargs.get("delay_mix", 0.5),
-            )
-            board.append(delay)
+        board = build_effect_chain(**kwargs)
         return board(audio_input, sample_rate)
 
     def convert_audio(
@@ -214,6 +179,11 @@ class VoiceConverter:
         post_process: bool = False,
         resample_sr: int = 0,
         sid: int = 0,
+        batch_size: int = 1,
+        f0_autotune_key: str = None,
+        f0_autotune_scale: str = "chromatic",
+        output_cache: bool = False,
+        progressive: bool = False,
         **kwargs,
     ):
         """
@@ -240,116 +210,607 @@ class VoiceConverter:
             embedder_model_custom (str): Path to the custom embedder model.
             resample_sr (int, optional): Resample sampling rate. Default is 0.
             sid (int, optional): Speaker ID. Default is 0.
+            batch_size (int, optional): Number of chunks converted together in one forward pass. Default is 1.
+            f0_autotune_key (str, optional): Root note of the autotune scale. Default is None.
+            f0_autotune_scale (str, optional): Scale the autotune snaps to. Default is "chromatic".
+            output_cache (bool, optional): Whether to reuse the result of an identical earlier conversion. Default is False.
+            progressive (bool, optional): Whether to decode, convert and write the audio chunk by chunk with bounded memory, see `convert_audio_progressive`. Default is False.
             **kwargs: Additional keyword arguments.
         """
         if not model_path:
             print("No model path provided. Aborting conversion.")
             return
 
-        self.get_vc(model_path, sid)
-
         try:
             start_time = time.time()
             print(f"Converting audio '{audio_input_path}'...")
+            job = {
+                "audio_input_path": audio_input_path,
+                "audio_output_path": audio_output_path,
+                "model_path": model_path,
+                "index_path": index_path,
+                "pitch": pitch,
+                "f0_file": f0_file,
+                "f0_method": f0_method,
+                "index_rate": index_rate,
+                "volume_envelope": volume_envelope,
+                "protect": protect,
+                "hop_length": hop_length,
+                "split_audio": split_audio,
+                "f0_autotune": f0_autotune,
+                "f0_autotune_strength": f0_autotune_strength,
+                "embedder_model": embedder_model,
+                "embedder_model_custom": embedder_model_custom,
+                "clean_audio": clean_audio,
+                "clean_strength": clean_strength,
+                "export_format": export_format,
+                "post_process": post_process,
+                "resample_sr": resample_sr,
+                "sid": sid,
+                "f0_autotune_key": f0_autotune_key,
+                "f0_autotune_scale": f0_autotune_scale,
+                "progressive": progressive,
+                "kwargs": kwargs,
+            }
+            cache_key = None
+            if output_cache:
+                cache = get_output_cache()
+                cache_key = cache.get_key(job)
+                result = cache.restore(cache_key, job)
+                if result is not None:
+                    print(f"Restored cached conversion at '{result}'.")
+                    return result
+            convert = (
+                self.convert_audio_progressive
+                if progressive
+                else self.convert_audio_group
+            )
+            result = convert([job], batch_size)[0]
+            if isinstance(result, Exception):
+                raise result
+            if output_cache and result:
+                cache.store(cache_key, job)
+
+            elapsed_time = time.time() - start_time
+            print(f"Conversion completed at '{result}' in {elapsed_time:.2f} seconds.")
+            self.log_compile_stats()
+            return result
+        except Exception as error:
+            print(f"An error occurred during audio conversion: {error}")
+            print(traceback.format_exc())
+
+    def get_job(self, **kwargs):
+        """
+        Returns the job dict of `convert_audio` arguments, with defaults filled in.
+
+        Args:
+            **kwargs: Arguments of `convert_audio`.
+        """
+        arguments = inspect.signature(self.convert_audio).bind(**kwargs)
+        arguments.apply_defaults()
+        return dict(arguments.arguments)
+
+    @staticmethod
+    def get_group_key(job):
+        """
+        Returns the settings that jobs converted together by `convert_audio_group` must share.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        return (
+            job["model_path"],
+            job["index_path"],
+            job["index_rate"],
+            job["protect"],
+            job["sid"],
+            job["embedder_model"],
+            job["embedder_model_custom"],
+            job["resample_sr"],
+        )
+
+    def convert_audio_group(self, jobs, batch_size=1):
+        """
+        Converts several inputs that share a voice model, batching their chunks together.
+
+        Loading, F0 estimation and post-processing run per job, while the chunks of all
+        jobs go through the embedder and the generator in shared forward passes of up to
+        `batch_size` chunks. Returns, for every job, the output path or the exception that
+        made it fail.
+
+        Args:
+            jobs (list): Dicts of `convert_audio` arguments with equal `get_group_key` values.
+            batch_size (int, optional): Number of chunks converted together in one forward pass.
+        """
+        index, big_npy = self.setup_group(jobs[0])
+
+        results = [None] * len(jobs)
+        loaded_jobs = []
+        for i, job in enumerate(jobs):
+            try:
+                loaded_jobs.append((i, self.prepare_job(self.load_job(job))))
+            except Exception as error:
+                results[i] = error
+
+        pieces = [
+            piece
+            for _, loaded in loaded_jobs
+            for p in loaded["prepared"]
+            for piece in p["pieces"]
+        ]
+        converted = self.convert_pieces(pieces, jobs[0], index, big_npy, batch_size)
+
+        position = 0
+        for i, loaded in loaded_jobs:
+            count = sum(len(p["pieces"]) for p in loaded["prepared"])
+            try:
+                audio_opt = self.finish_job(
+                    loaded, converted[position : position + count]
+                )
+                results[i] = self.save_audio(audio_opt, jobs[i])
+            except Exception as error:
+                results[i] = error
+            position += count
+
+        del pieces, converted, loaded_jobs
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return results
+
+    def convert_jobs_cached(self, jobs, batch_size=1, staged=True):
+        """
+        Converts jobs with `convert_audio_staged`, or `convert_audio_progressive` if they
+        ask for it, restoring the ones found in the output cache.
+
+        Args:
+            jobs (list): Dicts of `convert_audio` arguments with equal `get_group_key` values.
+            batch_size (int, optional): Number of chunks converted together in one forward pass.
+            staged (bool, optional): Whether to use `convert_audio_staged` rather than `convert_audio_group`, which batches the chunks of all jobs together.
+        """
+        if jobs[0]["progressive"]:
+            convert = self.convert_audio_progressive
+        elif staged:
+            convert = self.convert_audio_staged
+        else:
+            convert = self.convert_audio_group
+        if not jobs[0]["output_cache"]:
+            return convert(jobs, batch_size)
+
+        cache = get_output_cache()
+        keys = [cache.get_key(job) for job in jobs]
+        results = [cache.restore(key, job) for key, job in zip(keys, jobs)]
+        missing = [i for i, result in enumerate(results) if result is None]
+        print(f"Restored {len(jobs) - len(missing)} cached conversions.")
+        if missing:
+            converted = convert([jobs[i] for i in missing], batch_size)
+            for i, result in zip(missing, converted):
+                results[i] = result
+                if result and not isinstance(result, Exception):
+                    cache.store(keys[i], jobs[i])
+        stats = cache.get_stats()
+        print(
+            f"Output cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['disk_mb']} MB."
+        )
+        return results
+
+    def convert_audio_staged(self, jobs, batch_size=1, io_workers=2):
+        """
+        Converts several inputs that share a voice model through a `StagedPipeline`.
+
+        Decoding, F0 estimation, model compute, noise cleaning and encoding (with the
+        effects) are separate stages, so the next file is decoded and the previous one
+        encoded while the models work on the current one. Returns, for every job, the
+        output path or the exception that made it fail, and prints the occupancy of each
+        stage.
+
+        Args:
+            jobs (list): Dicts of `convert_audio` arguments with equal `get_group_key` values.
+            batch_size (int, optional): Number of chunks converted together in one forward pass.
+            io_workers (int, optional): Number of threads for decoding, cleaning and encoding.
+        """
+        index, big_npy = self.setup_group(jobs[0])
+
+        def convert(loaded):
+            pieces = [piece for p in loaded["prepared"] for piece in p["pieces"]]
+            converted = self.convert_pieces(
+                pieces, loaded["job"], index, big_npy, batch_size
+            )
+            return loaded["job"], self.finish_job(loaded, converted)
+
+        def clean(converted):
+            job, audio_opt = converted
+            return job, self.apply_cleaning(audio_opt, job)
+
+        def encode(cleaned):
+            job, audio_opt = cleaned
+            output_path = self.write_audio(audio_opt, job)
+            print(f"Conversion completed at '{output_path}'.")
+            return output_path
+
+        pipeline = StagedPipeline(
+            [
+                Stage("decode", self.load_job, io_workers),
+                Stage("f0", self.prepare_job),
+                Stage("convert", convert),
+                Stage("clean", clean, io_workers),
+                Stage("encode", encode, io_workers),
+            ]
+        )
+        results = pipeline.run(jobs)
+        pipeline.print_stats()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return results
+
+    def convert_audio_progressive(self, jobs, batch_size=1):
+        """
+        Converts several inputs that share a voice model one after another, each with
+        `render_progressive`, so memory does not grow with their length.
+
+        Returns, for every job, the output path or the exception that made it fail.
+
+        Args:
+            jobs (list): Dicts of `convert_audio` arguments with equal `get_group_key` values.
+            batch_size (int, optional): Number of chunks converted together in one forward pass.
+        """
+        index, big_npy = self.setup_group(jobs[0])
+        results = []
+        for job in jobs:
+            try:
+                results.append(self.render_progressive(job, index, big_npy, batch_size))
+            except Exception as error:
+                results.append(error)
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return results
+
+    def render_progressive(self, job, index, big_npy, batch_size=1):
+        """
+        Decodes, converts and writes one input chunk by chunk.
+
+        The input is decoded in blocks and cut at quiet points into chunks of at most
+        `x_center` seconds. Each chunk is converted with `x_pad` seconds of the real
+        neighbouring audio on both sides, which is cut away again before the chunks are
+        crossfaded, and RMS matching runs per chunk. Every chunk then goes through the
+        `PostProcessor` of the job, so WAV output stays readable while the job runs. Peak
+        memory depends on the chunk size and `batch_size`, not on the input length.
+
+        Unlike the whole-file path, the input is scaled down from its peak found in a
+        first decoding pass, peaks of the output above full scale are clipped instead of
+        normalizing the whole file, and `split_audio` is ignored since the chunks already
+        end at quiet points. Inputs with formant shifting or an F0 file, which need the
+        whole signal, are converted by `convert_audio_group` instead.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+            index: FAISS index returned by `setup_group`.
+            big_npy: Retrieval vectors returned by `setup_group`.
+            batch_size (int, optional): Number of chunks converted together in one forward pass.
+        """
+        if job["kwargs"].get("formant_shifting", False) or hasattr(
+            job["f0_file"], "name"
+        ):
+            print("Formant shifting and F0 files need the whole input in memory.")
+            result = self.convert_audio_group([job], batch_size)[0]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        vc = self.vc
+        path = (
+            job["audio_input_path"]
+            .strip(" ")
+            .strip('"')
+            .strip("\n")
+            .strip('"')
+            .strip(" ")
+        )
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        reader = AudioStreamReader(path, vc.sample_rate, get_input_gain(path))
+        stitcher = OverlapStitcher(
+            vc.tgt_sr / vc.sample_rate, int(CROSSFADE_SECONDS * vc.tgt_sr)
+        )
+        output_path = self.get_output_path(job)
+        kwargs = job["kwargs"] if job["post_process"] else {}
+        chunks = iter_chunks(reader, vc.t_center, 2 * vc.t_query, vc.t_pad, vc.window)
+        try:
+            with get_effect_chains().borrow(kwargs) as effects, PostProcessor(
+                output_path, self.tgt_sr, job["export_format"], effects
+            ) as post:
+                while True:
+                    group = list(itertools.islice(chunks, max(1, batch_size)))
+                    if not group:
+                        break
+                    loaded = self.prepare_job(
+                        {"job": job, "chunks": [chunk[3] for chunk in group]}
+                    )
+                    pieces = [
+                        piece for p in loaded["prepared"] for piece in p["pieces"]
+                    ]
+                    converted = self.convert_pieces(
+                        pieces, job, index, big_npy, batch_size
+                    )
+                    position = 0
+                    for (offset, start, end, _, last), prepared in zip(
+                        group, loaded["prepared"]
+                    ):
+                        count = len(prepared["pieces"])
+                        audio_opt = np.concatenate(
+                            converted[position : position + count]
+                        )
+                        position += count
+                        if job["volume_envelope"] != 1:
+                            audio_opt = AudioProcessor.change_rms(
+                                prepared["audio"],
+                                vc.sample_rate,
+                                audio_opt,
+                                vc.sample_rate,
+                                job["volume_envelope"],
+                            )
+                        block = stitcher.add(audio_opt, offset, start, end, last)
+                        if job["clean_audio"]:
+                            cleaned_audio = self.remove_audio_noise(
+                                block, self.tgt_sr, job["clean_strength"]
+                            )
+                            if cleaned_audio is not None:
+                                block = cleaned_audio
+                        post.process(block)
+                    print(
+                        f"Rendered {post.duration:.1f} of {reader.duration:.1f} seconds "
+                        f"to '{output_path}'."
+                    )
+                    del loaded, pieces, converted
+        finally:
+            chunks.close()
+            reader.close()
+        return output_path
+
+    def setup_group(self, job):
+        """
+        Loads the models and index shared by a group of jobs.
+
+        Returns the FAISS index and retrieval vectors, or (None, None) if retrieval is off.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        self.get_vc(job["model_path"], job["sid"])
+        if self.net_g is None:
+            raise ValueError(f"Could not load the voice model '{job['model_path']}'.")
+
+        if not self.hubert_model or job["embedder_model"] != self.last_embedder_model:
+            self.load_hubert(job["embedder_model"], job["embedder_model_custom"])
+            self.last_embedder_model = job["embedder_model"]
+
+        file_index = (
+            job["index_path"]
+            .strip()
+            .strip('"')
+            .strip("\n")
+            .strip('"')
+            .strip()
+            .replace("trained", "added")
+        )
+
+        if self.tgt_sr != job["resample_sr"] >= 16000:
+            self.tgt_sr = job["resample_sr"]
+
+        return self.vc.load_index(file_index, job["index_rate"], job["sid"])
+
+    @staticmethod
+    def load_job(job):
+        """
+        Decodes and normalizes the input audio of a job and splits it if requested.
 
+        The decoded audio is kept in the analysis cache, keyed by the input file and the
+        formant settings, so re-rendering the same file skips decoding and resampling.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        analysis_cache = get_analysis_cache()
+        key = None
+        audio = None
+        if analysis_cache.enabled:
+            try:
+                path = (
+                    job["audio_input_path"]
+                    .strip(" ")
+                    .strip('"')
+                    .strip("\n")
+                    .strip('"')
+                    .strip(" ")
+                )
+                stat = os.stat(path)
+                kwargs = job["kwargs"]
+                key = analysis_cache.get_key(
+                    "audio",
+                    os.path.realpath(path),
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                    16000,
+                    kwargs.get("formant_shifting", False)
+                    and (
+                        kwargs.get("formant_qfrency", 0.8),
+                        kwargs.get("formant_timbre", 0.8),
+                    ),
+                )
+                audio = analysis_cache.get(key)
+            except OSError:
+                key = None
+
+        if audio is not None:
+            audio = audio.copy()
+        else:
             audio = load_audio_infer(
-                audio_input_path,
+                job["audio_input_path"],
                 16000,
-                **kwargs,
+                **job["kwargs"],
             )
             audio_max = np.abs(audio).max() / 0.95
 
             if audio_max > 1:
                 audio /= audio_max
+            if key is not None:
+                analysis_cache.put(key, audio)
 
-            if not self.hubert_model or embedder_model != self.last_embedder_model:
-                self.load_hubert(embedder_model, embedder_model_custom)
-                self.last_embedder_model = embedder_model
-
-            file_index = (
-                index_path.strip()
-                .strip('"')
-                .strip("\n")
-                .strip('"')
-                .strip()
-                .replace("trained", "added")
-            )
+        if job["split_audio"]:
+            chunks, intervals = process_audio(audio, 16000)
+            print(f"Audio split into {len(chunks)} chunks for processing.")
+        else:
+            chunks, intervals = [audio], None
+        return {"job": job, "chunks": chunks, "intervals": intervals}
 
-            if self.tgt_sr != resample_sr >= 16000:
-                self.tgt_sr = resample_sr
+    def prepare_job(self, loaded):
+        """
+        Runs F0 estimation on the chunks of a job returned by `load_job`.
 
-            if split_audio:
-                chunks, intervals = process_audio(audio, 16000)
-                print(f"Audio split into {len(chunks)} chunks for processing.")
-            else:
-                chunks = []
-                chunks.append(audio)
-
-            converted_chunks = []
-            for c in chunks:
-                audio_opt = self.vc.pipeline(
-                    model=self.hubert_model,
-                    net_g=self.net_g,
-                    sid=sid,
-                    audio=c,
-                    pitch=pitch,
-                    f0_method=f0_method,
-                    file_index=file_index,
-                    index_rate=index_rate,
-                    pitch_guidance=self.use_f0,
-                    volume_envelope=volume_envelope,
-                    version=self.version,
-                    protect=protect,
-                    hop_length=hop_length,
-                    f0_autotune=f0_autotune,
-                    f0_autotune_strength=f0_autotune_strength,
-                    f0_file=f0_file,
-                )
-                converted_chunks.append(audio_opt)
-                if split_audio:
-                    print(f"Converted audio chunk {len(converted_chunks)}")
+        Args:
+            loaded (dict): The dict returned by `load_job`.
+        """
+        job = loaded["job"]
+        loaded["prepared"] = [
+            self.vc.prepare(
+                audio=c,
+                pitch=job["pitch"],
+                f0_method=job["f0_method"],
+                pitch_guidance=self.use_f0,
+                hop_length=job["hop_length"],
+                f0_autotune=job["f0_autotune"],
+                f0_autotune_strength=job["f0_autotune_strength"],
+                f0_file=job["f0_file"],
+                f0_autotune_key=job["f0_autotune_key"],
+                f0_autotune_scale=job["f0_autotune_scale"],
+            )
+            for c in loaded["chunks"]
+        ]
+        return loaded
 
-            if split_audio:
-                audio_opt = merge_audio(
-                    chunks, converted_chunks, intervals, 16000, self.tgt_sr
-                )
-            else:
-                audio_opt = converted_chunks[0]
+    def convert_pieces(self, pieces, job, index, big_npy, batch_size):
+        """
+        Runs the embedder and the generator on prepared pieces.
 
-            if clean_audio:
-                cleaned_audio = self.remove_audio_noise(
-                    audio_opt, self.tgt_sr, clean_strength
-                )
-                if cleaned_audio is not None:
-                    audio_opt = cleaned_audio
+        Args:
+            pieces (list): (audio, pitch, pitchf) chunks, see `Pipeline.prepare`.
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+            index: FAISS index returned by `setup_group`.
+            big_npy: Retrieval vectors returned by `setup_group`.
+            batch_size (int): Number of chunks converted together in one forward pass.
+        """
+        sid = torch.tensor(job["sid"], device=self.config.device)
+        return self.vc.pipeline_batch(
+            self.hubert_model,
+            self.net_g,
+            sid.unsqueeze(0).long(),
+            pieces,
+            index,
+            big_npy,
+            job["index_rate"],
+            self.version,
+            job["protect"],
+            batch_size,
+        )
 
-            if post_process:
-                audio_opt = self.post_process_audio(
-                    audio_input=audio_opt,
-                    sample_rate=self.tgt_sr,
-                    **kwargs,
-                )
+    def finish_job(self, loaded, converted):
+        """
+        Joins the converted pieces of a job into the output audio.
 
-            sf.write(audio_output_path, audio_opt, self.tgt_sr, format="WAV")
-            output_path_format = audio_output_path.replace(
-                ".wav", f".{export_format.lower()}"
+        Args:
+            loaded (dict): The dict returned by `prepare_job`.
+            converted (list): The converted pieces, in the order of the prepared chunks.
+        """
+        job = loaded["job"]
+        converted_chunks = []
+        position = 0
+        for p in loaded["prepared"]:
+            count = len(p["pieces"])
+            converted_chunks.append(
+                self.vc.finish(
+                    p, converted[position : position + count], job["volume_envelope"]
+                )
             )
-            audio_output_path = self.convert_audio_format(
-                audio_output_path, output_path_format, export_format
+            position += count
+
+        if job["split_audio"]:
+            return merge_audio(
+                loaded["chunks"],
+                converted_chunks,
+                loaded["intervals"],
+                16000,
+                self.tgt_sr,
             )
+        return converted_chunks[0]
 
-            elapsed_time = time.time() - start_time
-            print(
-                f"Conversion completed at '{audio_output_path}' in {elapsed_time:.2f} seconds."
+    def save_audio(self, audio_opt, job):
+        """
+        Applies the optional cleaning and effects to converted audio and writes it to disk.
+
+        Returns the path of the written file.
+
+        Args:
+            audio_opt (numpy.ndarray): The converted audio at the target sampling rate.
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        return self.write_audio(self.apply_cleaning(audio_opt, job), job)
+
+    def apply_cleaning(self, audio_opt, job):
+        """
+        Applies the optional noise reduction of a job to converted audio.
+
+        Args:
+            audio_opt (numpy.ndarray): The converted audio at the target sampling rate.
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        if job["clean_audio"]:
+            cleaned_audio = self.remove_audio_noise(
+                audio_opt, self.tgt_sr, job["clean_strength"]
             )
-        except Exception as error:
-            print(f"An error occurred during audio conversion: {error}")
-            print(traceback.format_exc())
+            if cleaned_audio is not None:
+                audio_opt = cleaned_audio
+        return audio_opt
+
+    @staticmethod
+    def get_output_path(job):
+        """
+        Returns the path of the output file of a job, in its export format.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        export_format = job["export_format"]
+        return job["audio_output_path"].replace(".wav", f".{export_format.lower()}")
+
+    def write_audio(self, audio_opt, job):
+        """
+        Applies the effects of a job to converted audio and encodes it in its export format.
+
+        The cached effect chain and the encoder run block by block in one pass, and the
+        export format is written directly, without an intermediate WAV file. Returns the
+        path of the written file.
+
+        Args:
+            audio_opt (numpy.ndarray): The converted audio at the target sampling rate.
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        output_path = self.get_output_path(job)
+        export_format = job["export_format"]
+        if export_format != "WAV":
+            print(f"Saving audio as {export_format}...")
+        kwargs = job["kwargs"] if job["post_process"] else {}
+        with get_effect_chains().borrow(kwargs) as effects:
+            with PostProcessor(
+                output_path, self.tgt_sr, export_format, effects
+            ) as post:
+                post.run(audio_opt)
+        return output_path
 
     def convert_audio_batch(
         self,
         audio_input_paths: str,
         audio_output_path: str,
+        num_workers: int = 1,
         **kwargs,
     ):
         """
@@ -358,6 +819,7 @@ class VoiceConverter:
         Args:
             audio_input_paths (str): List of paths to the input audio files.
             audio_output_path (str): Path to the output audio file.
+            num_workers (int, optional): Number of worker processes converting files in parallel. Default is 1.
             resample_sr (int, optional): Resample sampling rate. Default is 0.
             sid (int, optional): Speaker ID. Default is 0.
             **kwargs: Additional keyword arguments.
@@ -370,48 +832,119 @@ class VoiceConverter:
                 pid_file.write(str(pid))
             start_time = time.time()
             print(f"Converting audio batch '{audio_input_paths}'...")
-            audio_files = [
-                f
-                for f in os.listdir(audio_input_paths)
-                if f.endswith(
-                    (
-                        "wav",
-                        "mp3",
-                        "flac",
-                        "ogg",
-                        "opus",
-                        "m4a",
-                        "mp4",
-                        "aac",
-                        "alac",
-                        "wma",
-                        "aiff",
-                        "webm",
-                        "ac3",
+            files = self.get_batch_files(
+                audio_input_paths,
+                audio_output_path,
+                kwargs.get("export_format", "WAV"),
+            )
+            print(f"Detected {len(files)} audio files for inference.")
+            failed = 0
+            if num_workers > 1 and len(files) > 1:
+                failed = self.convert_files_parallel(
+                    files, num_workers, backend=self.backend, **kwargs
+                )
+            elif files:
+                jobs = [
+                    self.get_job(
+                        audio_input_path=new_input,
+                        audio_output_path=new_output,
+                        **kwargs,
                     )
+                    for new_input, new_output in files
+                ]
+                batch_size = jobs[0].pop("batch_size")
+                for job in jobs[1:]:
+                    del job["batch_size"]
+                results = self.convert_jobs_cached(jobs, batch_size)
+                failed = sum(
+                    not result or isinstance(result, Exception) for result in results
                 )
-            ]
-            print(f"Detected {len(audio_files)} audio files for inference.")
-            for a in audio_files:
-                new_input = os.path.join(audio_input_paths, a)
-                new_output = os.path.splitext(a)[0] + "_output.wav"
-                new_output = os.path.join(audio_output_path, new_output)
-                if os.path.exists(new_output):
-                    continue
-                self.convert_audio(
-                    audio_input_path=new_input,
-                    audio_output_path=new_output,
-                    **kwargs,
+            if failed:
+                print(
+                    f"Conversion finished at '{audio_input_paths}', "
+                    f"but {failed} of {len(files)} files failed."
                 )
-            print(f"Conversion completed at '{audio_input_paths}'.")
+            else:
+                print(f"Conversion completed at '{audio_input_paths}'.")
             elapsed_time = time.time() - start_time
             print(f"Batch conversion completed in {elapsed_time:.2f} seconds.")
+            self.log_compile_stats()
         except Exception as error:
             print(f"An error occurred during audio batch conversion: {error}")
             print(traceback.format_exc())
         finally:
             os.remove(os.path.join(now_dir, "assets", "infer_pid.txt"))
 
+    @staticmethod
+    def get_batch_files(input_folder, output_folder, export_format="WAV"):
+        """
+        Returns the (input, output) paths of the audio files of a folder that have not
+        been converted yet, sorted by name.
+
+        Args:
+            input_folder (str): Path to the folder of input audio files.
+            output_folder (str): Path to the folder of converted files.
+            export_format (str, optional): Audio format of the converted files.
+        """
+        files = []
+        for name in sorted(os.listdir(input_folder)):
+            if not name.endswith(AUDIO_EXTENSIONS):
+                continue
+            output_path = os.path.join(
+                output_folder, os.path.splitext(name)[0] + "_output.wav"
+            )
+            # only the export format is written, not an intermediate WAV
+            job = {"audio_output_path": output_path, "export_format": export_format}
+            if os.path.exists(VoiceConverter.get_output_path(job)):
+                continue
+            files.append((os.path.join(input_folder, name), output_path))
+        return files
+
+    @staticmethod
+    def convert_files_parallel(files, num_workers, backend="torch", **kwargs):
+        """
+        Converts files in worker processes that each keep their own warm models.
+
+        Files are submitted largest first, one task each, so idle workers pick up the
+        next file from the shared queue and the long files do not end up last. Returns
+        the number of files that failed to convert.
+
+        Args:
+            files (list): (input path, output path) pairs to convert.
+            num_workers (int): Number of worker processes.
+            backend (str, optional): Inference backend of the workers.
+            **kwargs: Arguments of `convert_audio`.
+        """
+        num_workers = min(num_workers, len(files))
+        threads = max(1, (os.cpu_count() or 1) // num_workers)
+        files = sorted(files, key=lambda f: get_audio_duration(f[0]), reverse=True)
+        print(
+            f"Converting {len(files)} files with {num_workers} workers and {threads} threads each..."
+        )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_batch_worker,
+            initargs=(threads, backend, get_analysis_cache().get_settings()),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    convert_in_batch_worker,
+                    audio_input_path=new_input,
+                    audio_output_path=new_output,
+                    **kwargs,
+                )
+                for new_input, new_output in files
+            ]
+            failed = 0
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    failed += not future.result()
+                except Exception as error:
+                    print(f"An error occurred in a batch worker: {error}")
+                    failed += 1
+        return failed
+
     def get_vc(self, weight_root, sid):
         """
         Loads the voice conversion model and sets up the pipeline.
@@ -430,11 +963,15 @@ class VoiceConverter:
             if self.cpt is not None:
                 self.setup_network()
                 self.setup_vc_instance()
+            else:
+                self.net_g = None
             self.loaded_model = weight_root
 
     def cleanup_model(self):
         """
         Cleans up the model and releases resources.
+
+        The models stay in the model pool, so a later `get_vc` does not reload them.
         """
         if self.hubert_model is not None:
             del self.net_g, self.n_spk, self.vc, self.hubert_model, self.tgt_sr
@@ -445,48 +982,98 @@ class VoiceConverter:
         del self.net_g, self.cpt
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
-        self.cpt = None
+        self.net_g = self.cpt = None
+        self.loaded_model = None
+
+    def log_compile_stats(self):
+        """
+        Prints the compile time, cache hits and speedup of the compiled models in use.
+        """
+        for model in (self.hubert_model, self.net_g):
+            stats = getattr(model, "stats", None)
+            if stats is not None:
+                print(stats.summary())
 
     def load_model(self, weight_root):
         """
-        Loads the model weights from the specified path.
+        Fetches the prepared voice model for the specified path from the model pool.
 
         Args:
             weight_root (str): Path to the model weights.
         """
-        self.cpt = (
-            torch.load(weight_root, map_location="cpu", weights_only=True)
-            if os.path.isfile(weight_root)
-            else None
-        )
+        self.cpt = self.model_pool.get_voice(weight_root, self.backend)
 
     def setup_network(self):
         """
-        Sets up the network configuration based on the loaded checkpoint.
+        Sets up the network configuration based on the loaded voice model.
         """
         if self.cpt is not None:
-            self.tgt_sr = self.cpt["config"][-1]
-            self.cpt["config"][-3] = self.cpt["weight"]["emb_g.weight"].shape[0]
-            self.use_f0 = self.cpt.get("f0", 1)
-
-            self.version = self.cpt.get("version", "v1")
-            self.text_enc_hidden_dim = 768 if self.version == "v2" else 256
-            self.vocoder = self.cpt.get("vocoder", "HiFi-GAN")
-            self.net_g = Synthesizer(
-                *self.cpt["config"],
-                use_f0=self.use_f0,
-                text_enc_hidden_dim=self.text_enc_hidden_dim,
-                vocoder=self.vocoder,
-            )
-            del self.net_g.enc_q
-            self.net_g.load_state_dict(self.cpt["weight"], strict=False)
-            self.net_g = self.net_g.to(self.config.device).float()
-            self.net_g.eval()
+            self.tgt_sr = self.cpt.tgt_sr
+            self.use_f0 = self.cpt.use_f0
+            self.version = self.cpt.version
+            self.text_enc_hidden_dim = self.cpt.text_enc_hidden_dim
+            self.vocoder = self.cpt.vocoder
+            self.net_g = self.cpt.net_g
 
     def setup_vc_instance(self):
         """
         Sets up the voice conversion pipeline instance based on the target sampling rate and configuration.
+
+        An existing pipeline is retargeted instead of rebuilt, which keeps RMVPE loaded.
         """
         if self.cpt is not None:
-            self.vc = VC(self.tgt_sr, self.config)
-            self.n_spk = self.cpt["config"][-3]
+            if self.vc is None:
+                self.vc = VC(self.tgt_sr, self.config, backend=self.backend)
+            elif self.vc.tgt_sr != self.tgt_sr:
+                self.vc.tgt_sr = self.tgt_sr
+                self.vc.set_split_sizes(
+                    self.vc.x_pad, self.vc.x_query, self.vc.x_center, self.vc.x_max
+                )
+            self.n_spk = self.cpt.n_spk
+
+
+def get_audio_duration(path):
+    """
+    Returns the duration of an audio file in seconds.
+
+    Formats soundfile cannot read, such as m4a or webm, are read with audioread. If
+    that fails too, the duration is estimated from the file size.
+
+    Args:
+        path (str): Path to the audio file.
+    """
+    try:
+        return sf.info(path).duration
+    except (RuntimeError, OSError):
+        pass
+    try:
+        return librosa.get_duration(filename=path)
+    except Exception as error:
+        print(f"An error occurred reading the duration of '{path}': {error}")
+    try:
+        return os.path.getsize(path) / COMPRESSED_BYTES_PER_SECOND
+    except OSError:
+        return 0
+
+
+_batch_worker_converter = None
+
+
+def init_batch_worker(threads, backend="torch", analysis_cache=None):
+    """
+    Pins the torch thread count of a batch worker process and creates its converter.
+
+    Args:
+        threads (int): Number of intra-op threads for this worker.
+        backend (str, optional): Inference backend of the converter.
+        analysis_cache (dict, optional): Settings of the parent's analysis cache, see `AnalysisCache.get_settings`.
+    """
+    global _batch_worker_converter
+    torch.set_num_threads(threads)
+    if analysis_cache:
+        get_analysis_cache(**analysis_cache)
+    _batch_worker_converter = VoiceConverter(backend)
+
+
+def convert_in_batch_worker(**kwargs):
+    return _batch_worker_converter.convert_audio(**kwargs)
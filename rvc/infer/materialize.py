@@ -0,0 +1,253 @@
+import os
+import sys
+import copy
+import torch
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.algorithm.synthesizers import Synthesizer
+from rvc.lib.model_format import load_checkpoint
+
+ARTIFACT_SUFFIX = ".infer.pt"
+ARTIFACT_VERSION = 1
+EQUIVALENCE_FRAMES = 64
+EQUIVALENCE_ATOL = 1e-3
+
+
+def get_artifact_path(model_path):
+    """
+    Returns the path of the inference artifact stored next to a voice model checkpoint.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+    """
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def get_source_stamp(model_path):
+    stat = os.stat(model_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def build_synthesizer(cpt):
+    """
+    Builds the generator network of a checkpoint, as trained, without the posterior encoder.
+
+    Returns the network and the metadata needed to rebuild it.
+
+    Args:
+        cpt (dict): The loaded voice model checkpoint.
+    """
+    cpt["config"][-3] = cpt["weight"]["emb_g.weight"].shape[0]
+    metadata = {
+        "config": list(cpt["config"]),
+        "use_f0": cpt.get("f0", 1),
+        "version": cpt.get("version", "v1"),
+        "vocoder": cpt.get("vocoder", "HiFi-GAN"),
+    }
+    net_g = create_synthesizer(metadata)
+    del net_g.enc_q
+    net_g.load_state_dict(cpt["weight"], strict=False)
+    return net_g.float().eval(), metadata
+
+
+def create_synthesizer(metadata):
+    return Synthesizer(
+        *metadata["config"],
+        use_f0=metadata["use_f0"],
+        text_enc_hidden_dim=768 if metadata["version"] == "v2" else 256,
+        vocoder=metadata["vocoder"],
+    )
+
+
+def get_rate_head(frames, rate):
+    """
+    Returns the number of leading frames `Synthesizer.infer` drops to decode only `rate`.
+
+    Backends that cannot cut the latent inside their graph decode every frame and drop
+    the audio of these frames instead, which gives outputs of the same length.
+
+    Args:
+        frames (int): Number of feature frames of the input.
+        rate (torch.Tensor): Fraction of the frames to decode, from the end.
+    """
+    return int(frames * (1.0 - rate.item()))
+
+
+def get_test_inputs(metadata, frames=EQUIVALENCE_FRAMES, seed=0, device="cpu"):
+    """
+    Returns random `Synthesizer.infer` inputs: features, lengths, pitch, pitchf and sid.
+
+    Pitch and pitchf are None for models without pitch guidance.
+
+    Args:
+        metadata (dict): Metadata returned by `build_synthesizer`.
+        frames (int, optional): Number of feature frames.
+        seed (int, optional): Seed of the random inputs.
+        device (str, optional): Device of the returned tensors.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    hidden_dim = 768 if metadata["version"] == "v2" else 256
+    phone = torch.randn(1, frames, hidden_dim, generator=generator).to(device)
+    lengths = torch.tensor([frames], device=device).long()
+    sid = torch.tensor([0], device=device).long()
+    pitch = pitchf = None
+    if metadata["use_f0"]:
+        pitch = torch.randint(1, 255, (1, frames), generator=generator).to(device)
+        pitchf = (torch.rand(1, frames, generator=generator) * 400 + 100).to(device)
+    return phone, lengths, pitch, pitchf, sid
+
+
+def check_equivalence(
+    reference,
+    optimized,
+    metadata,
+    frames=EQUIVALENCE_FRAMES,
+    atol=EQUIVALENCE_ATOL,
+    seed=0,
+):
+    """
+    Runs both networks on the same random input and compares their outputs.
+
+    `Synthesizer.infer` samples noise, so both runs start from the same random seed.
+    Returns whether the outputs match within `atol` and the largest absolute difference.
+
+    Args:
+        reference (Synthesizer): The network as trained.
+        optimized (Synthesizer): The network after `prepare_for_inference`.
+        metadata (dict): Metadata returned by `build_synthesizer`.
+        frames (int, optional): Number of feature frames of the test input.
+        atol (float, optional): Largest accepted absolute difference.
+        seed (int, optional): Seed of the test input and of the sampled noise.
+    """
+    device = next(optimized.parameters()).device
+    phone, lengths, pitch, pitchf, sid = get_test_inputs(metadata, frames, seed, device)
+
+    outputs = []
+    for net_g in (reference, optimized):
+        with torch.random.fork_rng(devices=[device] if device.type == "cuda" else []):
+            torch.manual_seed(seed)
+            with torch.no_grad():
+                outputs.append(net_g.infer(phone, lengths, pitch, pitchf, sid)[0])
+    max_diff = (outputs[0] - outputs[1]).abs().max().item()
+    return max_diff <= atol, max_diff
+
+
+def load_artifact(model_path):
+    """
+    Loads the inference artifact of a checkpoint if it exists and is up to date.
+
+    Returns the prepared network and its metadata, or None.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+    """
+    artifact_path = get_artifact_path(model_path)
+    if not os.path.isfile(artifact_path):
+        return None
+    try:
+        artifact = torch.load(artifact_path, map_location="cpu", weights_only=True)
+        current = (ARTIFACT_VERSION, get_source_stamp(model_path))
+        if (artifact.get("artifact_version"), artifact.get("source")) != current:
+            return None
+        metadata = artifact["metadata"]
+        net_g = create_synthesizer(metadata).prepare_for_inference()
+        net_g.load_state_dict(artifact["weight"])
+        return net_g.float(), metadata
+    except Exception as error:
+        print(f"An error occurred loading the inference artifact: {error}")
+        return None
+
+
+def save_artifact(model_path, net_g, metadata):
+    """
+    Stores a prepared network next to its checkpoint.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        net_g (Synthesizer): The network after `prepare_for_inference`.
+        metadata (dict): Metadata returned by `build_synthesizer`.
+    """
+    artifact_path = get_artifact_path(model_path)
+    tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+    try:
+        torch.save(
+            {
+                "artifact_version": ARTIFACT_VERSION,
+                "source": get_source_stamp(model_path),
+                "metadata": metadata,
+                "weight": {k: v.cpu() for k, v in net_g.state_dict().items()},
+            },
+            tmp_path,
+        )
+        os.replace(tmp_path, artifact_path)
+    except Exception as error:
+        print(f"An error occurred saving the inference artifact: {error}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def materialize_voice(
+    model_path, device="cpu", optimize=True, cache=False, verify=False
+):
+    """
+    Returns the generator network of a checkpoint, ready for inference, and its metadata.
+
+    With `optimize`, weight norm is folded and training-only modules are dropped (see
+    `Synthesizer.prepare_for_inference`). With `cache`, the result is stored next to the
+    checkpoint as `<model>.infer.pt` after passing `check_equivalence`, and later calls load
+    it directly. With `verify`, the equivalence check also runs when nothing is cached. If
+    the check fails, the unoptimized network is returned.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        device (str, optional): Device the network is moved to.
+        optimize (bool, optional): Whether to prepare the network for inference.
+        cache (bool, optional): Whether to load and store the inference artifact.
+        verify (bool, optional): Whether to check the optimized network against the original.
+    """
+    if optimize and cache:
+        loaded = load_artifact(model_path)
+        if loaded is not None:
+            net_g, metadata = loaded
+            return net_g.to(device), metadata
+
+    cpt = load_checkpoint(model_path)
+    net_g, metadata = build_synthesizer(cpt)
+    del cpt
+    if optimize:
+        reference = copy.deepcopy(net_g) if cache or verify else None
+        net_g = net_g.prepare_for_inference()
+        if reference is not None:
+            equivalent, max_diff = check_equivalence(reference, net_g, metadata)
+            if not equivalent:
+                print(
+                    f"The optimized model differs from '{model_path}' by {max_diff:.2e}; "
+                    "using the original model."
+                )
+                net_g = reference
+            elif cache:
+                save_artifact(model_path, net_g, metadata)
+            del reference
+    return net_g.to(device), metadata
+
+
+def optimize_model(model_path):
+    """
+    Writes the inference artifact of a checkpoint once it passes the equivalence check.
+
+    Returns a message describing the result.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+    """
+    cpt = load_checkpoint(model_path)
+    reference, metadata = build_synthesizer(cpt)
+    del cpt
+    optimized = copy.deepcopy(reference).prepare_for_inference()
+    equivalent, max_diff = check_equivalence(reference, optimized, metadata)
+    if not equivalent:
+        return f"The optimized model differs from the original by {max_diff:.2e}; no artifact was written."
+    save_artifact(model_path, optimized, metadata)
+    return f"Optimized model saved to '{get_artifact_path(model_path)}' (max difference {max_diff:.2e})."
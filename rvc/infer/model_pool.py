@@ -0,0 +1,445 @@
+import os
+import sys
+import time
+import torch
+import threading
+from collections import OrderedDict
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.utils import get_embedder_path, load_embedding
+from rvc.infer.materialize import materialize_voice
+from rvc.infer.onnx_backend import (
+    ONNX_EXTENSION,
+    load_onnx_voice,
+    load_onnx_embedder,
+)
+from rvc.infer.quantize import load_quantized_voice, load_quantized_embedder
+from rvc.infer.compiled import compile_voice, compile_embedder
+
+DEFAULT_MAX_MEMORY_MB = 4096
+
+
+class VoiceModel:
+    """
+    A prepared voice model together with the checkpoint metadata needed for inference.
+
+    Args:
+        net_g (Synthesizer): The generator network, already on the target device.
+        tgt_sr (int): Sampling rate of the generated audio.
+        use_f0 (int): Whether the model uses pitch guidance.
+        version (str): Model version ("v1" or "v2").
+        vocoder (str): Vocoder of the model.
+        n_spk (int): Number of speakers in the model.
+    """
+
+    def __init__(self, net_g, tgt_sr, use_f0, version, vocoder, n_spk):
+        self.net_g = net_g
+        self.tgt_sr = tgt_sr
+        self.use_f0 = use_f0
+        self.version = version
+        self.text_enc_hidden_dim = 768 if version == "v2" else 256
+        self.vocoder = vocoder
+        self.n_spk = n_spk
+
+
+class ModelPool:
+    """
+    A process-wide LRU pool of prepared voice models and embedders.
+
+    Voice models are keyed by the real path and modification time of the checkpoint, so a
+    retrained model is reloaded automatically; embedders are keyed by name (and path for
+    custom embedders). The size of an entry is the memory held by its parameters and
+    buffers. Once the pool exceeds its budget, the least recently used unpinned entries are
+    evicted. Entries only hold the prepared modules, never the raw checkpoint.
+
+    Voice models are prepared for inference when loaded (see `materialize_voice`). With the
+    "onnx" backend, voice models and embedders run on ONNX Runtime instead (see
+    `load_onnx_voice`); `.onnx` voice models always do. With the "int8" backend, they are
+    quantized for the CPU (see `load_quantized_voice`). With the "compile" backend, they
+    run as inductor graphs compiled for a set of input lengths (see `compile_voice`).
+    Several backends of a model can be pooled at once; the size of an ONNX or int8 entry
+    is the size of its file.
+
+    Args:
+        max_memory_mb (float): Memory budget for the pooled models in megabytes.
+        device (str): Device the models are moved to.
+        optimize (bool): Whether to fold weight norm and drop training-only modules.
+        cache_artifacts (bool): Whether to store prepared models next to their checkpoints.
+        verify (bool): Whether to check every prepared model against the original.
+    """
+
+    def __init__(
+        self,
+        max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+        device="cpu",
+        optimize=True,
+        cache_artifacts=False,
+        verify=False,
+    ):
+        self.max_memory = int(max_memory_mb * 1024**2)
+        self.device = device
+        self.optimize = optimize
+        self.cache_artifacts = cache_artifacts
+        self.verify = verify
+        self.entries = OrderedDict()
+        self.pinned = set()
+        self.memory = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "load_time": 0.0}
+        self.lock = threading.RLock()
+
+    def configure(
+        self, max_memory_mb=None, optimize=None, cache_artifacts=None, verify=None
+    ):
+        """
+        Updates the pool settings, evicting entries if the new budget is smaller.
+
+        Changing how models are prepared only affects models loaded afterwards.
+
+        Args:
+            max_memory_mb (float, optional): New memory budget in megabytes.
+            optimize (bool, optional): Whether to fold weight norm and drop training-only modules.
+            cache_artifacts (bool, optional): Whether to store prepared models next to their checkpoints.
+            verify (bool, optional): Whether to check every prepared model against the original.
+        """
+        with self.lock:
+            if optimize is not None:
+                self.optimize = optimize
+            if cache_artifacts is not None:
+                self.cache_artifacts = cache_artifacts
+            if verify is not None:
+                self.verify = verify
+            if max_memory_mb is not None:
+                self.max_memory = int(max_memory_mb * 1024**2)
+                self._enforce_budget()
+
+    @staticmethod
+    def get_voice_key(model_path, backend="torch"):
+        if model_path.endswith(ONNX_EXTENSION):
+            backend = "onnx"
+        return (
+            "voice",
+            backend,
+            os.path.realpath(model_path),
+            os.stat(model_path).st_mtime_ns,
+        )
+
+    @staticmethod
+    def get_embedder_key(embedder_model, embedder_model_custom=None, backend="torch"):
+        if embedder_model == "custom":
+            return (
+                "embedder",
+                backend,
+                embedder_model,
+                os.path.realpath(embedder_model_custom),
+            )
+        return ("embedder", backend, embedder_model, None)
+
+    @staticmethod
+    def get_module_size(module):
+        # quantized weights are packed outside of parameters(), so their file size is used
+        memory_size = getattr(module, "memory_size", None)
+        if memory_size is not None:
+            return memory_size
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+    def get_voice(self, model_path, backend="torch"):
+        """
+        Returns the prepared voice model for a checkpoint, loading it on a pool miss.
+
+        Args:
+            model_path (str): Path to the voice model checkpoint.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        if not os.path.isfile(model_path):
+            return None
+        return self._get(
+            self.get_voice_key(model_path, backend),
+            self.load_voice,
+            model_path,
+            backend,
+        )
+
+    def get_embedder(self, embedder_model, embedder_model_custom=None, backend="torch"):
+        """
+        Returns the prepared embedder, loading it on a pool miss.
+
+        Args:
+            embedder_model (str): Name of the embedder model.
+            embedder_model_custom (str, optional): Path to the custom embedder model.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        return self._get(
+            self.get_embedder_key(embedder_model, embedder_model_custom, backend),
+            self.load_embedder,
+            embedder_model,
+            embedder_model_custom,
+            backend,
+        )
+
+    def _get(self, key, loader, *args):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+
+            self.stats["misses"] += 1
+            start_time = time.time()
+            model = loader(*args)
+            self.stats["load_time"] += time.time() - start_time
+            module = model.net_g if isinstance(model, VoiceModel) else model
+            size = self.get_module_size(module)
+
+            # a checkpoint rewritten on disk replaces its stale entry; only voice keys
+            # end with the modification time, the rest of a key is its identity
+            stale_keys = [
+                k for k in self.entries if key[0] == "voice" and k[:3] == key[:3]
+            ]
+            for stale_key in stale_keys:
+                self.pinned.discard(stale_key)
+                self._evict(stale_key)
+            self.entries[key] = (model, size)
+            self.memory += size
+            self._enforce_budget()
+            return model
+
+    def get_device_backend(self, backend):
+        if backend == "int8" and str(self.device) != "cpu":
+            print("The int8 backend only runs on the CPU; using the float models.")
+            return "torch"
+        return backend
+
+    def load_voice(self, model_path, backend="torch"):
+        """
+        Builds the generator network of a voice model checkpoint, prepared for inference.
+
+        Args:
+            model_path (str): Path to the voice model checkpoint.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        backend = self.get_device_backend(backend)
+        if backend == "onnx" or model_path.endswith(ONNX_EXTENSION):
+            net_g, metadata = load_onnx_voice(model_path, self.device)
+        elif backend == "int8":
+            net_g, metadata = load_quantized_voice(model_path)
+        else:
+            net_g, metadata = materialize_voice(
+                model_path,
+                self.device,
+                optimize=self.optimize,
+                cache=self.cache_artifacts,
+                verify=self.verify,
+            )
+            if backend == "compile":
+                net_g = compile_voice(net_g, metadata)
+        config = metadata["config"]
+        return VoiceModel(
+            net_g,
+            config[-1],
+            metadata["use_f0"],
+            metadata["version"],
+            metadata["vocoder"],
+            config[-3],
+        )
+
+    def load_embedder(
+        self, embedder_model, embedder_model_custom=None, backend="torch"
+    ):
+        """
+        Loads an embedder model.
+
+        Args:
+            embedder_model (str): Name of the embedder model.
+            embedder_model_custom (str, optional): Path to the custom embedder model.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        backend = self.get_device_backend(backend)
+        if backend == "onnx":
+            model = load_onnx_embedder(
+                embedder_model, embedder_model_custom, self.device
+            )
+        elif backend == "int8":
+            model = load_quantized_embedder(embedder_model, embedder_model_custom)
+        else:
+            model = load_embedding(embedder_model, embedder_model_custom)
+            model = model.to(self.device).float()
+            model.eval()
+            if backend == "compile":
+                model = compile_embedder(model)
+        # the analysis cache keys features by the embedder that computed them
+        model.analysis_id = self.get_embedder_identity(
+            embedder_model, embedder_model_custom, backend
+        )
+        return model
+
+    @staticmethod
+    def get_embedder_identity(embedder_model, embedder_model_custom, backend):
+        """
+        Returns the backend and the path, modification time and size of every file of an
+        embedder, which change whenever its weights or numerics do.
+
+        Args:
+            embedder_model (str): Name of the embedder model.
+            embedder_model_custom (str, optional): Path to the custom embedder model.
+            backend (str): Inference backend the embedder was loaded for.
+        """
+        path = os.path.realpath(
+            get_embedder_path(embedder_model, embedder_model_custom)
+        )
+        paths = [path]
+        if os.path.isdir(path):
+            paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        files = []
+        for file_path in paths:
+            if os.path.isfile(file_path):
+                stat = os.stat(file_path)
+                files.append((file_path, stat.st_mtime_ns, stat.st_size))
+        return (backend, tuple(files))
+
+    def preload(self, model_paths=(), embedder_models=(), pin=False, backend="torch"):
+        """
+        Loads voice models and embedders ahead of their first use.
+
+        Args:
+            model_paths (list, optional): Paths to voice model checkpoints.
+            embedder_models (list, optional): Embedder names, or (name, custom path) tuples.
+            pin (bool, optional): Whether to pin the loaded models against eviction.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        for model_path in model_paths:
+            self.get_voice(model_path, backend)
+            if pin:
+                self.pin(model_path, backend)
+        for embedder in embedder_models:
+            embedder = (embedder,) if isinstance(embedder, str) else tuple(embedder)
+            embedder += (None,) * (2 - len(embedder))
+            self.get_embedder(*embedder, backend)
+            if pin:
+                self.pin_embedder(*embedder, backend)
+
+    def pin(self, model_path, backend="torch"):
+        """
+        Keeps a voice model in the pool regardless of the memory budget.
+
+        Args:
+            model_path (str): Path to the voice model checkpoint.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        with self.lock:
+            self.pinned.add(self.get_voice_key(model_path, backend))
+
+    def pin_embedder(self, embedder_model, embedder_model_custom=None, backend="torch"):
+        """
+        Keeps an embedder in the pool regardless of the memory budget.
+
+        Args:
+            embedder_model (str): Name of the embedder model.
+            embedder_model_custom (str, optional): Path to the custom embedder model.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        with self.lock:
+            self.pinned.add(
+                self.get_embedder_key(embedder_model, embedder_model_custom, backend)
+            )
+
+    def unpin(
+        self,
+        model_path=None,
+        embedder_model=None,
+        embedder_model_custom=None,
+        backend="torch",
+    ):
+        """
+        Makes a pinned voice model or embedder evictable again.
+
+        Args:
+            model_path (str, optional): Path to the voice model checkpoint.
+            embedder_model (str, optional): Name of the embedder model.
+            embedder_model_custom (str, optional): Path to the custom embedder model.
+            backend (str, optional): Inference backend, "torch", "onnx", "int8" or "compile".
+        """
+        with self.lock:
+            if model_path is not None:
+                self.pinned.discard(self.get_voice_key(model_path, backend))
+            if embedder_model is not None:
+                self.pinned.discard(
+                    self.get_embedder_key(
+                        embedder_model, embedder_model_custom, backend
+                    )
+                )
+            self._enforce_budget()
+
+    def get_stats(self):
+        """
+        Returns the hit, miss and eviction counters together with the current pool usage.
+        """
+        with self.lock:
+            requests = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / requests if requests else 0.0,
+                "entries": len(self.entries),
+                "pinned": len(self.pinned),
+                "memory_mb": self.memory / 1024**2,
+                "max_memory_mb": self.max_memory / 1024**2,
+            }
+
+    def clear(self):
+        """
+        Removes every entry from the pool, including pinned ones.
+        """
+        with self.lock:
+            self.pinned.clear()
+            for key in list(self.entries):
+                self._evict(key)
+
+    def _evict(self, key):
+        _, size = self.entries.pop(key)
+        self.memory -= size
+        self.stats["evictions"] += 1
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _enforce_budget(self):
+        # The most recently used entry is always kept, even if it exceeds the budget alone.
+        for key in list(self.entries)[:-1]:
+            if self.memory <= self.max_memory:
+                break
+            if key not in self.pinned:
+                self._evict(key)
+
+
+_model_pool = None
+_model_pool_lock = threading.Lock()
+
+
+def get_model_pool(
+    max_memory_mb=None, device=None, optimize=None, cache_artifacts=None, verify=None
+):
+    """
+    Returns the process-wide model pool, creating it on first use.
+
+    Args:
+        max_memory_mb (float, optional): Memory budget for the pooled models in megabytes.
+        device (str, optional): Device the models are moved to.
+        optimize (bool, optional): Whether to fold weight norm and drop training-only modules.
+        cache_artifacts (bool, optional): Whether to store prepared models next to their checkpoints.
+        verify (bool, optional): Whether to check every prepared model against the original.
+    """
+    global _model_pool
+    with _model_pool_lock:
+        if _model_pool is None:
+            _model_pool = ModelPool(
+                max_memory_mb if max_memory_mb is not None else DEFAULT_MAX_MEMORY_MB,
+                device or "cpu",
+                optimize if optimize is not None else True,
+                bool(cache_artifacts),
+                bool(verify),
+            )
+        else:
+            _model_pool.configure(max_memory_mb, optimize, cache_artifacts, verify)
+        return _model_pool
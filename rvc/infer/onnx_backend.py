@@ -0,0 +1,523 @@
+import os
+import sys
+import time
+import numpy as np
+import torch
+from types import SimpleNamespace
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.materialize import (
+    build_synthesizer,
+    get_rate_head,
+    get_source_stamp,
+    get_test_inputs,
+    materialize_voice,
+)
+from rvc.lib.model_format import load_checkpoint, encode_metadata, decode_metadata
+from rvc.lib.predictors.RMVPE import E2E, N_MELS, RMVPE0Predictor
+from rvc.lib.predictors.registry import RMVPE_PATH
+from rvc.lib.utils import get_embedder_path, HubertModelWithFinalProj
+
+ONNX_EXTENSION = ".onnx"
+OPSET_VERSION = 17
+EMBEDDER_ONNX_NAME = "model.onnx"
+RMVPE_ONNX_PATH = os.path.join("rvc", "models", "predictors", "rmvpe.onnx")
+EXPORT_FRAMES = 200
+PARITY_ATOL = 1e-3
+
+
+def import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as error:
+        raise ImportError(
+            "The ONNX backend requires onnxruntime: pip install onnx onnxruntime"
+        ) from error
+    return onnxruntime
+
+
+def create_session(path):
+    """
+    Opens an exported graph on ONNX Runtime's CPU execution provider.
+
+    The session uses as many intra-op threads as torch, so batch workers that pin their
+    torch thread count (see `init_batch_worker`) pin ONNX Runtime too.
+
+    Args:
+        path (str): Path to the ONNX file.
+    """
+    onnxruntime = import_onnxruntime()
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = torch.get_num_threads()
+    return onnxruntime.InferenceSession(
+        path, options, providers=["CPUExecutionProvider"]
+    )
+
+
+class OnnxModule:
+    """
+    An exported graph that takes and returns torch tensors, like the module it replaces.
+
+    Inputs are copied to the CPU for ONNX Runtime and outputs are moved to `device`, so
+    the rest of the pipeline runs unchanged.
+
+    Args:
+        path (str): Path to the ONNX file.
+        device (str, optional): Device the outputs are moved to.
+    """
+
+    def __init__(self, path, device="cpu"):
+        self.path = path
+        self.device = device
+        self.session = create_session(path)
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        self.output_names = [node.name for node in self.session.get_outputs()]
+        self.metadata = decode_metadata(
+            self.session.get_modelmeta().custom_metadata_map
+        )
+        self.memory_size = os.path.getsize(path)
+
+    def run(self, **inputs):
+        # the exporter drops inputs a graph does not use
+        feeds = {
+            name: tensor.detach().cpu().contiguous().numpy()
+            for name, tensor in inputs.items()
+            if name in self.input_names
+        }
+        outputs = self.session.run(self.output_names, feeds)
+        return [torch.from_numpy(output).to(self.device) for output in outputs]
+
+    def __call__(self, *inputs):
+        outputs = self.run(**dict(zip(self.input_names, inputs)))
+        return outputs[0] if len(outputs) == 1 else outputs
+
+    def to(self, device):
+        self.device = device
+        return self
+
+    def eval(self):
+        return self
+
+
+class OnnxEmbedder(OnnxModule):
+    """
+    An exported HuBERT/ContentVec embedder with the interface `Pipeline.extract_features` uses.
+
+    The graph returns the last hidden state together with its final projection, which
+    v1 models use instead of the hidden state.
+
+    Args:
+        path (str): Path to the ONNX file.
+        device (str, optional): Device the outputs are moved to.
+    """
+
+    def __init__(self, path, device="cpu"):
+        super().__init__(path, device)
+        self.config = SimpleNamespace(
+            _name_or_path=path,
+            conv_kernel=self.metadata["conv_kernel"],
+            conv_stride=self.metadata["conv_stride"],
+        )
+
+    def __call__(self, source, attention_mask=None):
+        if attention_mask is None:
+            attention_mask = torch.ones(source.shape, dtype=torch.long)
+        hidden, projected = self.run(source=source, attention_mask=attention_mask)
+        return {"last_hidden_state": hidden, "final_proj": projected}
+
+    def _get_feat_extract_output_lengths(self, input_lengths):
+        for kernel_size, stride in zip(
+            self.config.conv_kernel, self.config.conv_stride
+        ):
+            input_lengths = (input_lengths - kernel_size) // stride + 1
+        return input_lengths
+
+
+class OnnxSynthesizer(OnnxModule):
+    """
+    An exported voice model with the `Synthesizer.infer` interface.
+
+    The prior noise is sampled here, unless given, and fed to the graph; the noise of the
+    vocoder's harmonic source is sampled inside the graph. With `rate`, the graph decodes
+    every frame and the audio of the frames before the decoded tail is dropped.
+
+    Args:
+        path (str): Path to the ONNX file.
+        device (str, optional): Device the outputs are moved to.
+    """
+
+    def __init__(self, path, device="cpu"):
+        super().__init__(path, device)
+        if "config" not in self.metadata:
+            raise ValueError(f"'{path}' was not exported with `export_synthesizer`.")
+        self.use_f0 = self.metadata["use_f0"]
+        self.inter_channels = self.metadata["config"][2]
+
+    def infer(
+        self,
+        phone,
+        phone_lengths,
+        pitch=None,
+        nsff0=None,
+        sid=None,
+        rate=None,
+        noise=None,
+    ):
+        if noise is None:
+            noise = torch.randn(phone.shape[0], self.inter_channels, phone.shape[1])
+        inputs = {
+            "phone": phone,
+            "phone_lengths": phone_lengths,
+            "sid": sid,
+            "noise": noise,
+        }
+        if self.use_f0:
+            inputs.update({"pitch": pitch, "pitchf": nsff0})
+        (audio,) = self.run(**inputs)
+        if rate is not None:
+            frames = phone.shape[1]
+            head = get_rate_head(frames, rate) * (audio.shape[-1] // frames)
+            audio = audio[..., head:]
+        return audio, None, None
+
+
+class EmbedderExport(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, source, attention_mask):
+        hidden = self.model(source, attention_mask=attention_mask)["last_hidden_state"]
+        return hidden, self.model.final_proj(hidden)
+
+
+class SynthesizerExport(torch.nn.Module):
+    def __init__(self, net_g):
+        super().__init__()
+        self.net_g = net_g
+
+    def forward(self, phone, phone_lengths, sid, noise, pitch=None, pitchf=None):
+        return self.net_g.infer(phone, phone_lengths, pitch, pitchf, sid, noise=noise)[
+            0
+        ]
+
+
+def get_onnx_path(model_path):
+    """
+    Returns the path of the ONNX export stored next to a voice model checkpoint.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+    """
+    return os.path.splitext(model_path)[0] + ONNX_EXTENSION
+
+
+def export_graph(
+    module, args, output_path, input_names, output_names, dynamic_axes, metadata
+):
+    import onnx
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                module,
+                args,
+                tmp_path,
+                input_names=input_names,
+                output_names=output_names,
+                dynamic_axes=dynamic_axes,
+                opset_version=OPSET_VERSION,
+                do_constant_folding=True,
+            )
+        graph = onnx.load(tmp_path)
+        for key, value in encode_metadata(metadata).items():
+            entry = graph.metadata_props.add()
+            entry.key, entry.value = key, value
+        onnx.save(graph, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def export_synthesizer(model_path, output_path=None, net_g=None, metadata=None):
+    """
+    Exports `Synthesizer.infer` of a voice model, with dynamic batch and time axes.
+
+    The graph takes the prior noise as its "noise" input and stores the checkpoint
+    metadata, so the ONNX file alone is enough to run the model. Returns the written path.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        output_path (str, optional): Path of the ONNX file, defaults to `get_onnx_path`.
+        net_g (Synthesizer, optional): Prepared network to export instead of loading the checkpoint.
+        metadata (dict, optional): Metadata of `net_g`, as returned by `build_synthesizer`.
+    """
+    if net_g is None:
+        cpt = load_checkpoint(model_path)
+        net_g, metadata = build_synthesizer(cpt)
+        del cpt
+        net_g = net_g.prepare_for_inference()
+    phone, lengths, pitch, pitchf, sid = get_test_inputs(metadata, EXPORT_FRAMES)
+    noise = torch.randn(1, metadata["config"][2], EXPORT_FRAMES)
+    args = (phone, lengths, sid, noise)
+    input_names = ["phone", "phone_lengths", "sid", "noise"]
+    dynamic_axes = {
+        "phone": {0: "batch", 1: "frames"},
+        "phone_lengths": {0: "batch"},
+        "sid": {0: "batch"},
+        "noise": {0: "batch", 2: "frames"},
+        "audio": {0: "batch", 2: "samples"},
+    }
+    if metadata["use_f0"]:
+        args += (pitch, pitchf)
+        input_names += ["pitch", "pitchf"]
+        dynamic_axes["pitch"] = {0: "batch", 1: "frames"}
+        dynamic_axes["pitchf"] = {0: "batch", 1: "frames"}
+    return export_graph(
+        SynthesizerExport(net_g.cpu().float().eval()),
+        args,
+        output_path or get_onnx_path(model_path),
+        input_names,
+        ["audio"],
+        dynamic_axes,
+        {**metadata, "source": get_source_stamp(model_path)},
+    )
+
+
+def export_embedder(embedder_model, embedder_model_custom=None, output_path=None):
+    """
+    Exports a HuBERT/ContentVec embedder, with dynamic batch and time axes.
+
+    Returns the written path, `model.onnx` in the embedder folder by default.
+
+    Args:
+        embedder_model (str): Name of the embedder model.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+        output_path (str, optional): Path of the ONNX file.
+    """
+    folder = get_embedder_path(embedder_model, embedder_model_custom)
+    model = HubertModelWithFinalProj.from_pretrained(folder).float().eval()
+    source = torch.randn(1, 32000)
+    attention_mask = torch.ones(1, 32000, dtype=torch.long)
+    return export_graph(
+        EmbedderExport(model),
+        (source, attention_mask),
+        output_path or os.path.join(folder, EMBEDDER_ONNX_NAME),
+        ["source", "attention_mask"],
+        ["last_hidden_state", "final_proj"],
+        {
+            "source": {0: "batch", 1: "samples"},
+            "attention_mask": {0: "batch", 1: "samples"},
+            "last_hidden_state": {0: "batch", 1: "frames"},
+            "final_proj": {0: "batch", 1: "frames"},
+        },
+        {
+            "conv_kernel": list(model.config.conv_kernel),
+            "conv_stride": list(model.config.conv_stride),
+        },
+    )
+
+
+def export_rmvpe(output_path=RMVPE_ONNX_PATH):
+    """
+    Exports the RMVPE `E2E` network, with dynamic batch and time axes.
+
+    The graph maps a mel spectrogram padded to a multiple of 32 frames to the pitch
+    salience, like `RMVPE0Predictor.mel2hidden` expects. Returns the written path.
+
+    Args:
+        output_path (str, optional): Path of the ONNX file.
+    """
+    model = E2E(4, 1, (2, 2))
+    model.load_state_dict(torch.load(RMVPE_PATH, map_location="cpu", weights_only=True))
+    mel = torch.randn(1, N_MELS, 128)
+    return export_graph(
+        model.eval(),
+        (mel,),
+        output_path,
+        ["mel"],
+        ["hidden"],
+        {"mel": {0: "batch", 2: "frames"}, "hidden": {0: "batch", 1: "frames"}},
+        {},
+    )
+
+
+def export_onnx(model_path, embedder_model="contentvec", embedder_model_custom=None):
+    """
+    Exports the voice model, its embedder and RMVPE, returning the written paths.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        embedder_model (str, optional): Name of the embedder model.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+    """
+    return [
+        export_synthesizer(model_path),
+        export_embedder(embedder_model, embedder_model_custom),
+        export_rmvpe(),
+    ]
+
+
+def load_onnx_voice(model_path, device="cpu"):
+    """
+    Returns the ONNX Runtime network of a voice model and its metadata.
+
+    Checkpoints are exported on first use, and again whenever they change; ONNX files
+    are loaded as they are.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint or its ONNX export.
+        device (str, optional): Device the outputs are moved to.
+    """
+    if model_path.endswith(ONNX_EXTENSION):
+        net_g = OnnxSynthesizer(model_path, device)
+        return net_g, net_g.metadata
+
+    onnx_path = get_onnx_path(model_path)
+    net_g = OnnxSynthesizer(onnx_path, device) if os.path.isfile(onnx_path) else None
+    if net_g is None or net_g.metadata.get("source") != get_source_stamp(model_path):
+        print(f"Exporting '{model_path}' to ONNX...")
+        net_g = OnnxSynthesizer(export_synthesizer(model_path, onnx_path), device)
+    return net_g, net_g.metadata
+
+
+def load_onnx_embedder(embedder_model, embedder_model_custom=None, device="cpu"):
+    """
+    Returns the ONNX Runtime network of an embedder, exporting it on first use.
+
+    Args:
+        embedder_model (str): Name of the embedder model.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+        device (str, optional): Device the outputs are moved to.
+    """
+    folder = get_embedder_path(embedder_model, embedder_model_custom)
+    onnx_path = os.path.join(folder, EMBEDDER_ONNX_NAME)
+    if not os.path.isfile(onnx_path):
+        print(f"Exporting '{folder}' to ONNX...")
+        export_embedder(embedder_model, embedder_model_custom, onnx_path)
+    return OnnxEmbedder(onnx_path, device)
+
+
+def load_onnx_rmvpe(device="cpu"):
+    """
+    Returns the ONNX Runtime network of RMVPE, exporting it on first use.
+
+    Args:
+        device (str, optional): Device the outputs are moved to.
+    """
+    if not os.path.isfile(RMVPE_ONNX_PATH):
+        print("Exporting RMVPE to ONNX...")
+        export_rmvpe()
+    return OnnxModule(RMVPE_ONNX_PATH, device)
+
+
+def get_test_audio(seconds, sample_rate=16000, seed=0):
+    # a gliding harmonic tone with some noise, so RMVPE and the embedder see voiced input
+    generator = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 150 + 50 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    audio = sum(np.sin(k * phase) / k for k in range(1, 6))
+    audio = 0.3 * audio + 0.01 * generator.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def time_call(function, runs):
+    function()  # warm up
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start_time) / runs
+
+
+def compare_backends(
+    model_path,
+    embedder_model="contentvec",
+    embedder_model_custom=None,
+    seconds=10.0,
+    runs=3,
+    atol=PARITY_ATOL,
+):
+    """
+    Checks the ONNX exports against PyTorch and compares their real-time factors on the CPU.
+
+    The embedder and RMVPE get the same synthetic voiced signal of `seconds` length on
+    both backends and their outputs are compared. The voice model samples noise inside
+    its graph, so it is only timed, on random features of that length; its parity is
+    covered by the tests. The real-time factor is the mean time per run divided by
+    `seconds`, so lower is faster. Returns the results by graph name.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        embedder_model (str, optional): Name of the embedder model.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+        seconds (float, optional): Length of the test input in seconds.
+        runs (int, optional): Number of timed runs per backend.
+        atol (float, optional): Largest accepted absolute difference.
+    """
+    from rvc.lib.utils import load_embedding
+
+    results = {}
+    audio = get_test_audio(seconds)
+    source = torch.from_numpy(audio).unsqueeze(0)
+
+    with torch.no_grad():
+        embedder = load_embedding(embedder_model, embedder_model_custom).float().eval()
+        onnx_embedder = load_onnx_embedder(embedder_model, embedder_model_custom)
+        reference = embedder(source)["last_hidden_state"]
+        output = onnx_embedder(source)["last_hidden_state"]
+        results["embedder"] = {
+            "max_diff": (reference - output).abs().max().item(),
+            "torch_time": time_call(lambda: embedder(source), runs),
+            "onnx_time": time_call(lambda: onnx_embedder(source), runs),
+        }
+        del embedder, onnx_embedder
+
+        rmvpe = RMVPE0Predictor(RMVPE_PATH, device="cpu")
+        onnx_rmvpe = RMVPE0Predictor(RMVPE_PATH, device="cpu", model=load_onnx_rmvpe())
+        mel = rmvpe.mel_extractor(source, center=True)
+        reference = rmvpe.mel2hidden(mel)
+        output = onnx_rmvpe.mel2hidden(mel)
+        results["rmvpe"] = {
+            "max_diff": (reference - output).abs().max().item(),
+            "torch_time": time_call(lambda: rmvpe.mel2hidden(mel), runs),
+            "onnx_time": time_call(lambda: onnx_rmvpe.mel2hidden(mel), runs),
+        }
+        del rmvpe, onnx_rmvpe
+
+        net_g, metadata = materialize_voice(model_path, "cpu")
+        onnx_net_g, _ = load_onnx_voice(model_path)
+        frames = int(seconds * 100)
+        phone, lengths, pitch, pitchf, sid = get_test_inputs(metadata, frames)
+        results["synthesizer"] = {
+            "torch_time": time_call(
+                lambda: net_g.infer(phone, lengths, pitch, pitchf, sid), runs
+            ),
+            "onnx_time": time_call(
+                lambda: onnx_net_g.infer(phone, lengths, pitch, pitchf, sid), runs
+            ),
+        }
+
+    for name, result in results.items():
+        result["torch_rtf"] = result.pop("torch_time") / seconds
+        result["onnx_rtf"] = result.pop("onnx_time") / seconds
+        result["speedup"] = result["torch_rtf"] / result["onnx_rtf"]
+        parity = ""
+        if "max_diff" in result:
+            result["passed"] = result["max_diff"] <= atol
+            parity = (
+                f"max difference {result['max_diff']:.2e} "
+                f"({'passed' if result['passed'] else 'FAILED'}), "
+            )
+        print(
+            f"{name}: {parity}"
+            f"RTF torch {result['torch_rtf']:.3f} / onnx {result['onnx_rtf']:.3f} "
+            f"({result['speedup']:.2f}x)"
+        )
+    return results
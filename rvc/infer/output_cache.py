@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+DEFAULT_CACHE_DIR = os.path.join(now_dir, "assets", "output_cache")
+DEFAULT_MAX_DISK_MB = 2048
+HASH_BLOCK_SIZE = 1024**2
+
+# job fields that name where things are or how fast they run, not what is rendered
+IGNORED_FIELDS = (
+    "audio_input_path",
+    "audio_output_path",
+    "model_path",
+    "index_path",
+    "f0_file",
+    "embedder_model_custom",
+    "batch_size",
+    "output_cache",
+    "kwargs",
+)
+IGNORED_KWARGS = ("pth_path", "num_workers")
+
+
+class OutputCache:
+    """
+    A disk cache of finished conversions, shared by every process using the same directory.
+
+    The key of a job hashes the contents of its input audio, voice model, index, F0 file
+    and custom embedder together with its normalized `convert_audio` settings, effects
+    included, so resubmitting an identical job copies the stored result instead of
+    converting again. The least recently used results are evicted once the cache exceeds
+    its disk quota, and hit/miss counts are kept in `stats.json`.
+
+    Args:
+        cache_dir (str): Directory of the stored results.
+        max_disk_mb (float): Disk quota in megabytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_disk_mb=DEFAULT_MAX_DISK_MB):
+        self.cache_dir = cache_dir
+        self.max_disk = int(max_disk_mb * 1024**2)
+        self.file_hashes = {}
+        self.lock = threading.RLock()
+
+    def configure(self, cache_dir=None, max_disk_mb=None):
+        """
+        Updates the cache settings, evicting results if the new quota is smaller.
+
+        Args:
+            cache_dir (str, optional): New directory of the stored results.
+            max_disk_mb (float, optional): New disk quota in megabytes.
+        """
+        with self.lock:
+            if cache_dir is not None:
+                self.cache_dir = cache_dir
+            if max_disk_mb is not None:
+                self.max_disk = int(max_disk_mb * 1024**2)
+                self._enforce_quota()
+
+    def hash_file(self, path):
+        """
+        Returns the SHA-1 of a file's contents, or None if the path is not a file.
+
+        Hashes are remembered by path, modification time and size, so an unchanged model
+        is only read once per process.
+
+        Args:
+            path (str): Path to the file.
+        """
+        if not path or not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        file_key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            digest = self.file_hashes.get(file_key)
+        if digest is None:
+            sha1 = hashlib.sha1()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                    sha1.update(block)
+            digest = sha1.hexdigest()
+            with self.lock:
+                self.file_hashes[file_key] = digest
+        return digest
+
+    def get_key(self, job):
+        """
+        Returns the cache key of a job.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        settings = {
+            name: value for name, value in job.items() if name not in IGNORED_FIELDS
+        }
+        settings.update(
+            {
+                f"kwargs.{name}": value
+                for name, value in job["kwargs"].items()
+                if name not in IGNORED_KWARGS
+            }
+        )
+        settings = {
+            name: (
+                float(value)
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+                else value
+            )
+            for name, value in settings.items()
+        }
+        index_path = job["index_path"].strip().strip('"').replace("trained", "added")
+        contents = {
+            "audio": self.hash_file(job["audio_input_path"]),
+            "model": self.hash_file(job["model_path"]),
+            "index": self.hash_file(index_path) if job["index_rate"] > 0 else None,
+            "f0_file": self.hash_file(job["f0_file"]),
+            "embedder": (
+                self.hash_file(job["embedder_model_custom"])
+                if job["embedder_model"] == "custom"
+                else None
+            ),
+        }
+        if contents["audio"] is None or contents["model"] is None:
+            return None
+        data = json.dumps([contents, settings], sort_keys=True, default=str)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_output_paths(job):
+        """
+        Returns the paths a job writes: its output in the export format.
+
+        Args:
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        export_format = job["export_format"]
+        return [job["audio_output_path"].replace(".wav", f".{export_format.lower()}")]
+
+    def get_entry_paths(self, key, job):
+        extension = job["export_format"].lower()
+        return [os.path.join(self.cache_dir, f"{key}.{extension}")]
+
+    def restore(self, key, job):
+        """
+        Copies the stored result of a job to its output paths.
+
+        Returns the output path on a hit, None on a miss.
+
+        Args:
+            key (str): Key returned by `get_key`.
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        if key is None:
+            return None
+        entry_paths = self.get_entry_paths(key, job)
+        output_paths = self.get_output_paths(job)
+        with self.lock:
+            if not all(os.path.isfile(path) for path in entry_paths):
+                self._count("misses")
+                return None
+            try:
+                for entry_path, output_path in zip(entry_paths, output_paths):
+                    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                    shutil.copyfile(entry_path, output_path)
+                    os.utime(entry_path)
+            except OSError as error:
+                print(f"An error occurred reading the output cache: {error}")
+                self._count("misses")
+                return None
+            self._count("hits")
+        return output_paths[-1]
+
+    def store(self, key, job):
+        """
+        Stores the written outputs of a finished job.
+
+        Args:
+            key (str): Key returned by `get_key`.
+            job (dict): Arguments of `convert_audio`, with extra options under "kwargs".
+        """
+        if key is None:
+            return
+        entry_paths = self.get_entry_paths(key, job)
+        output_paths = self.get_output_paths(job)
+        with self.lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for entry_path, output_path in zip(entry_paths, output_paths):
+                    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+                    shutil.copyfile(output_path, tmp_path)
+                    os.replace(tmp_path, entry_path)
+            except OSError as error:
+                print(f"An error occurred writing the output cache: {error}")
+                return
+            self._enforce_quota()
+
+    def get_stats(self):
+        """
+        Returns the hit, miss and size statistics of the cache.
+        """
+        with self.lock:
+            stats = self._read_stats()
+            lookups = stats["hits"] + stats["misses"]
+            files = self._list_files()
+            return {
+                **stats,
+                "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len({name.split(".")[0] for _, name, _ in files}),
+                "disk_mb": round(sum(size for _, _, size in files) / 1024**2, 1),
+            }
+
+    def clear(self):
+        """
+        Removes every stored result and resets the statistics.
+        """
+        with self.lock:
+            for _, name, _ in self._list_files():
+                os.remove(os.path.join(self.cache_dir, name))
+            stats_path = os.path.join(self.cache_dir, "stats.json")
+            if os.path.exists(stats_path):
+                os.remove(stats_path)
+
+    def _list_files(self):
+        files = []
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name == "stats.json" or name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime_ns, name, stat.st_size))
+        return sorted(files)
+
+    def _enforce_quota(self):
+        files = self._list_files()
+        used = sum(size for _, _, size in files)
+        for _, name, size in files:
+            if used <= self.max_disk:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            used -= size
+
+    def _read_stats(self):
+        try:
+            with open(os.path.join(self.cache_dir, "stats.json")) as file:
+                stats = json.load(file)
+        except (OSError, ValueError):
+            stats = {}
+        return {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0)}
+
+    def _count(self, name):
+        stats = self._read_stats()
+        stats[name] += 1
+        stats_path = os.path.join(self.cache_dir, "stats.json")
+        tmp_path = f"{stats_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "w") as file:
+                json.dump(stats, file)
+            os.replace(tmp_path, stats_path)
+        except OSError:
+            pass
+
+
+_output_cache = None
+_output_cache_lock = threading.Lock()
+
+
+def get_output_cache(cache_dir=None, max_disk_mb=None):
+    """
+    Returns the process-wide output cache, creating it on first use.
+
+    Args:
+        cache_dir (str, optional): Directory of the stored results.
+        max_disk_mb (float, optional): Disk quota in megabytes.
+    """
+    global _output_cache
+    with _output_cache_lock:
+        if _output_cache is None:
+            _output_cache = OutputCache(
+                cache_dir or DEFAULT_CACHE_DIR,
+                max_disk_mb if max_disk_mb is not None else DEFAULT_MAX_DISK_MB,
+            )
+        else:
+            _output_cache.configure(cache_dir, max_disk_mb)
+        return _output_cache
@@ -1,11 +1,9 @@
 import os
-import gc
 import re
 import sys
 import torch
 import torch.nn.functional as F
 import torchcrepe
-import faiss
 import librosa
 import numpy as np
 from scipy import signal
@@ -14,8 +12,10 @@ from torch import Tensor
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
-from rvc.lib.predictors.RMVPE import RMVPE0Predictor
-from rvc.lib.predictors.FCPE import FCPEF0Predictor
+from rvc.lib.predictors.registry import get_predictor_registry
+from rvc.infer.index_cache import get_index_cache
+from rvc.infer.analysis_cache import get_analysis_cache
+from rvc.lib.index_factory import resolve_index_path, retrieve_weighted
 
 import logging
 
@@ -24,6 +24,8 @@ logging.getLogger("faiss").setLevel(logging.WARNING)
 FILTER_ORDER = 5
 CUTOFF_FREQUENCY = 48  # Hz
 SAMPLE_RATE = 16000  # Hz
+RMVPE_CHUNK_FRAMES = 6000  # 60 s of 10 ms frames per RMVPE forward pass
+RMS_BLOCK_SIZE = 65536  # samples whose volume envelope is computed at once
 bh, ah = signal.butter(
     N=FILTER_ORDER, Wn=CUTOFF_FREQUENCY, btype="high", fs=SAMPLE_RATE
 )
@@ -53,38 +55,61 @@ class AudioProcessor:
             target_rate: The sampling rate of the target audio.
             rate: The blending rate between the source and target RMS levels.
         """
-        # Calculate RMS of both audio data
         rms1 = librosa.feature.rms(
             y=source_audio,
             frame_length=source_rate // 2 * 2,
             hop_length=source_rate // 2,
-        )
+        )[0]
         rms2 = librosa.feature.rms(
             y=target_audio,
             frame_length=target_rate // 2 * 2,
             hop_length=target_rate // 2,
-        )
+        )[0]
 
-        # Interpolate RMS to match target audio length
-        rms1 = F.interpolate(
-            torch.from_numpy(rms1).float().unsqueeze(0),
-            size=target_audio.shape[0],
-            mode="linear",
-        ).squeeze()
-        rms2 = F.interpolate(
-            torch.from_numpy(rms2).float().unsqueeze(0),
-            size=target_audio.shape[0],
-            mode="linear",
-        ).squeeze()
-        rms2 = torch.maximum(rms2, torch.zeros_like(rms2) + 1e-6)
-
-        # Adjust target audio RMS based on the source audio RMS
-        adjusted_audio = (
-            target_audio
-            * (torch.pow(rms1, 1 - rate) * torch.pow(rms2, rate - 1)).numpy()
-        )
+        # the envelopes are stretched over the target one block at a time, so no
+        # full-length envelope is ever held in memory
+        length = target_audio.shape[0]
+        adjusted_audio = np.empty_like(target_audio)
+        for start in range(0, length, RMS_BLOCK_SIZE):
+            end = min(start + RMS_BLOCK_SIZE, length)
+            envelope1 = AudioProcessor.stretch_envelope(rms1, start, end, length)
+            envelope2 = AudioProcessor.stretch_envelope(rms2, start, end, length)
+            envelope2 = np.maximum(envelope2, 1e-6)
+            adjusted_audio[start:end] = target_audio[start:end] * (
+                np.power(envelope1, 1 - rate) * np.power(envelope2, rate - 1)
+            )
         return adjusted_audio
 
+    @staticmethod
+    def stretch_envelope(frames, start, end, length):
+        """
+        Returns samples `start` to `end` of an envelope linearly stretched to `length`
+        samples, with the sample positions of `F.interpolate(mode="linear")`.
+
+        Args:
+            frames: The envelope values.
+            start: First sample to return.
+            end: Sample after the last one to return.
+            length: Length of the stretched envelope.
+        """
+        positions = (np.arange(start, end) + 0.5) * (frames.shape[0] / length) - 0.5
+        return np.interp(
+            np.maximum(positions, 0), np.arange(frames.shape[0]), frames
+        ).astype(np.float32)
+
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+NOTE_ALIASES = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+SCALES = {
+    "chromatic": list(range(12)),
+    "major": [0, 2, 4, 5, 7, 9, 11],
+    "minor": [0, 2, 3, 5, 7, 8, 10],
+    "harmonic_minor": [0, 2, 3, 5, 7, 8, 11],
+    "pentatonic_major": [0, 2, 4, 7, 9],
+    "pentatonic_minor": [0, 3, 5, 7, 10],
+    "blues": [0, 3, 5, 6, 7, 10],
+}
+
 
 class Autotune:
     """
@@ -100,19 +125,131 @@ class Autotune:
         """
         self.ref_freqs = ref_freqs
         self.note_dict = self.ref_freqs  # No interpolation needed
+        self.ref_array = np.sort(np.asarray(ref_freqs, dtype=np.float64))
+        self.pitch_classes = (
+            np.round(69 + 12 * np.log2(self.ref_array / 440.0)).astype(int) % 12
+        )
+        self.note_tables = {}
+
+    def get_note_table(self, key=None, scale="chromatic"):
+        """
+        Returns the reference notes allowed by a key and scale, and the midpoints between them.
 
-    def autotune_f0(self, f0, f0_autotune_strength):
+        Args:
+            key: Root note of the scale (e.g. "A" or "Bb"), ignored for the chromatic scale.
+            scale: Name of the scale, one of `SCALES`.
+        """
+        scale = scale or "chromatic"
+        if scale not in SCALES:
+            raise ValueError(
+                f"Unknown autotune scale '{scale}', expected one of {list(SCALES)}."
+            )
+        root = 0
+        if key and scale != "chromatic":
+            key = NOTE_ALIASES.get(key.capitalize(), key.capitalize())
+            if key not in NOTE_NAMES:
+                raise ValueError(f"Unknown autotune key '{key}'.")
+            root = NOTE_NAMES.index(key)
+        cache_key = (root, scale)
+        if cache_key not in self.note_tables:
+            allowed = np.isin(
+                self.pitch_classes, [(root + i) % 12 for i in SCALES[scale]]
+            )
+            notes = self.ref_array[allowed]
+            self.note_tables[cache_key] = (notes, (notes[:-1] + notes[1:]) / 2)
+        return self.note_tables[cache_key]
+
+    def autotune_f0(self, f0, f0_autotune_strength, key=None, scale="chromatic"):
         """
         Autotunes a given F0 contour by snapping each frequency to the closest reference frequency.
 
+        Unvoiced frames (0 Hz) are left untouched.
+
         Args:
             f0: The input F0 contour as a NumPy array.
+            f0_autotune_strength: How far each frequency moves towards its closest note (0 to 1).
+            key: Root note of the scale to snap to.
+            scale: Name of the scale to snap to, "chromatic" allows every note.
         """
-        autotuned_f0 = np.zeros_like(f0)
-        for i, freq in enumerate(f0):
-            closest_note = min(self.note_dict, key=lambda x: abs(x - freq))
-            autotuned_f0[i] = freq + (closest_note - freq) * f0_autotune_strength
-        return autotuned_f0
+        notes, midpoints = self.get_note_table(key, scale)
+        f0 = np.asarray(f0)
+        closest_note = notes[np.searchsorted(midpoints, f0, side="left")]
+        autotuned_f0 = f0 + (closest_note - f0) * f0_autotune_strength
+        return np.where(f0 > 0, autotuned_f0, f0).astype(f0.dtype, copy=False)
+
+
+def get_embedder_stages(model):
+    """
+    Splits a HuBERT/ContentVec embedder into its convolutional feature extractor and a
+    function running its projection and encoder on (batch, frames, channels) features
+    with a (batch, frames) boolean mask, or returns None if it cannot be split.
+
+    Args:
+        model: The feature extractor model.
+    """
+    # compiled embedders run the projection and encoder in their bucketed graphs
+    if hasattr(model, "encode_features"):
+        return model.model.feature_extractor, model.encode_features
+    if not all(
+        hasattr(model, name)
+        for name in ("feature_extractor", "feature_projection", "encoder")
+    ):
+        return None
+
+    def encode_features(features, mask):
+        hidden_states = model.feature_projection(features)
+        return model.encoder(hidden_states, attention_mask=mask)[0]
+
+    return model.feature_extractor, encode_features
+
+
+def embed_segments(model, sources):
+    """
+    Runs an embedder on audio segments of different lengths, sharing the encoder pass.
+
+    The convolutional feature extractor runs on each segment alone, since the group norm
+    of its first layer normalizes over the whole input and would see any padding. Its
+    outputs are zero-padded to a common length and the attention mask hides the padding
+    from the encoder, so each segment gets the features of extracting it alone.
+    Embedders that cannot be split, such as ONNX graphs, run once per group of segments
+    of the same length instead. Returns one output dict per segment, with tensors of
+    shape (1, frames, channels).
+
+    Args:
+        model: The feature extractor model.
+        sources (list): The (samples,) float tensors of the segments.
+    """
+    stages = get_embedder_stages(model) if len(sources) > 1 else None
+    if stages is None:
+        groups = {}
+        for i, source in enumerate(sources):
+            groups.setdefault(source.shape[0], []).append(i)
+        outputs = [None] * len(sources)
+        for ids in groups.values():
+            output = model(torch.stack([sources[i] for i in ids]))
+            for j, i in enumerate(ids):
+                outputs[i] = {
+                    name: output[name][j : j + 1]
+                    for name in ("last_hidden_state", "final_proj")
+                    if name in output
+                }
+        return outputs
+    feature_extractor, encode_features = stages
+    features = [
+        feature_extractor(source.view(1, -1)).transpose(1, 2) for source in sources
+    ]
+    frames = [f.shape[1] for f in features]
+    padded = features[0].new_zeros(len(features), max(frames), features[0].shape[2])
+    mask = torch.zeros(padded.shape[:2], dtype=torch.bool, device=padded.device)
+    for i, f in enumerate(features):
+        padded[i, : frames[i]] = f[0]
+        mask[i, : frames[i]] = True
+    del features
+    hidden_states = encode_features(padded, mask)
+    return [
+        {"last_hidden_state": hidden_states[i : i + 1, :n]}
+        for i, n in enumerate(frames)
+    ]
 
 
 class Pipeline:
@@ -121,26 +258,37 @@ class Pipeline:
     voice conversion using a model, and post-processing.
     """
 
-    def __init__(self, tgt_sr, config):
+    def __init__(
+        self,
+        tgt_sr,
+        config,
+        x_pad=None,
+        x_query=None,
+        x_center=None,
+        x_max=None,
+        backend="torch",
+    ):
         """
         Initializes the Pipeline class with target sampling rate and configuration parameters.
 
         Args:
             tgt_sr: The target sampling rate for the output audio.
             config: A configuration object containing various parameters for the pipeline.
+            x_pad: Padding around each chunk in seconds, overrides the config value.
+            x_query: Search radius around each split point in seconds, overrides the config value.
+            x_center: Distance between split points in seconds, overrides the config value.
+            x_max: Input length in seconds above which the audio is split, overrides the config value.
+            backend: Inference backend; RMVPE runs on ONNX Runtime with "onnx", on PyTorch otherwise.
         """
-        self.x_pad = config.x_pad
-        self.x_query = config.x_query
-        self.x_center = config.x_center
-        self.x_max = config.x_max
+        self.tgt_sr = tgt_sr
         self.sample_rate = 16000
         self.window = 160
-        self.t_pad = self.sample_rate * self.x_pad
-        self.t_pad_tgt = tgt_sr * self.x_pad
-        self.t_pad2 = self.t_pad * 2
-        self.t_query = self.sample_rate * self.x_query
-        self.t_center = self.sample_rate * self.x_center
-        self.t_max = self.sample_rate * self.x_max
+        self.set_split_sizes(
+            config.x_pad if x_pad is None else x_pad,
+            config.x_query if x_query is None else x_query,
+            config.x_center if x_center is None else x_center,
+            config.x_max if x_max is None else x_max,
+        )
         self.time_step = self.window / self.sample_rate * 1000
         self.f0_min = 50
         self.f0_max = 1100
@@ -205,10 +353,61 @@ class Pipeline:
         ]
         self.autotune = Autotune(self.ref_freqs)
         self.note_dict = self.autotune.note_dict
-        self.model_rmvpe = RMVPE0Predictor(
-            os.path.join("rvc", "models", "predictors", "rmvpe.pt"),
-            device=self.device,
-        )
+        self.predictors = get_predictor_registry()
+        self.model_rmvpe = self.predictors.get_rmvpe(self.device, backend)
+        self.rmvpe_chunk_frames = RMVPE_CHUNK_FRAMES
+        self.index_cache = get_index_cache()
+        self.analysis_cache = get_analysis_cache()
+
+    def set_split_sizes(self, x_pad, x_query, x_center, x_max):
+        """
+        Sets the chunk and padding sizes used to split long inputs.
+
+        Args:
+            x_pad: Padding around each chunk in seconds.
+            x_query: Search radius around each split point in seconds.
+            x_center: Distance between split points in seconds.
+            x_max: Input length in seconds above which the audio is split.
+        """
+        if not 0 < x_query < x_center <= x_max:
+            raise ValueError(
+                "Split sizes must satisfy 0 < x_query < x_center <= x_max."
+            )
+        self.x_pad = x_pad
+        self.x_query = x_query
+        self.x_center = x_center
+        self.x_max = x_max
+        self.t_pad = int(self.sample_rate * self.x_pad)
+        self.t_pad_tgt = int(self.tgt_sr * self.x_pad)
+        self.t_pad2 = self.t_pad * 2
+        self.t_query = int(self.sample_rate * self.x_query)
+        self.t_center = int(self.sample_rate * self.x_center)
+        self.t_max = int(self.sample_rate * self.x_max)
+
+    def get_split_points(self, audio):
+        """
+        Returns the sample positions where a long input is cut into chunks.
+
+        Around every multiple of `t_center`, the quietest sample within `t_query` is chosen,
+        measured by the absolute moving sum over one window. Inputs shorter than `t_max`
+        are not split.
+
+        Args:
+            audio: The high-pass filtered input audio at 16 kHz.
+        """
+        if audio.shape[0] + self.window <= self.t_max:
+            return []
+        audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
+        cumsum = np.concatenate(([0.0], np.cumsum(audio_pad, dtype=np.float64)))
+        audio_sum = np.abs(cumsum[self.window : -1] - cumsum[: -self.window - 1])
+        # windows reaching past the end are filled with inf so they never win
+        audio_sum = np.concatenate((audio_sum, np.full(self.t_query, np.inf)))
+        windows = np.lib.stride_tricks.sliding_window_view(audio_sum, 2 * self.t_query)[
+            self.t_center - self.t_query :: self.t_center
+        ]
+        centers = np.arange(self.t_center, audio.shape[0], self.t_center)
+        windows = windows[: len(centers)]
+        return (centers - self.t_query + windows.argmin(axis=1)).tolist()
 
     def get_f0_crepe(
         self,
@@ -237,17 +436,18 @@ class Pipeline:
         if audio.ndim == 2 and audio.shape[0] > 1:
             audio = torch.mean(audio, dim=0, keepdim=True).detach()
         audio = audio.detach()
-        pitch: Tensor = torchcrepe.predict(
-            audio,
-            self.sample_rate,
-            hop_length,
-            f0_min,
-            f0_max,
-            model,
-            batch_size=hop_length * 2,
-            device=self.device,
-            pad=True,
-        )
+        with self.predictors.crepe(model, self.device):
+            pitch: Tensor = torchcrepe.predict(
+                audio,
+                self.sample_rate,
+                hop_length,
+                f0_min,
+                f0_max,
+                model,
+                batch_size=hop_length * 2,
+                device=self.device,
+                pad=True,
+            )
         p_len = p_len or x.shape[0] // hop_length
         source = np.array(pitch.squeeze(0).cpu().float().numpy())
         source[source < 0.001] = np.nan
@@ -289,25 +489,21 @@ class Pipeline:
         for method in methods:
             f0 = None
             if method == "crepe":
-                f0 = self.get_f0_crepe_computation(
-                    x, f0_min, f0_max, p_len, int(hop_length)
-                )
+                f0 = self.get_f0_crepe(x, f0_min, f0_max, p_len, int(hop_length))
             elif method == "rmvpe":
-                f0 = self.model_rmvpe.infer_from_audio(x, thred=0.03)
+                f0 = self.model_rmvpe.infer_from_audio(
+                    x, thred=0.03, chunk_frames=self.rmvpe_chunk_frames
+                )
                 f0 = f0[1:]
             elif method == "fcpe":
-                self.model_fcpe = FCPEF0Predictor(
-                    os.path.join("rvc", "models", "predictors", "fcpe.pt"),
-                    f0_min=int(f0_min),
-                    f0_max=int(f0_max),
-                    dtype=torch.float32,
-                    device=self.device,
+                model_fcpe = self.predictors.get_fcpe(
+                    self.device,
+                    f0_min=f0_min,
+                    f0_max=f0_max,
                     sample_rate=self.sample_rate,
                     threshold=0.03,
                 )
-                f0 = self.model_fcpe.compute_f0(x, p_len=p_len)
-                del self.model_fcpe
-                gc.collect()
+                f0 = model_fcpe.compute_f0(x, p_len=p_len)
             f0_computation_stack.append(f0)
 
         f0_computation_stack = [fc for fc in f0_computation_stack if fc is not None]
@@ -318,30 +514,16 @@ class Pipeline:
             f0_median_hybrid = np.nanmedian(f0_computation_stack, axis=0)
         return f0_median_hybrid
 
-    def get_f0(
-        self,
-        input_audio_path,
-        x,
-        p_len,
-        pitch,
-        f0_method,
-        hop_length,
-        f0_autotune,
-        f0_autotune_strength,
-        inp_f0=None,
-    ):
+    def compute_f0(self, input_audio_path, x, p_len, f0_method, hop_length):
         """
-        Estimates the fundamental frequency (F0) of a given audio signal using various methods.
+        Estimates the raw F0 contour of an audio signal, before pitch shift and autotune.
 
         Args:
             input_audio_path: Path to the input audio file.
             x: The input audio signal as a NumPy array.
             p_len: Desired length of the F0 output.
-            pitch: Key to adjust the pitch of the F0 contour.
             f0_method: Method to use for F0 estimation (e.g., "crepe").
             hop_length: Hop length for F0 estimation methods.
-            f0_autotune: Whether to apply autotune to the F0 contour.
-            inp_f0: Optional input F0 contour to use instead of estimating.
         """
         global input_audio_path2wav
         if f0_method == "crepe":
@@ -351,20 +533,18 @@ class Pipeline:
                 x, self.f0_min, self.f0_max, p_len, int(hop_length), "tiny"
             )
         elif f0_method == "rmvpe":
-            f0 = self.model_rmvpe.infer_from_audio(x, thred=0.03)
+            f0 = self.model_rmvpe.infer_from_audio(
+                x, thred=0.03, chunk_frames=self.rmvpe_chunk_frames
+            )
         elif f0_method == "fcpe":
-            self.model_fcpe = FCPEF0Predictor(
-                os.path.join("rvc", "models", "predictors", "fcpe.pt"),
-                f0_min=int(self.f0_min),
-                f0_max=int(self.f0_max),
-                dtype=torch.float32,
-                device=self.device,
+            model_fcpe = self.predictors.get_fcpe(
+                self.device,
+                f0_min=self.f0_min,
+                f0_max=self.f0_max,
                 sample_rate=self.sample_rate,
                 threshold=0.03,
             )
-            f0 = self.model_fcpe.compute_f0(x, p_len=p_len)
-            del self.model_fcpe
-            gc.collect()
+            f0 = model_fcpe.compute_f0(x, p_len=p_len)
         elif "hybrid" in f0_method:
             input_audio_path2wav[input_audio_path] = x.astype(np.double)
             f0 = self.get_f0_hybrid(
@@ -375,9 +555,57 @@ class Pipeline:
                 p_len,
                 hop_length,
             )
+        return f0
+
+    def get_f0(
+        self,
+        input_audio_path,
+        x,
+        p_len,
+        pitch,
+        f0_method,
+        hop_length,
+        f0_autotune,
+        f0_autotune_strength,
+        inp_f0=None,
+        f0_autotune_key=None,
+        f0_autotune_scale="chromatic",
+        use_cache=True,
+    ):
+        """
+        Estimates the fundamental frequency (F0) of a given audio signal using various methods.
+
+        Args:
+            input_audio_path: Path to the input audio file.
+            x: The input audio signal as a NumPy array.
+            p_len: Desired length of the F0 output.
+            pitch: Key to adjust the pitch of the F0 contour.
+            f0_method: Method to use for F0 estimation (e.g., "crepe").
+            hop_length: Hop length for F0 estimation methods.
+            f0_autotune: Whether to apply autotune to the F0 contour.
+            f0_autotune_strength: Strength of the autotune.
+            inp_f0: Optional input F0 contour to use instead of estimating.
+            f0_autotune_key: Root note of the scale the autotune snaps to.
+            f0_autotune_scale: Scale the autotune snaps to.
+            use_cache: Whether to look the raw contour up in the analysis cache.
+        """
+        if use_cache and self.analysis_cache.enabled:
+            key = self.analysis_cache.get_key(
+                "f0", x, f0_method, int(hop_length), p_len, self.f0_min, self.f0_max
+            )
+            f0 = self.analysis_cache.get(key)
+            if f0 is None:
+                f0 = self.compute_f0(input_audio_path, x, p_len, f0_method, hop_length)
+                self.analysis_cache.put(key, f0)
+            # pitch shift and autotune below modify the contour in place
+            f0 = f0.copy()
+        else:
+            f0 = self.compute_f0(input_audio_path, x, p_len, f0_method, hop_length)
 
         if f0_autotune is True:
-            f0 = Autotune.autotune_f0(self, f0, f0_autotune_strength)
+            f0 = self.autotune.autotune_f0(
+                f0, f0_autotune_strength, f0_autotune_key, f0_autotune_scale
+            )
 
         f0 *= pow(2, pitch / 12)
         tf0 = self.sample_rate // self.window
@@ -403,6 +631,54 @@ class Pipeline:
 
         return f0_coarse, f0bak
 
+    def extract_features(self, model, audios, version):
+        """
+        Returns the content features of audio segments, before speaker embedding retrieval.
+
+        Features found in the analysis cache are reused; the others are extracted together
+        by `embed_segments`, which gives every segment the features of extracting it
+        alone. Every returned tensor has the shape (1, frames, channels).
+
+        Args:
+            model: The feature extractor model.
+            audios: List of input audio segments.
+            version: Model version (Keep to support old models).
+        """
+        feats = [None] * len(audios)
+        keys = [None] * len(audios)
+        # set by the model pool: the backend and weights the features come from
+        model_id = getattr(model, "analysis_id", None)
+        if self.analysis_cache.enabled and model_id:
+            for i, audio in enumerate(audios):
+                keys[i] = self.analysis_cache.get_key("feats", audio, model_id, version)
+                cached = self.analysis_cache.get(keys[i])
+                if cached is not None:
+                    feats[i] = torch.from_numpy(cached).unsqueeze(0).to(self.device)
+        missing = [i for i, f in enumerate(feats) if f is None]
+        if not missing:
+            return feats
+
+        sources = []
+        for i in missing:
+            source = torch.from_numpy(audios[i]).float()
+            source = source.mean(-1) if source.dim() == 2 else source
+            assert source.dim() == 1, source.dim()
+            sources.append(source.to(self.device))
+        outputs = embed_segments(model, sources)
+        for i, output in zip(missing, outputs):
+            feats[i] = output["last_hidden_state"]
+            if version == "v1":
+                # ONNX embedders return the projection along with the hidden state
+                feats[i] = (
+                    output["final_proj"]
+                    if "final_proj" in output
+                    else model.final_proj(feats[i])
+                )
+            if keys[i] is not None:
+                self.analysis_cache.put(keys[i], feats[i][0].cpu().numpy().copy())
+        del sources, outputs
+        return feats
+
     def voice_conversion(
         self,
         model,
@@ -435,16 +711,8 @@ class Pipeline:
         """
         with torch.no_grad():
             pitch_guidance = pitch != None and pitchf != None
-            # prepare source audio
-            feats = torch.from_numpy(audio0).float()
-            feats = feats.mean(-1) if feats.dim() == 2 else feats
-            assert feats.dim() == 1, feats.dim()
-            feats = feats.view(1, -1).to(self.device)
             # extract features
-            feats = model(feats)["last_hidden_state"]
-            feats = (
-                model.final_proj(feats[0]).unsqueeze(0) if version == "v1" else feats
-            )
+            feats = self.extract_features(model, [audio0], version)[0]
             # make a copy for pitch guidance and protection
             feats0 = feats.clone() if pitch_guidance else None
             if (
@@ -488,87 +756,242 @@ class Pipeline:
                 torch.cuda.empty_cache()
         return audio1
 
+    def voice_conversion_batch(
+        self,
+        model,
+        net_g,
+        sid,
+        audios,
+        pitches,
+        pitchfs,
+        index,
+        big_npy,
+        index_rate,
+        version,
+        protect,
+    ):
+        """
+        Performs voice conversion on several audio segments in shared forward passes.
+
+        The features of the segments are zero-padded to a common length, which the
+        synthesizer ignores through `phone_lengths`.
+
+        Args:
+            model: The feature extractor model.
+            net_g: The generative model for synthesizing speech.
+            sid: Speaker ID for the target voice.
+            audios: List of input audio segments.
+            pitches: List of quantized F0 contours (1, n) for pitch guidance, or None.
+            pitchfs: List of original F0 contours (1, n) for pitch guidance, or None.
+            index: FAISS index for speaker embedding retrieval.
+            big_npy: Speaker embeddings stored in a NumPy array.
+            index_rate: Blending rate for speaker embedding retrieval.
+            version: Model version (Keep to support old models).
+            protect: Protection level for preserving the original pitch.
+        """
+        with torch.no_grad():
+            pitch_guidance = pitches is not None and pitchfs is not None
+            batch_size = len(audios)
+            lengths = [audio.shape[0] for audio in audios]
+            # extract features and pad them to a common length
+            segment_feats = self.extract_features(model, audios, version)
+            max_frames = max(f.shape[1] for f in segment_feats)
+            feats = segment_feats[0].new_zeros(
+                batch_size, max_frames, segment_feats[0].shape[2]
+            )
+            for i, f in enumerate(segment_feats):
+                feats[i, : f.shape[1]] = f[0]
+            del segment_feats
+            # make a copy for pitch guidance and protection
+            feats0 = feats.clone() if pitch_guidance else None
+            if index:
+                feats = self._retrieve_speaker_embeddings(
+                    feats, index, big_npy, index_rate
+                )
+            # feature upsampling
+            feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(
+                0, 2, 1
+            )
+            # per-segment lengths, limited by the frames the embedder produced
+            frames = model._get_feat_extract_output_lengths(torch.tensor(lengths)) * 2
+            p_lens = [
+                min(length // self.window, int(n_frames))
+                for length, n_frames in zip(lengths, frames)
+            ]
+            max_p_len = max(p_lens)
+            feats = feats[:, :max_p_len]
+            if pitch_guidance:
+                feats0 = F.interpolate(feats0.permute(0, 2, 1), scale_factor=2).permute(
+                    0, 2, 1
+                )[:, :max_p_len]
+                pitch = torch.zeros(
+                    batch_size, max_p_len, dtype=torch.long, device=self.device
+                )
+                pitchf = torch.zeros(batch_size, max_p_len, device=self.device)
+                for i, p_len in enumerate(p_lens):
+                    pitch[i, :p_len] = pitches[i][0, :p_len]
+                    pitchf[i, :p_len] = pitchfs[i][0, :p_len]
+                # Pitch protection blending
+                if protect < 0.5:
+                    pitchff = pitchf.clone()
+                    pitchff[pitchf > 0] = 1
+                    pitchff[pitchf < 1] = protect
+                    feats = feats * pitchff.unsqueeze(-1) + feats0 * (
+                        1 - pitchff.unsqueeze(-1)
+                    )
+                    feats = feats.to(feats0.dtype)
+                pitchf = pitchf.float()
+            else:
+                pitch, pitchf = None, None
+            p_len_tensor = torch.tensor(p_lens, device=self.device).long()
+            audio1 = (
+                net_g.infer(
+                    feats.float(), p_len_tensor, pitch, pitchf, sid.expand(batch_size)
+                )[0][:, 0]
+                .data.cpu()
+                .float()
+                .numpy()
+            )
+            upp = audio1.shape[-1] // max_p_len
+            audio_out = [audio1[i, : p_len * upp] for i, p_len in enumerate(p_lens)]
+            # clean up
+            del feats, feats0, p_len_tensor, audio1
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        return audio_out
+
+    def pipeline_batch(
+        self,
+        model,
+        net_g,
+        sid,
+        pieces,
+        index,
+        big_npy,
+        index_rate,
+        version,
+        protect,
+        batch_size,
+    ):
+        """
+        Converts prepared chunks in batches of similar length.
+
+        The chunks may come from several inputs as long as they share the voice model,
+        speaker and retrieval settings.
+
+        Args:
+            model: The feature extractor model.
+            net_g: The generative model for synthesizing speech.
+            sid: Speaker ID tensor for the target voice.
+            pieces: List of (audio, pitch, pitchf) chunks, see `prepare`.
+            index: FAISS index for speaker embedding retrieval.
+            big_npy: Speaker embeddings stored in a NumPy array.
+            index_rate: Blending rate for speaker embedding retrieval.
+            version: Model version.
+            protect: Protection level for preserving the original pitch.
+            batch_size: Maximum number of chunks per forward pass.
+        """
+        if batch_size <= 1:
+            return [
+                self.voice_conversion(
+                    model,
+                    net_g,
+                    sid,
+                    audio,
+                    pitch,
+                    pitchf,
+                    index,
+                    big_npy,
+                    index_rate,
+                    version,
+                    protect,
+                )[self.t_pad_tgt : -self.t_pad_tgt]
+                for audio, pitch, pitchf in pieces
+            ]
+        # sorting by length keeps the padding inside each batch small
+        order = sorted(range(len(pieces)), key=lambda i: pieces[i][0].shape[0])
+        audio_opt = [None] * len(pieces)
+        for b in range(0, len(order), batch_size):
+            ids = order[b : b + batch_size]
+            pitch_guidance = pieces[ids[0]][1] is not None
+            converted = self.voice_conversion_batch(
+                model,
+                net_g,
+                sid,
+                [pieces[i][0] for i in ids],
+                [pieces[i][1] for i in ids] if pitch_guidance else None,
+                [pieces[i][2] for i in ids] if pitch_guidance else None,
+                index,
+                big_npy,
+                index_rate,
+                version,
+                protect,
+            )
+            for i, audio in zip(ids, converted):
+                audio_opt[i] = audio[self.t_pad_tgt : -self.t_pad_tgt]
+        return audio_opt
+
     def _retrieve_speaker_embeddings(self, feats, index, big_npy, index_rate):
-        npy = feats[0].cpu().numpy()
-        score, ix = index.search(npy, k=8)
-        weight = np.square(1 / score)
-        weight /= weight.sum(axis=1, keepdims=True)
-        npy = np.sum(big_npy[ix] * np.expand_dims(weight, axis=2), axis=1)
+        npy = feats.reshape(-1, feats.shape[-1]).cpu().numpy()
+        npy = retrieve_weighted(index, big_npy, npy)
         feats = (
-            torch.from_numpy(npy).unsqueeze(0).to(self.device) * index_rate
+            torch.from_numpy(npy).reshape(feats.shape).to(self.device) * index_rate
             + (1 - index_rate) * feats
         )
         return feats
 
-    def pipeline(
+    def load_index(self, file_index, index_rate, sid=None):
+        """
+        Returns the FAISS index and retrieval vectors, or (None, None) if retrieval is off.
+
+        If the index has a partition for the speaker, only that partition is loaded.
+
+        Args:
+            file_index: Path to the FAISS index file.
+            index_rate: Blending rate for speaker embedding retrieval.
+            sid: Speaker ID for the target voice.
+        """
+        if file_index != "" and os.path.exists(file_index) and index_rate > 0:
+            try:
+                return self.index_cache.get(resolve_index_path(file_index, sid))
+            except Exception as error:
+                print(f"An error occurred reading the FAISS index: {error}")
+        return None, None
+
+    def prepare(
         self,
-        model,
-        net_g,
-        sid,
         audio,
         pitch,
         f0_method,
-        file_index,
-        index_rate,
         pitch_guidance,
-        volume_envelope,
-        version,
-        protect,
         hop_length,
         f0_autotune,
         f0_autotune_strength,
         f0_file,
+        f0_autotune_key=None,
+        f0_autotune_scale="chromatic",
     ):
         """
-        The main pipeline function for performing voice conversion.
+        Runs the per-input stages of the pipeline: filtering, splitting and F0 estimation.
+
+        Returns a dict with the filtered audio and the list of (audio, pitch, pitchf)
+        chunks to convert, which `pipeline_batch` and `finish` consume.
 
         Args:
-            model: The feature extractor model.
-            net_g: The generative model for synthesizing speech.
-            sid: Speaker ID for the target voice.
             audio: The input audio signal.
-            input_audio_path: Path to the input audio file.
             pitch: Key to adjust the pitch of the F0 contour.
             f0_method: Method to use for F0 estimation.
-            file_index: Path to the FAISS index file for speaker embedding retrieval.
-            index_rate: Blending rate for speaker embedding retrieval.
             pitch_guidance: Whether to use pitch guidance during voice conversion.
-            tgt_sr: Target sampling rate for the output audio.
-            resample_sr: Resampling rate for the output audio.
-            volume_envelope: Blending rate for adjusting the RMS level of the output audio.
-            version: Model version.
-            protect: Protection level for preserving the original pitch.
             hop_length: Hop length for F0 estimation methods.
             f0_autotune: Whether to apply autotune to the F0 contour.
+            f0_autotune_strength: Strength of the autotune.
             f0_file: Path to a file containing an F0 contour to use.
+            f0_autotune_key: Root note of the scale the autotune snaps to.
+            f0_autotune_scale: Scale the autotune snaps to.
         """
-        if file_index != "" and os.path.exists(file_index) and index_rate > 0:
-            try:
-                index = faiss.read_index(file_index)
-                big_npy = index.reconstruct_n(0, index.ntotal)
-            except Exception as error:
-                print(f"An error occurred reading the FAISS index: {error}")
-                index = big_npy = None
-        else:
-            index = big_npy = None
         audio = signal.filtfilt(bh, ah, audio)
-        audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
-        opt_ts = []
-        if audio_pad.shape[0] > self.t_max:
-            audio_sum = np.zeros_like(audio)
-            for i in range(self.window):
-                audio_sum += audio_pad[i : i - self.window]
-            for t in range(self.t_center, audio.shape[0], self.t_center):
-                opt_ts.append(
-                    t
-                    - self.t_query
-                    + np.where(
-                        np.abs(audio_sum[t - self.t_query : t + self.t_query])
-                        == np.abs(audio_sum[t - self.t_query : t + self.t_query]).min()
-                    )[0][0]
-                )
+        opt_ts = self.get_split_points(audio)
         s = 0
-        audio_opt = []
         t = None
         audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
         p_len = audio_pad.shape[0] // self.window
@@ -583,7 +1006,7 @@ class Pipeline:
                 inp_f0 = np.array(inp_f0, dtype="float32")
             except Exception as error:
                 print(f"An error occurred reading the F0 file: {error}")
-        sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
+        pitchf = None
         if pitch_guidance:
             pitch, pitchf = self.get_f0(
                 "input_audio_path",  # questionable purpose of making a key for an array
@@ -595,6 +1018,8 @@ class Pipeline:
                 f0_autotune,
                 f0_autotune_strength,
                 inp_f0,
+                f0_autotune_key,
+                f0_autotune_scale,
             )
             pitch = pitch[:p_len]
             pitchf = pitchf[:p_len]
@@ -602,84 +1027,127 @@ class Pipeline:
                 pitchf = pitchf.astype(np.float32)
             pitch = torch.tensor(pitch, device=self.device).unsqueeze(0).long()
             pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
+        else:
+            pitch = None
+        segments = []
         for t in opt_ts:
             t = t // self.window * self.window
-            if pitch_guidance:
-                audio_opt.append(
-                    self.voice_conversion(
-                        model,
-                        net_g,
-                        sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        pitch[:, s // self.window : (t + self.t_pad2) // self.window],
-                        pitchf[:, s // self.window : (t + self.t_pad2) // self.window],
-                        index,
-                        big_npy,
-                        index_rate,
-                        version,
-                        protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
-                )
-            else:
-                audio_opt.append(
-                    self.voice_conversion(
-                        model,
-                        net_g,
-                        sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        None,
-                        None,
-                        index,
-                        big_npy,
-                        index_rate,
-                        version,
-                        protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
+            segments.append(
+                (
+                    s,
+                    t + self.t_pad2 + self.window,
+                    s // self.window,
+                    (t + self.t_pad2) // self.window,
                 )
-            s = t
-        if pitch_guidance:
-            audio_opt.append(
-                self.voice_conversion(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    pitch[:, t // self.window :] if t is not None else pitch,
-                    pitchf[:, t // self.window :] if t is not None else pitchf,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
             )
-        else:
-            audio_opt.append(
-                self.voice_conversion(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    None,
-                    None,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
+            s = t
+        segments.append((t, None, t // self.window if t is not None else None, None))
+        pieces = [
+            (
+                audio_pad[start:end],
+                pitch[:, f0_start:f0_end] if pitch_guidance else None,
+                pitchf[:, f0_start:f0_end] if pitch_guidance else None,
             )
+            for start, end, f0_start, f0_end in segments
+        ]
+        return {"audio": audio, "pieces": pieces}
+
+    def finish(self, prepared, audio_opt, volume_envelope):
+        """
+        Joins the converted chunks of one input and applies the output normalization.
+
+        Args:
+            prepared: The dict returned by `prepare` for this input.
+            audio_opt: The converted chunks, in the order of `prepared["pieces"]`.
+            volume_envelope: Blending rate for adjusting the RMS level of the output audio.
+        """
         audio_opt = np.concatenate(audio_opt)
         if volume_envelope != 1:
             audio_opt = AudioProcessor.change_rms(
-                audio, self.sample_rate, audio_opt, self.sample_rate, volume_envelope
+                prepared["audio"],
+                self.sample_rate,
+                audio_opt,
+                self.sample_rate,
+                volume_envelope,
             )
         audio_max = np.abs(audio_opt).max() / 0.99
         if audio_max > 1:
             audio_opt /= audio_max
-        if pitch_guidance:
-            del pitch, pitchf
-        del sid
+        return audio_opt
+
+    def pipeline(
+        self,
+        model,
+        net_g,
+        sid,
+        audio,
+        pitch,
+        f0_method,
+        file_index,
+        index_rate,
+        pitch_guidance,
+        volume_envelope,
+        version,
+        protect,
+        hop_length,
+        f0_autotune,
+        f0_autotune_strength,
+        f0_file,
+        batch_size=1,
+        f0_autotune_key=None,
+        f0_autotune_scale="chromatic",
+    ):
+        """
+        The main pipeline function for performing voice conversion.
+
+        Args:
+            model: The feature extractor model.
+            net_g: The generative model for synthesizing speech.
+            sid: Speaker ID for the target voice.
+            audio: The input audio signal.
+            pitch: Key to adjust the pitch of the F0 contour.
+            f0_method: Method to use for F0 estimation.
+            file_index: Path to the FAISS index file for speaker embedding retrieval.
+            index_rate: Blending rate for speaker embedding retrieval.
+            pitch_guidance: Whether to use pitch guidance during voice conversion.
+            volume_envelope: Blending rate for adjusting the RMS level of the output audio.
+            version: Model version.
+            protect: Protection level for preserving the original pitch.
+            hop_length: Hop length for F0 estimation methods.
+            f0_autotune: Whether to apply autotune to the F0 contour.
+            f0_file: Path to a file containing an F0 contour to use.
+            batch_size: Number of chunks converted together in one forward pass.
+            f0_autotune_key: Root note of the scale the autotune snaps to.
+            f0_autotune_scale: Scale the autotune snaps to.
+        """
+        index, big_npy = self.load_index(file_index, index_rate, sid)
+        prepared = self.prepare(
+            audio,
+            pitch,
+            f0_method,
+            pitch_guidance,
+            hop_length,
+            f0_autotune,
+            f0_autotune_strength,
+            f0_file,
+            f0_autotune_key,
+            f0_autotune_scale,
+        )
+        sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
+        audio_opt = self.pipeline_batch(
+            model,
+            net_g,
+            sid,
+            prepared["pieces"],
+            index,
+            big_npy,
+            index_rate,
+            version,
+            protect,
+            batch_size,
+        )
+        audio_opt = self.finish(prepared, audio_opt, volume_envelope)
+        del prepared, sid
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         return audio_opt
@@ -0,0 +1,365 @@
+import os
+import sys
+import soxr
+import threading
+import contextlib
+import numpy as np
+import soundfile as sf
+from collections import OrderedDict
+from pedalboard import (
+    Pedalboard,
+    Chorus,
+    Distortion,
+    Reverb,
+    PitchShift,
+    Limiter,
+    Gain,
+    Bitcrush,
+    Clipping,
+    Compressor,
+    Delay,
+)
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.progressive import ProgressiveWavWriter
+
+POST_BLOCK_SECONDS = 4.0
+MAX_CACHED_CHAINS = 8
+COMMON_SAMPLE_RATES = [8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000]
+# conversion options that configure each effect, keyed by the option that enables it
+EFFECT_SETTINGS = {
+    "reverb": (
+        "reverb_room_size",
+        "reverb_damping",
+        "reverb_wet_level",
+        "reverb_dry_level",
+        "reverb_width",
+        "reverb_freeze_mode",
+    ),
+    "pitch_shift": ("pitch_shift_semitones",),
+    "limiter": ("limiter_threshold", "limiter_release"),
+    "gain": ("gain_db",),
+    "distortion": ("distortion_gain",),
+    "chorus": (
+        "chorus_rate",
+        "chorus_depth",
+        "chorus_delay",
+        "chorus_feedback",
+        "chorus_mix",
+    ),
+    "bitcrush": ("bitcrush_bit_depth",),
+    "clipping": ("clipping_threshold",),
+    "compressor": (
+        "compressor_threshold",
+        "compressor_ratio",
+        "compressor_attack",
+        "compressor_release",
+    ),
+    "delay": ("delay_seconds", "delay_feedback", "delay_mix"),
+}
+# effects whose output lags their input; only a whole-signal call compensates for it
+LATENCY_EFFECTS = (PitchShift,)
+
+
+def build_effect_chain(**kwargs):
+    """
+    Builds the `Pedalboard` of the effects enabled in the conversion options.
+
+    Args:
+        **kwargs: Effect switches and settings of `VoiceConverter.convert_audio`.
+    """
+    board = Pedalboard()
+    if kwargs.get("reverb", False):
+        reverb = Reverb(
+            room_size=kwargs.get("reverb_room_size", 0.5),
+            damping=kwargs.get("reverb_damping", 0.5),
+            wet_level=kwargs.get("reverb_wet_level", 0.33),
+            dry_level=kwargs.get("reverb_dry_level", 0.4),
+            width=kwargs.get("reverb_width", 1.0),
+            freeze_mode=kwargs.get("reverb_freeze_mode", 0),
+        )
+        board.append(reverb)
+    if kwargs.get("pitch_shift", False):
+        pitch_shift = PitchShift(semitones=kwargs.get("pitch_shift_semitones", 0))
+        board.append(pitch_shift)
+    if kwargs.get("limiter", False):
+        limiter = Limiter(
+            threshold_db=kwargs.get("limiter_threshold", -6),
+            release_ms=kwargs.get("limiter_release", 0.05),
+        )
+        board.append(limiter)
+    if kwargs.get("gain", False):
+        gain = Gain(gain_db=kwargs.get("gain_db", 0))
+        board.append(gain)
+    if kwargs.get("distortion", False):
+        distortion = Distortion(drive_db=kwargs.get("distortion_gain", 25))
+        board.append(distortion)
+    if kwargs.get("chorus", False):
+        chorus = Chorus(
+            rate_hz=kwargs.get("chorus_rate", 1.0),
+            depth=kwargs.get("chorus_depth", 0.25),
+            centre_delay_ms=kwargs.get("chorus_delay", 7),
+            feedback=kwargs.get("chorus_feedback", 0.0),
+            mix=kwargs.get("chorus_mix", 0.5),
+        )
+        board.append(chorus)
+    if kwargs.get("bitcrush", False):
+        bitcrush = Bitcrush(bit_depth=kwargs.get("bitcrush_bit_depth", 8))
+        board.append(bitcrush)
+    if kwargs.get("clipping", False):
+        clipping = Clipping(threshold_db=kwargs.get("clipping_threshold", 0))
+        board.append(clipping)
+    if kwargs.get("compressor", False):
+        compressor = Compressor(
+            threshold_db=kwargs.get("compressor_threshold", 0),
+            ratio=kwargs.get("compressor_ratio", 1),
+            attack_ms=kwargs.get("compressor_attack", 1.0),
+            release_ms=kwargs.get("compressor_release", 100),
+        )
+        board.append(compressor)
+    if kwargs.get("delay", False):
+        delay = Delay(
+            delay_seconds=kwargs.get("delay_seconds", 0.5),
+            feedback=kwargs.get("delay_feedback", 0.0),
+            mix=kwargs.get("delay_mix", 0.5),
+        )
+        board.append(delay)
+    return board
+
+
+def get_effects_key(kwargs):
+    """
+    Returns the settings of the enabled effects, which identify an effect chain.
+
+    Args:
+        kwargs (dict): Effect switches and settings of `VoiceConverter.convert_audio`.
+    """
+    return tuple(
+        (effect, tuple(str(kwargs.get(name)) for name in settings))
+        for effect, settings in EFFECT_SETTINGS.items()
+        if kwargs.get(effect, False)
+    )
+
+
+class EffectChainCache:
+    """
+    Keeps built effect chains for reuse by later conversions with the same settings.
+
+    Chains hold the state of their effects, such as reverb tails and delay lines, so
+    `borrow` lends each chain to one conversion at a time and resets it when it comes
+    back; concurrent conversions with the same settings get chains of their own. Idle
+    chains of the least recently used settings are dropped beyond `max_chains` settings.
+
+    Args:
+        max_chains (int): Number of different settings whose chains are kept.
+    """
+
+    def __init__(self, max_chains=MAX_CACHED_CHAINS):
+        self.max_chains = max_chains
+        self.idle = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @contextlib.contextmanager
+    def borrow(self, kwargs):
+        """
+        Lends the effect chain of a conversion, or None if it enables no effects.
+
+        Args:
+            kwargs (dict): Effect switches and settings of `VoiceConverter.convert_audio`.
+        """
+        key = get_effects_key(kwargs)
+        if not key:
+            yield None
+            return
+        with self.lock:
+            chains = self.idle.get(key)
+            board = chains.pop() if chains else None
+            self.stats["hits" if board is not None else "misses"] += 1
+        if board is None:
+            board = build_effect_chain(**kwargs)
+        try:
+            yield board
+        finally:
+            board.reset()
+            with self.lock:
+                self.idle.setdefault(key, []).append(board)
+                self.idle.move_to_end(key)
+                while len(self.idle) > self.max_chains:
+                    self.idle.popitem(last=False)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                **self.stats,
+                "settings": len(self.idle),
+                "idle_chains": sum(len(chains) for chains in self.idle.values()),
+            }
+
+
+class AudioEncoder:
+    """
+    Encodes mono audio block by block straight into an export format.
+
+    WAV output is 16-bit PCM at the model sampling rate, with its header kept valid after
+    every block. Other formats are resampled on the fly to the closest common sampling
+    rate, like `VoiceConverter.convert_audio_format`, and encoded by libsndfile.
+
+    Args:
+        path (str): Path to the output file.
+        sample_rate (int): Sampling rate of the audio.
+        export_format (str, optional): Audio format (e.g., "WAV", "MP3").
+    """
+
+    def __init__(self, path, sample_rate, export_format="WAV"):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self.resampler = None
+        if export_format == "WAV":
+            self.writer = ProgressiveWavWriter(path, sample_rate)
+            self.file = None
+        else:
+            target_sr = min(COMMON_SAMPLE_RATES, key=lambda x: abs(x - sample_rate))
+            if target_sr != sample_rate:
+                self.resampler = soxr.ResampleStream(
+                    sample_rate, target_sr, 1, dtype="float32", quality="VHQ"
+                )
+            self.writer = None
+            self.file = sf.SoundFile(
+                path, "w", target_sr, 1, format=export_format.lower()
+            )
+
+    def write(self, audio):
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        self.frames += audio.shape[0]
+        if self.writer is not None:
+            self.writer.write(audio)
+            return
+        if self.resampler is not None:
+            audio = self.resampler.resample_chunk(audio)
+        self.file.write(audio)
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            return
+        if self.resampler is not None:
+            self.file.write(
+                self.resampler.resample_chunk(np.zeros(0, np.float32), last=True)
+            )
+        self.file.close()
+
+
+def has_latency(board):
+    """
+    Returns whether an effect chain delays its output, see `LATENCY_EFFECTS`.
+
+    Args:
+        board (Pedalboard): The effect chain.
+    """
+    return any(isinstance(plugin, LATENCY_EFFECTS) for plugin in board)
+
+
+class PostProcessor:
+    """
+    Applies an effect chain to converted audio and encodes the result in one pass, block
+    by block, without an intermediate WAV file.
+
+    Blocks go through the chain with `reset=False`, so effect state such as reverb tails
+    and delay lines carries over from one block to the next, and only one block of
+    processed audio exists at a time. Chains with an effect in `LATENCY_EFFECTS` would
+    come out delayed and lose their last samples that way, so their blocks are gathered
+    and the whole signal goes through the chain at `close`, like a single call does.
+
+    Args:
+        output_path (str): Path to the output file.
+        sample_rate (int): Sampling rate of the audio.
+        export_format (str, optional): Audio format (e.g., "WAV", "MP3").
+        effects (Pedalboard, optional): Effect chain, see `EffectChainCache.borrow`.
+        block_seconds (float, optional): Length of the blocks of `run`.
+    """
+
+    def __init__(
+        self,
+        output_path,
+        sample_rate,
+        export_format="WAV",
+        effects=None,
+        block_seconds=POST_BLOCK_SECONDS,
+    ):
+        self.sample_rate = sample_rate
+        self.effects = effects
+        self.block_size = int(block_seconds * sample_rate)
+        self.encoder = AudioEncoder(output_path, sample_rate, export_format)
+        self.pending = [] if effects is not None and has_latency(effects) else None
+
+    def process(self, block):
+        """
+        Applies the effect chain to the next block of audio and encodes it.
+
+        Args:
+            block (numpy.ndarray): The next block of converted audio.
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if self.pending is not None:
+            self.pending.append(block.copy())
+            return
+        if self.effects is not None:
+            block = self.effects(block, self.sample_rate, reset=False)
+        self.encoder.write(block)
+
+    def run(self, audio):
+        """
+        Processes and encodes a whole signal block by block.
+
+        Args:
+            audio (numpy.ndarray): The converted audio.
+        """
+        for start in range(0, audio.shape[0], self.block_size):
+            self.process(audio[start : start + self.block_size])
+
+    @property
+    def duration(self):
+        pending = sum(block.shape[0] for block in self.pending or ())
+        return self.encoder.duration + pending / self.sample_rate
+
+    def close(self):
+        if self.pending:
+            audio = self.effects(np.concatenate(self.pending), self.sample_rate)
+            self.pending = None
+            for start in range(0, audio.shape[0], self.block_size):
+                self.encoder.write(audio[start : start + self.block_size])
+        self.encoder.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_effect_chains = None
+_effect_chains_lock = threading.Lock()
+
+
+def get_effect_chains(max_chains=None):
+    """
+    Returns the process-wide effect chain cache, creating it on first use.
+
+    Args:
+        max_chains (int, optional): Number of different settings whose chains are kept.
+    """
+    global _effect_chains
+    with _effect_chains_lock:
+        if _effect_chains is None:
+            _effect_chains = EffectChainCache(max_chains or MAX_CACHED_CHAINS)
+        elif max_chains is not None:
+            _effect_chains.max_chains = max_chains
+        return _effect_chains
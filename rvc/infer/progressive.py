@@ -0,0 +1,243 @@
+import os
+import sys
+import wave
+import soxr
+import numpy as np
+import soundfile as sf
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.pipeline import bh, ah
+
+DECODE_BLOCK_SECONDS = 10.0
+CROSSFADE_SECONDS = 0.05
+INPUT_PEAK = 0.95  # inputs louder than this are scaled down, like `load_job` does
+
+
+def get_input_gain(path, block_seconds=DECODE_BLOCK_SECONDS):
+    """
+    Returns the gain that brings the peak of an audio file down to `INPUT_PEAK`, or 1 if
+    it is already below, reading the file block by block.
+
+    Args:
+        path (str): Path to the audio file.
+        block_seconds (float, optional): Length of the blocks read at once.
+    """
+    peak = 0.0
+    with sf.SoundFile(path) as file:
+        block_frames = int(block_seconds * file.samplerate)
+        for block in file.blocks(block_frames, dtype="float32", always_2d=True):
+            if block.size:
+                peak = max(peak, float(np.abs(block.mean(axis=1)).max()))
+    return 1 / (peak / INPUT_PEAK) if peak > INPUT_PEAK else 1.0
+
+
+def get_quietest_point(audio, window):
+    # same criterion as `Pipeline.get_split_points`: the smallest absolute moving sum
+    cumsum = np.concatenate(([0.0], np.cumsum(audio, dtype=np.float64)))
+    return int(np.abs(cumsum[window:] - cumsum[:-window]).argmin()) + window // 2
+
+
+class AudioStreamReader:
+    """
+    Decodes an audio file block by block into mono audio at the pipeline sampling rate.
+
+    Decoded samples are kept in a buffer addressed by their absolute position, from which
+    `discard` drops everything that is no longer needed, so memory stays bounded by how
+    far ahead `fill` is asked to read.
+
+    Args:
+        path (str): Path to the audio file.
+        sample_rate (int, optional): Sampling rate of the decoded audio.
+        gain (float, optional): Gain applied to the decoded audio, see `get_input_gain`.
+        block_seconds (float, optional): Length of the blocks read at once.
+    """
+
+    def __init__(
+        self, path, sample_rate=16000, gain=1.0, block_seconds=DECODE_BLOCK_SECONDS
+    ):
+        self.file = sf.SoundFile(path)
+        self.duration = self.file.frames / self.file.samplerate
+        self.gain = gain
+        self.block_frames = int(block_seconds * self.file.samplerate)
+        self.resampler = None
+        if self.file.samplerate != sample_rate:
+            self.resampler = soxr.ResampleStream(
+                self.file.samplerate, sample_rate, 1, dtype="float32", quality="VHQ"
+            )
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.offset = 0
+        self.finished = False
+
+    @property
+    def end(self):
+        return self.offset + self.buffer.shape[0]
+
+    def fill(self, position):
+        """
+        Decodes blocks until the buffer reaches a position or the end of the file.
+
+        Args:
+            position (int): Absolute sample position to decode up to.
+        """
+        while not self.finished and self.end < position:
+            block = self.file.read(self.block_frames, dtype="float32", always_2d=True)
+            last = block.shape[0] < self.block_frames
+            block = np.ascontiguousarray(block.mean(axis=1))
+            if self.resampler is not None:
+                block = self.resampler.resample_chunk(block, last=last)
+            self.buffer = np.concatenate((self.buffer, block * self.gain))
+            if last:
+                self.finished = True
+                self.file.close()
+
+    def get(self, start, end):
+        return self.buffer[start - self.offset : end - self.offset]
+
+    def discard(self, position):
+        """
+        Drops the decoded samples before a position.
+
+        Args:
+            position (int): Absolute sample position.
+        """
+        if position > self.offset:
+            self.buffer = self.buffer[position - self.offset :].copy()
+            self.offset = position
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def iter_chunks(reader, chunk_size, search_size, context, window):
+    """
+    Cuts a stream into chunks and yields them with their surrounding context.
+
+    Every chunk ends at the quietest point of the last `search_size` samples before
+    `chunk_size`, so at most `chunk_size + 2 * context` samples are converted at once.
+    Yields `(offset, start, end, audio, last)`, where `audio` covers the chunk from
+    `start` to `end` plus up to `context` samples on each side, beginning at `offset`.
+
+    Args:
+        reader (AudioStreamReader): The decoded input.
+        chunk_size (int): Longest chunk in samples.
+        search_size (int): Length in samples of the search for the end of a chunk.
+        context (int): Samples of context on each side of a chunk.
+        window (int): Length in samples of the loudness measure.
+    """
+    start = 0
+    while True:
+        reader.fill(start + chunk_size + context)
+        if reader.end <= start:
+            return
+        if reader.end <= start + chunk_size:
+            end = reader.end
+        else:
+            search_start = start + chunk_size - search_size
+            region = signal.filtfilt(
+                bh, ah, reader.get(search_start, start + chunk_size)
+            )
+            end = search_start + get_quietest_point(region, window)
+        last = reader.finished and end >= reader.end
+        offset = max(0, start - context)
+        audio = reader.get(offset, min(reader.end, end + context)).astype(np.float64)
+        yield offset, start, end, audio, last
+        if last:
+            return
+        reader.discard(end - context)
+        start = end
+
+
+class OverlapStitcher:
+    """
+    Joins converted chunks, cutting away their context and crossfading across the cuts.
+
+    Each chunk is converted with context beyond its end, so the first `crossfade`
+    samples past the cut are kept and faded into the start of the next chunk. Output
+    positions are derived from absolute input positions, so rounding never accumulates.
+
+    Args:
+        ratio (float): Output samples per input sample.
+        crossfade (int): Length of the crossfade in output samples.
+    """
+
+    def __init__(self, ratio, crossfade):
+        self.ratio = ratio
+        self.crossfade = crossfade
+        fade = np.sin(0.5 * np.pi * np.linspace(0, 1, crossfade))
+        self.fade_in = np.square(fade).astype(np.float32)
+        self.fade_out = 1 - self.fade_in
+        self.tail = None
+
+    def to_output(self, position):
+        return int(round(position * self.ratio))
+
+    def add(self, audio, offset, start, end, last=False):
+        """
+        Returns the part of a converted chunk that is final.
+
+        Args:
+            audio (numpy.ndarray): The converted chunk with its context.
+            offset (int): Input position where the context begins.
+            start (int): Input position where the chunk begins.
+            end (int): Input position where the chunk ends.
+            last (bool, optional): Whether this is the last chunk of the input.
+        """
+        head = self.to_output(start) - self.to_output(offset)
+        length = self.to_output(end) - self.to_output(start)
+        extra = 0 if last else self.crossfade
+        block = np.array(audio[head : head + length + extra], dtype=np.float32)
+        if self.tail is not None:
+            n = min(self.tail.shape[0], block.shape[0])
+            block[:n] = block[:n] * self.fade_in[:n] + self.tail[:n] * self.fade_out[:n]
+        if last:
+            self.tail = None
+            return block
+        self.tail = block[length:].copy()
+        return block[:length]
+
+
+class ProgressiveWavWriter:
+    """
+    Writes a 16-bit PCM WAV file block by block.
+
+    The header is patched after every block, so the file written so far can be opened
+    and played while the rest is still being rendered.
+
+    Args:
+        path (str): Path to the WAV file.
+        sample_rate (int): Sampling rate of the audio.
+    """
+
+    def __init__(self, path, sample_rate):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self.stream = open(path, "wb")
+        self.file = wave.open(self.stream, "wb")
+        self.file.setnchannels(1)
+        self.file.setsampwidth(2)
+        self.file.setframerate(sample_rate)
+
+    def write(self, audio):
+        """
+        Appends audio, clipping it to full scale.
+
+        Args:
+            audio (numpy.ndarray): Mono audio block in the range [-1, 1].
+        """
+        pcm = np.round(np.clip(audio, -1, 1) * 32767).astype("<i2")
+        self.file.writeframes(pcm.tobytes())
+        self.stream.flush()
+        self.frames += pcm.shape[0]
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def close(self):
+        self.file.close()
+        self.stream.close()
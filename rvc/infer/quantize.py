@@ -0,0 +1,456 @@
+import os
+import sys
+import copy
+import glob
+import time
+import warnings
+import librosa
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.ao import quantization
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.materialize import (
+    create_synthesizer,
+    get_source_stamp,
+    get_test_inputs,
+    materialize_voice,
+)
+from rvc.lib.model_format import load_checkpoint_metadata
+from rvc.lib.utils import load_audio, load_embedding, get_embedder_path
+
+QUANTIZED_SUFFIX = ".int8.pt"
+EMBEDDER_QUANTIZED_NAME = "model.int8.pt"
+ARTIFACT_VERSION = 1
+REFERENCE_PATTERN = os.path.join(now_dir, "logs", "reference", "ref*.wav")
+REFERENCE_SECONDS = 10
+# generator parts that stay in float: the harmonic source and the convs shaping it, and
+# the output conv, whose rounding error would be heard directly
+FLOAT_MODULES = ("m_source", "noise_convs", "filters", "conv_post")
+
+
+def get_quantized_engine():
+    """
+    Selects the best supported quantized engine for this CPU and returns its name.
+    """
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError("This PyTorch build has no quantized CPU engine.")
+
+
+class QuantizedConv(torch.nn.Module):
+    """
+    A float convolution computed in int8: its input is quantized on the way in and its
+    output dequantized on the way out, so the surrounding code keeps working in float.
+
+    Args:
+        conv (torch.nn.Module): The `Conv1d` or `ConvTranspose1d` to quantize.
+    """
+
+    def __init__(self, conv):
+        super().__init__()
+        self.quant = quantization.QuantStub()
+        self.conv = conv
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.conv(self.quant(x)))
+
+
+def get_qconfig(conv, engine):
+    # min/max observers keep calibration on long generator activations fast;
+    # transposed convolutions only support per-tensor weight scales
+    activation = quantization.MinMaxObserver.with_args(
+        dtype=torch.quint8, reduce_range=engine != "qnnpack"
+    )
+    weight = (
+        quantization.default_weight_observer
+        if isinstance(conv, torch.nn.ConvTranspose1d)
+        else quantization.default_per_channel_weight_observer
+    )
+    return quantization.QConfig(activation=activation, weight=weight)
+
+
+def wrap_convs(module, engine, skip=()):
+    for name, child in module.named_children():
+        if name in skip:
+            continue
+        if (
+            type(child) in (torch.nn.Conv1d, torch.nn.ConvTranspose1d)
+            and child.padding_mode == "zeros"
+        ):
+            wrapper = QuantizedConv(child)
+            wrapper.qconfig = get_qconfig(child, engine)
+            setattr(module, name, wrapper)
+        else:
+            wrap_convs(child, engine, skip)
+
+
+def quantize_embedder(model):
+    """
+    Applies dynamic int8 quantization to the linear layers of a HuBERT/ContentVec embedder.
+
+    Attention, feed-forward and projection layers hold nearly all of its compute; the
+    convolutional feature encoder stays in float.
+
+    Args:
+        model (HubertModelWithFinalProj): The float embedder.
+    """
+    get_quantized_engine()
+    return quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_synthesizer(net_g, calibration=()):
+    """
+    Quantizes a synthesizer prepared for inference to int8, in place.
+
+    The convolutions of the text encoder (attention projections and feed-forward) and of
+    the generator are statically quantized with ranges observed while running the
+    `calibration` inputs; the text encoder's linear input projection is dynamically
+    quantized. The flow and `FLOAT_MODULES` stay in float.
+
+    Args:
+        net_g (Synthesizer): The network after `prepare_for_inference`.
+        calibration (list, optional): `Synthesizer.infer` argument tuples used to observe activation ranges.
+    """
+    engine = get_quantized_engine()
+    wrap_convs(net_g.enc_p, engine)
+    wrap_convs(net_g.dec, engine, FLOAT_MODULES)
+    quantization.prepare(net_g, inplace=True)
+    with torch.no_grad():
+        for inputs in calibration:
+            net_g.infer(*inputs)
+    with warnings.catch_warnings():
+        # uncalibrated observers only occur when rebuilding a stored model
+        warnings.simplefilter("ignore")
+        quantization.convert(net_g, inplace=True)
+    quantization.quantize_dynamic(
+        net_g.enc_p, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    return net_g
+
+
+def get_quantized_path(model_path):
+    """
+    Returns the path of the quantized model stored next to a voice model checkpoint.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+    """
+    return os.path.splitext(model_path)[0] + QUANTIZED_SUFFIX
+
+
+def get_reference_path(reference_path=None):
+    """
+    Returns the reference clip used for calibration and quality reports, or None.
+
+    Args:
+        reference_path (str, optional): Explicit path, defaults to the first `logs/reference/ref*.wav`.
+    """
+    if reference_path:
+        return reference_path
+    matches = sorted(glob.glob(REFERENCE_PATTERN))
+    return matches[0] if matches else None
+
+
+def create_reference_pipeline(tgt_sr):
+    from rvc.configs.config import Config
+    from rvc.infer.pipeline import Pipeline
+
+    # quantized models run on the CPU, so the float reference does too
+    config = copy.copy(Config())
+    config.device = "cpu"
+    return Pipeline(tgt_sr, config)
+
+
+def get_reference_f0(vc, audio):
+    """
+    Returns the coarse and fine RMVPE F0 of an audio clip, as `Pipeline.get_f0` does.
+
+    Args:
+        vc (Pipeline): A CPU pipeline.
+        audio (np.ndarray): The clip at 16 kHz.
+    """
+    return vc.get_f0(
+        None, audio, audio.shape[0] // vc.window, 0, "rmvpe", 160, False, 1.0
+    )
+
+
+def get_reference_inputs(vc, audio, embedder, metadata, f0=None):
+    """
+    Computes the `Synthesizer.infer` inputs of an audio clip the way `Pipeline` does.
+
+    Args:
+        vc (Pipeline): A CPU pipeline, used for feature extraction and RMVPE.
+        audio (np.ndarray): The clip at 16 kHz.
+        embedder: The embedder model.
+        metadata (dict): Metadata returned by `build_synthesizer`.
+        f0 (tuple, optional): Result of `get_reference_f0`, computed if None.
+    """
+    with torch.no_grad():
+        feats = vc.extract_features(embedder, [audio], metadata["version"])[0]
+        feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2).permute(0, 2, 1)
+    p_len = min(audio.shape[0] // vc.window, feats.shape[1])
+    phone = feats[:, :p_len].float()
+    lengths = torch.tensor([p_len]).long()
+    sid = torch.tensor([0]).long()
+    pitch = pitchf = None
+    if metadata["use_f0"]:
+        pitch, pitchf = f0 if f0 is not None else get_reference_f0(vc, audio)
+        pitch = torch.tensor(pitch[:p_len]).unsqueeze(0).long()
+        pitchf = torch.tensor(pitchf[:p_len]).unsqueeze(0).float()
+    return phone, lengths, pitch, pitchf, sid
+
+
+def load_reference_audio(reference_path, seconds=REFERENCE_SECONDS):
+    audio = load_audio(reference_path, 16000)[: int(seconds * 16000)]
+    return audio.astype(np.float32)
+
+
+def get_checkpoint_embedder(model_path):
+    # custom embedders are not recorded with their path, so they calibrate with contentvec
+    embedder_model = load_checkpoint_metadata(model_path).get(
+        "embedder_model", "contentvec"
+    )
+    return "contentvec" if embedder_model == "custom" else embedder_model
+
+
+def load_quantized_artifact(path, source_path, build):
+    if not os.path.isfile(path):
+        return None
+    try:
+        artifact = torch.load(path, map_location="cpu", weights_only=True)
+        if (
+            artifact.get("artifact_version") != ARTIFACT_VERSION
+            or artifact.get("source") != get_source_stamp(source_path)
+            or artifact.get("engine") != get_quantized_engine()
+        ):
+            return None
+        model = build(artifact)
+        model.load_state_dict(artifact["weight"])
+        model.memory_size = os.path.getsize(path)
+        return model, artifact
+    except Exception as error:
+        print(f"An error occurred loading the quantized model: {error}")
+        return None
+
+
+def save_quantized_artifact(path, source_path, model, **extra):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        torch.save(
+            {
+                "artifact_version": ARTIFACT_VERSION,
+                "source": get_source_stamp(source_path),
+                "engine": get_quantized_engine(),
+                "weight": model.state_dict(),
+                **extra,
+            },
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+        model.memory_size = os.path.getsize(path)
+    except Exception as error:
+        print(f"An error occurred saving the quantized model: {error}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_quantized_voice(model_path, reference_path=None, refresh=False):
+    """
+    Returns the int8 network of a voice model and its metadata.
+
+    The quantized model is stored next to the checkpoint as `<model>.int8.pt` and reused
+    while the checkpoint is unchanged. New models are calibrated on the reference clip
+    (see `get_reference_path`), or on random features if there is none.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        reference_path (str, optional): Clip used for calibration.
+        refresh (bool, optional): Whether to quantize again even if a stored model is up to date.
+    """
+    quantized_path = get_quantized_path(model_path)
+    if not refresh:
+        loaded = load_quantized_artifact(
+            quantized_path,
+            model_path,
+            lambda artifact: quantize_synthesizer(
+                create_synthesizer(artifact["metadata"]).prepare_for_inference()
+            ),
+        )
+        if loaded is not None:
+            net_g, artifact = loaded
+            return net_g.eval(), artifact["metadata"]
+
+    net_g, metadata = materialize_voice(model_path, "cpu")
+    reference_path = get_reference_path(reference_path)
+    if reference_path and os.path.isfile(reference_path):
+        vc = create_reference_pipeline(metadata["config"][-1])
+        embedder = load_embedding(get_checkpoint_embedder(model_path)).float().eval()
+        audio = load_reference_audio(reference_path)
+        calibration = [get_reference_inputs(vc, audio, embedder, metadata)]
+        del embedder
+    else:
+        print("No reference clip found; calibrating on random features.")
+        calibration = [get_test_inputs(metadata, 1000, seed) for seed in range(4)]
+    net_g = quantize_synthesizer(net_g, calibration).eval()
+    save_quantized_artifact(quantized_path, model_path, net_g, metadata=metadata)
+    return net_g, metadata
+
+
+def load_quantized_embedder(embedder_model, embedder_model_custom=None, refresh=False):
+    """
+    Returns the int8 embedder, stored in the embedder folder as `model.int8.pt`.
+
+    Args:
+        embedder_model (str): Name of the embedder model.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+        refresh (bool, optional): Whether to quantize again even if a stored model exists.
+    """
+    folder = get_embedder_path(embedder_model, embedder_model_custom)
+    quantized_path = os.path.join(folder, EMBEDDER_QUANTIZED_NAME)
+    # `from_pretrained` prefers safetensors weights
+    source_path = os.path.join(folder, "model.safetensors")
+    if not os.path.isfile(source_path):
+        source_path = os.path.join(folder, "pytorch_model.bin")
+    model = None
+    if not refresh:
+        loaded = load_quantized_artifact(
+            quantized_path,
+            source_path,
+            lambda artifact: quantize_embedder(
+                load_embedding(embedder_model, embedder_model_custom).float().eval()
+            ),
+        )
+        model = loaded[0] if loaded is not None else None
+    if model is None:
+        model = load_embedding(embedder_model, embedder_model_custom).float().eval()
+        model = quantize_embedder(model)
+        save_quantized_artifact(quantized_path, source_path, model)
+    return model.eval()
+
+
+def get_mel_distance(reference, output, sample_rate):
+    """
+    Returns the mean absolute difference between the log-mel spectrograms of two signals.
+
+    Args:
+        reference (np.ndarray): The float model's output.
+        output (np.ndarray): The quantized model's output.
+        sample_rate (int): Sampling rate of both signals.
+    """
+    length = min(len(reference), len(output))
+    mels = [
+        np.log(
+            np.maximum(
+                librosa.feature.melspectrogram(
+                    y=signal[:length], sr=sample_rate, n_fft=2048, hop_length=512
+                ),
+                1e-5,
+            )
+        )
+        for signal in (reference, output)
+    ]
+    return float(np.mean(np.abs(mels[0] - mels[1])))
+
+
+def get_f0_error(rmvpe, reference, output, sample_rate):
+    """
+    Returns the RMS pitch difference in cents over frames voiced in both signals, and
+    the fraction of frames whose voicing differs.
+
+    Args:
+        rmvpe (RMVPE0Predictor): F0 predictor.
+        reference (np.ndarray): The float model's output.
+        output (np.ndarray): The quantized model's output.
+        sample_rate (int): Sampling rate of both signals.
+    """
+    f0s = [
+        rmvpe.infer_from_audio(
+            librosa.resample(signal, orig_sr=sample_rate, target_sr=16000), thred=0.03
+        )
+        for signal in (reference, output)
+    ]
+    length = min(len(f0s[0]), len(f0s[1]))
+    f0_reference, f0_output = f0s[0][:length], f0s[1][:length]
+    voiced = (f0_reference > 0) & (f0_output > 0)
+    cents = 1200 * np.log2(f0_output[voiced] / f0_reference[voiced])
+    return (
+        float(np.sqrt(np.mean(cents**2))) if voiced.any() else 0.0,
+        float(np.mean((f0_reference > 0) != (f0_output > 0))),
+    )
+
+
+def quantize_model(
+    model_path,
+    embedder_model="contentvec",
+    embedder_model_custom=None,
+    reference_path=None,
+):
+    """
+    Quantizes a voice model and its embedder, stores both, and reports the quality and
+    speed of the int8 path against the float path on the reference clip.
+
+    Both paths convert the same clip with the same F0 and random seed. The report holds
+    the log-mel distance and F0 error of the int8 output against the float output, and
+    the CPU time of the embedder and synthesizer on each path, F0 estimation excluded.
+
+    Args:
+        model_path (str): Path to the voice model checkpoint.
+        embedder_model (str, optional): Name of the embedder model.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+        reference_path (str, optional): Reference clip, defaults to `get_reference_path`.
+    """
+    reference_path = get_reference_path(reference_path)
+    quantized_net_g, metadata = load_quantized_voice(
+        model_path, reference_path, refresh=True
+    )
+    quantized_embedder = load_quantized_embedder(
+        embedder_model, embedder_model_custom, refresh=True
+    )
+    if not reference_path or not os.path.isfile(reference_path):
+        print("No reference clip found; skipping the quality report.")
+        return {}
+
+    net_g, _ = materialize_voice(model_path, "cpu")
+    embedder = load_embedding(embedder_model, embedder_model_custom).float().eval()
+    vc = create_reference_pipeline(metadata["config"][-1])
+    audio = load_reference_audio(reference_path)
+    f0 = get_reference_f0(vc, audio) if metadata["use_f0"] else None
+
+    outputs, times = [], []
+    for model, synthesizer in (
+        (embedder, net_g),
+        (quantized_embedder, quantized_net_g),
+    ):
+        start_time = time.perf_counter()
+        inputs = get_reference_inputs(vc, audio, model, metadata, f0)
+        with torch.no_grad(), torch.random.fork_rng():
+            torch.manual_seed(0)
+            outputs.append(synthesizer.infer(*inputs)[0][0, 0].numpy())
+        times.append(time.perf_counter() - start_time)
+
+    sample_rate = metadata["config"][-1]
+    cents, voicing = get_f0_error(vc.model_rmvpe, outputs[0], outputs[1], sample_rate)
+    report = {
+        "mel_distance": get_mel_distance(outputs[0], outputs[1], sample_rate),
+        "f0_rmse_cents": cents,
+        "voicing_mismatch": voicing,
+        "float_time": times[0],
+        "int8_time": times[1],
+        "speedup": times[0] / times[1],
+    }
+    print(
+        f"int8 vs float on '{reference_path}': mel distance {report['mel_distance']:.4f}, "
+        f"F0 error {report['f0_rmse_cents']:.1f} cents, "
+        f"voicing mismatch {report['voicing_mismatch']:.1%}, "
+        f"time {report['float_time']:.2f}s -> {report['int8_time']:.2f}s "
+        f"({report['speedup']:.2f}x)"
+    )
+    return report
@@ -0,0 +1,355 @@
+import os
+import sys
+import json
+import time
+import queue
+import inspect
+import threading
+import traceback
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.infer import VoiceConverter
+
+
+def get_convert_defaults():
+    parameters = inspect.signature(VoiceConverter.convert_audio).parameters
+    return {
+        name: parameter.default
+        for name, parameter in parameters.items()
+        if parameter.default is not inspect.Parameter.empty
+        and name not in ("self", "batch_size")
+    }
+
+
+CONVERT_DEFAULTS = {"index_path": "", **get_convert_defaults()}
+REQUIRED_FIELDS = ("audio_input_path", "audio_output_path", "model_path")
+BOOLEAN_FIELDS = ("output_cache", "progressive")
+
+
+class InferenceJob:
+    """
+    A conversion request waiting in the server queue.
+
+    Args:
+        settings (dict): Arguments of `VoiceConverter.convert_audio`, with extra options under "kwargs".
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        # jobs of a micro-batch are converted, cached and written the same way
+        self.key = VoiceConverter.get_group_key(settings) + tuple(
+            settings[name] for name in BOOLEAN_FIELDS
+        )
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+
+
+class InferenceServer:
+    """
+    A long-running local HTTP server that keeps models warm between conversions.
+
+    Requests are placed on a bounded queue; once it is full, new requests are rejected with
+    503 so clients can back off. A single worker thread drains the queue and groups jobs
+    that share a voice model (see `VoiceConverter.get_group_key`) into micro-batches,
+    whose chunks are converted in shared forward passes.
+
+    Endpoints:
+        POST /convert: converts one file, the body holds `convert_audio` arguments.
+        POST /batch_convert: converts every audio file of `input_folder` into `output_folder`.
+        GET /health: liveness check.
+        GET /stats: queue and model pool statistics.
+
+    Args:
+        host (str): Address to bind.
+        port (int): Port to bind.
+        max_queue_size (int): Maximum number of queued jobs.
+        max_batch_jobs (int): Maximum number of jobs grouped into one micro-batch.
+        batch_timeout (float): Seconds to wait for more jobs of the same model.
+        batch_size (int): Number of chunks converted together in one forward pass.
+        backend (str): Inference backend of the models, "torch", "onnx", "int8" or "compile".
+        converter (VoiceConverter, optional): Converter running the jobs, created for `backend` by default.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8000,
+        max_queue_size=16,
+        max_batch_jobs=4,
+        batch_timeout=0.05,
+        batch_size=8,
+        backend="torch",
+        converter=None,
+    ):
+        self.converter = converter or VoiceConverter(backend)
+        self.jobs = queue.Queue(maxsize=max_queue_size)
+        self.pending = deque()
+        self.max_batch_jobs = max_batch_jobs
+        self.batch_timeout = batch_timeout
+        self.batch_size = batch_size
+        self.submit_lock = threading.Lock()
+        self.stats = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "batched_jobs": 0,
+        }
+        self.running = False
+        self.closed = False
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.httpd = ThreadingHTTPServer((host, port), self.get_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def submit(self, requests):
+        """
+        Queues conversion requests, all or none of them.
+
+        Raises `queue.Full` when the queue cannot take every request or the server is
+        shutting down.
+
+        Args:
+            requests (list): Dicts of `convert_audio` arguments.
+        """
+        jobs = [InferenceJob(self.get_settings(request)) for request in requests]
+        with self.submit_lock:
+            if self.closed:
+                raise queue.Full
+            queued = self.jobs.qsize() + len(self.pending)
+            if self.jobs.maxsize and queued + len(jobs) > self.jobs.maxsize:
+                self.stats["rejected"] += len(jobs)
+                raise queue.Full
+            for job in jobs:
+                self.jobs.put_nowait(job)
+        return jobs
+
+    @staticmethod
+    def get_settings(request):
+        missing = [field for field in REQUIRED_FIELDS if not request.get(field)]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+        invalid = [
+            field
+            for field in BOOLEAN_FIELDS
+            if field in request and not isinstance(request[field], bool)
+        ]
+        if invalid:
+            raise ValueError(f"Fields must be true or false: {', '.join(invalid)}")
+        settings = dict(CONVERT_DEFAULTS)
+        kwargs = {}
+        for name, value in request.items():
+            if name in settings or name in REQUIRED_FIELDS:
+                settings[name] = value
+            else:
+                kwargs[name] = value
+        settings["kwargs"] = kwargs
+        return settings
+
+    def next_batch(self):
+        job = self.pending.popleft() if self.pending else self.jobs.get()
+        if job is None:
+            return [None]
+        batch = [job]
+        # pending jobs were taken from the queue earlier and keep their turn
+        for other in list(self.pending):
+            if len(batch) >= self.max_batch_jobs:
+                break
+            if other is not None and other.key == job.key:
+                self.pending.remove(other)
+                batch.append(other)
+        deadline = time.time() + self.batch_timeout
+        while len(batch) < self.max_batch_jobs:
+            try:
+                other = self.jobs.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if other is not None and other.key == job.key:
+                batch.append(other)
+            else:
+                self.pending.append(other)
+        return batch
+
+    def work(self):
+        while self.running:
+            batch = self.next_batch()
+            if batch[0] is None:
+                break
+            try:
+                results = self.converter.convert_jobs_cached(
+                    [job.settings for job in batch], self.batch_size, staged=False
+                )
+            except Exception as error:
+                print(f"An error occurred during audio conversion: {error}")
+                print(traceback.format_exc())
+                results = [error] * len(batch)
+            self.stats["batches"] += 1
+            self.stats["batched_jobs"] += len(batch)
+            for job, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    job.error = str(result)
+                    self.stats["failed"] += 1
+                else:
+                    job.result = result
+                    self.stats["completed"] += 1
+                job.done.set()
+        self.fail_waiting_jobs()
+
+    def fail_waiting_jobs(self):
+        """
+        Fails the jobs still waiting after shutdown, so their clients get a response.
+        """
+        with self.submit_lock:
+            waiting = list(self.pending)
+            self.pending.clear()
+            while True:
+                try:
+                    waiting.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+        for job in waiting:
+            if job is not None:
+                job.error = "The server was shut down."
+                self.stats["failed"] += 1
+                job.done.set()
+
+    def get_stats(self):
+        """
+        Returns the queue, batching and model pool statistics of the server.
+        """
+        return {
+            **self.stats,
+            "queued": self.jobs.qsize() + len(self.pending),
+            "max_queue_size": self.jobs.maxsize,
+            "model_pool": self.converter.model_pool.get_stats(),
+        }
+
+    def serve_forever(self):
+        """
+        Starts the worker and serves requests until `shutdown` is called.
+        """
+        self.start_worker()
+        host, port = self.address[:2]
+        print(f"Inference server listening on http://{host}:{port}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def start_worker(self):
+        if not self.running:
+            self.running = True
+            self.worker.start()
+
+    def shutdown(self):
+        """
+        Stops serving requests and lets the worker finish its current batch.
+
+        Jobs still waiting in the queue fail once the worker has stopped.
+        """
+        with self.submit_lock:
+            self.running = False
+            self.closed = True
+        self.pending.appendleft(None)
+        try:
+            # wakes up a worker waiting on an empty queue
+            self.jobs.put_nowait(None)
+        except queue.Full:
+            pass
+        self.httpd.shutdown()
+        if not self.worker.is_alive():
+            self.fail_waiting_jobs()
+
+    def get_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self.send_json(200, {"status": "ok"})
+                elif self.path == "/stats":
+                    self.send_json(200, server.get_stats())
+                else:
+                    self.send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    if self.path == "/convert":
+                        requests = [request]
+                    elif self.path == "/batch_convert":
+                        requests = self.expand_batch(request)
+                    else:
+                        self.send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+                        return
+                    jobs = server.submit(requests)
+                except queue.Full:
+                    self.send_json(
+                        503, {"error": "The job queue is full."}, {"Retry-After": "1"}
+                    )
+                    return
+                except (ValueError, KeyError, TypeError, OSError) as error:
+                    self.send_json(400, {"error": str(error)})
+                    return
+
+                for job in jobs:
+                    job.done.wait()
+                outputs = [
+                    {
+                        "audio_input_path": job.settings["audio_input_path"],
+                        "output_path": job.result,
+                        "error": job.error,
+                    }
+                    for job in jobs
+                ]
+                failed = any(job.error for job in jobs)
+                if self.path == "/convert":
+                    self.send_json(500 if failed else 200, outputs[0])
+                else:
+                    self.send_json(500 if failed else 200, {"outputs": outputs})
+
+            @staticmethod
+            def expand_batch(request):
+                request = dict(request)
+                input_folder = request.pop("input_folder")
+                output_folder = request.pop("output_folder")
+                if not os.path.isdir(input_folder):
+                    raise ValueError(f"Input folder '{input_folder}' does not exist.")
+                export_format = request.get(
+                    "export_format", CONVERT_DEFAULTS["export_format"]
+                )
+                return [
+                    {
+                        **request,
+                        "audio_input_path": input_path,
+                        "audio_output_path": output_path,
+                    }
+                    for input_path, output_path in VoiceConverter.get_batch_files(
+                        input_folder, output_folder, export_format
+                    )
+                ]
+
+        return Handler
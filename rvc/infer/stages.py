@@ -0,0 +1,165 @@
+import time
+import queue
+import threading
+import traceback
+
+_DONE = object()
+
+
+class StageFailure:
+    """
+    Carries the exception raised for an item past the remaining stages.
+
+    Args:
+        stage (str): Name of the stage that failed.
+        error (Exception): The exception it raised.
+    """
+
+    def __init__(self, stage, error):
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    """
+    One step of a `StagedPipeline`, run by its own pool of threads.
+
+    Args:
+        name (str): Name shown in the statistics.
+        function (callable): Takes the output of the previous stage and returns the input of the next one.
+        workers (int): Number of threads running the stage.
+    """
+
+    def __init__(self, name, function, workers=1):
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.busy_time = 0.0
+        self.items = 0
+        self.max_queued = 0
+        self.lock = threading.Lock()
+
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages that work on different items at the same time.
+
+    Stages are connected by bounded queues, so a fast stage (for example decoding the
+    next file) runs ahead of a slow one (model compute) by at most `queue_size` items
+    instead of filling memory. An exception in a stage only fails that item; it is
+    returned in place of the item's result.
+
+    Args:
+        stages (list): `Stage` objects, in order.
+        queue_size (int): Maximum number of items waiting in front of each stage.
+    """
+
+    def __init__(self, stages, queue_size=2):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.wall_time = 0.0
+
+    def run(self, items):
+        """
+        Passes every item through all stages and returns the results in input order.
+
+        Args:
+            items (list): Inputs of the first stage.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        queues.append(queue.Queue())
+        threads = []
+        for i, stage in enumerate(self.stages):
+            stage.busy_time, stage.items, stage.max_queued = 0.0, 0, 0
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                thread = threading.Thread(
+                    target=self.work,
+                    args=(stage, queues[i], queues[i + 1], remaining),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        start_time = time.time()
+        feeder = threading.Thread(
+            target=self.feed, args=(items, queues[0]), daemon=True
+        )
+        feeder.start()
+        results = [None] * len(items)
+        while True:
+            entry = queues[-1].get()
+            if entry is _DONE:
+                break
+            position, result = entry
+            results[position] = (
+                result.error if isinstance(result, StageFailure) else result
+            )
+        feeder.join()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.time() - start_time
+        return results
+
+    @staticmethod
+    def feed(items, output):
+        for position, item in enumerate(items):
+            output.put((position, item))
+        output.put(_DONE)
+
+    @staticmethod
+    def work(stage, input, output, remaining):
+        while True:
+            entry = input.get()
+            if entry is _DONE:
+                # let the other workers of this stage see the end too
+                input.put(_DONE)
+                with stage.lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    output.put(_DONE)
+                return
+            with stage.lock:
+                stage.max_queued = max(stage.max_queued, input.qsize() + 1)
+            position, item = entry
+            if not isinstance(item, StageFailure):
+                start_time = time.time()
+                try:
+                    item = stage.function(item)
+                except Exception as error:
+                    print(f"An error occurred in the {stage.name} stage: {error}")
+                    print(traceback.format_exc())
+                    item = StageFailure(stage.name, error)
+                with stage.lock:
+                    stage.busy_time += time.time() - start_time
+                    stage.items += 1
+            output.put((position, item))
+
+    def get_stats(self):
+        """
+        Returns, per stage, the items processed, busy seconds and occupancy of the last run.
+
+        Occupancy is the fraction of the run's wall time the stage's threads spent working;
+        the stage closest to 1.0 is the bottleneck.
+        """
+        wall_time = max(self.wall_time, 1e-9)
+        return {
+            stage.name: {
+                "items": stage.items,
+                "workers": stage.workers,
+                "busy_time": round(stage.busy_time, 3),
+                "occupancy": round(stage.busy_time / (wall_time * stage.workers), 3),
+                "max_queued": stage.max_queued,
+            }
+            for stage in self.stages
+        }
+
+    def print_stats(self):
+        print(f"Stage occupancy over {self.wall_time:.2f} seconds:")
+        for name, stats in self.get_stats().items():
+            print(
+                f"  {name}: {stats['occupancy']:.0%} busy, {stats['items']} items, "
+                f"{stats['busy_time']:.2f}s on {stats['workers']} thread(s), "
+                f"max {stats['max_queued']} queued"
+            )
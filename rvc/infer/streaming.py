@@ -0,0 +1,285 @@
+import os
+import sys
+import time
+import torch
+import numpy as np
+import torch.nn.functional as F
+from collections import deque
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.infer.infer import VoiceConverter
+from rvc.infer.pipeline import bh, ah
+from rvc.lib.index_factory import resolve_index_path
+
+
+class StreamingVoiceConverter:
+    """
+    A voice converter that processes audio incrementally, one fixed-size block at a time.
+
+    Every call to `push` appends a 16 kHz input block to a rolling context window, runs F0
+    estimation, the embedder and `Synthesizer.infer` on that window (decoding only its tail),
+    and aligns the result with the previous output using SOLA before crossfading them. The
+    algorithmic latency is `latency` seconds plus the compute time of one block.
+
+    Args:
+        model_path (str): Path to the voice conversion model.
+        index_path (str, optional): Path to the index file.
+        pitch (int, optional): Key for F0 up-sampling.
+        f0_method (str, optional): Method for F0 extraction.
+        index_rate (float, optional): Rate for index matching.
+        protect (float, optional): Protection rate for certain audio segments.
+        hop_length (int, optional): Hop length for the Crepe F0 methods.
+        f0_autotune (bool, optional): Whether to use F0 autotune.
+        f0_autotune_strength (float, optional): Strength of the F0 autotune.
+        embedder_model (str, optional): Embedder model to use.
+        embedder_model_custom (str, optional): Path to the custom embedder model.
+        sid (int, optional): Speaker ID.
+        latency (float, optional): Target end-to-end latency in seconds, excluding compute time.
+        crossfade_time (float, optional): Length of the crossfade between blocks in seconds.
+        sola_search_time (float, optional): Length of the SOLA alignment search in seconds.
+        extra_time (float, optional): Length of the past context fed to the models in seconds.
+        voice_converter (VoiceConverter, optional): Converter used to load and hold the models.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        index_path: str = "",
+        pitch: int = 0,
+        f0_method: str = "rmvpe",
+        index_rate: float = 0.75,
+        protect: float = 0.5,
+        hop_length: int = 128,
+        f0_autotune: bool = False,
+        f0_autotune_strength: float = 1,
+        embedder_model: str = "contentvec",
+        embedder_model_custom: str = None,
+        sid: int = 0,
+        latency: float = 0.3,
+        crossfade_time: float = 0.05,
+        sola_search_time: float = 0.01,
+        extra_time: float = 1.0,
+        voice_converter: VoiceConverter = None,
+    ):
+        self.converter = voice_converter or VoiceConverter()
+        self.converter.get_vc(model_path, sid)
+        if self.converter.net_g is None:
+            raise ValueError(f"Could not load the voice model '{model_path}'.")
+        if (
+            not self.converter.hubert_model
+            or embedder_model != self.converter.last_embedder_model
+        ):
+            self.converter.load_hubert(embedder_model, embedder_model_custom)
+            self.converter.last_embedder_model = embedder_model
+
+        self.pipeline = self.converter.vc
+        self.device = self.pipeline.device
+        self.window = self.pipeline.window
+        self.sample_rate = self.pipeline.sample_rate
+        self.tgt_sr = self.converter.tgt_sr
+        self.upp = self.tgt_sr // 100
+
+        self.pitch = pitch
+        self.f0_method = f0_method
+        self.index_rate = index_rate
+        self.protect = protect
+        self.hop_length = hop_length
+        self.f0_autotune = f0_autotune
+        self.f0_autotune_strength = f0_autotune_strength
+        self.sid = torch.tensor([sid], device=self.device).long()
+
+        index_path = index_path.strip().strip('"').replace("trained", "added")
+        self.index = self.big_npy = None
+        if index_path and os.path.exists(index_path) and index_rate > 0:
+            try:
+                self.index, self.big_npy = self.pipeline.index_cache.get(
+                    resolve_index_path(index_path, sid)
+                )
+            except Exception as error:
+                print(f"An error occurred reading the FAISS index: {error}")
+
+        # sizes in 10 ms frames
+        self.crossfade_frames = self.to_frames(crossfade_time)
+        self.sola_search_frames = self.to_frames(sola_search_time)
+        self.block_frames = self.to_frames(latency - crossfade_time - sola_search_time)
+        self.extra_frames = self.to_frames(extra_time)
+        if self.block_frames < max(self.crossfade_frames, 1):
+            raise ValueError(
+                "The latency must leave a block at least as long as the crossfade."
+            )
+        self.return_frames = (
+            self.crossfade_frames + self.sola_search_frames + self.block_frames
+        )
+        self.total_frames = self.extra_frames + self.return_frames
+
+        self.block_size = self.block_frames * self.window
+        self.block_time = self.block_size / self.sample_rate
+        self.latency = self.return_frames * self.window / self.sample_rate
+        fade = np.sin(0.5 * np.pi * np.linspace(0, 1, self.crossfade_frames * self.upp))
+        self.fade_in = np.square(fade).astype(np.float32)
+        self.fade_out = 1 - self.fade_in
+        self.compute_times = deque(maxlen=1000)
+        self.reset()
+
+    def to_frames(self, seconds):
+        return max(0, int(round(seconds * self.sample_rate / self.window)))
+
+    def reset(self):
+        """
+        Clears the context window, filter state and crossfade buffer.
+        """
+        self.input_buffer = np.zeros(self.total_frames * self.window, dtype=np.float32)
+        self.filter_state = np.zeros(max(len(ah), len(bh)) - 1)
+        self.sola_buffer = None
+        self.compute_times.clear()
+
+    def push(self, block):
+        """
+        Converts one block of audio and returns the converted block.
+
+        Args:
+            block (np.ndarray): Mono 16 kHz audio block of exactly `block_size` samples.
+
+        Returns:
+            np.ndarray: The converted block at the model sampling rate (`tgt_sr`).
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 2:
+            block = block.mean(-1)
+        if block.shape[0] != self.block_size:
+            raise ValueError(
+                f"Expected a block of {self.block_size} samples, got {block.shape[0]}."
+            )
+        start_time = time.perf_counter()
+
+        block, self.filter_state = signal.lfilter(bh, ah, block, zi=self.filter_state)
+        self.input_buffer[: -self.block_size] = self.input_buffer[self.block_size :]
+        self.input_buffer[-self.block_size :] = block
+
+        audio = self.convert_buffer()
+        output = self.crossfade(audio)
+
+        self.compute_times.append(time.perf_counter() - start_time)
+        return output
+
+    def convert_buffer(self):
+        """
+        Converts the context window, decoding only the frames needed for the output.
+        """
+        pipeline = self.pipeline
+        model = self.converter.hubert_model
+        p_len = self.total_frames
+        with torch.no_grad():
+            pitch = pitchf = None
+            if self.converter.use_f0:
+                pitch, pitchf = pipeline.get_f0(
+                    "streaming",
+                    self.input_buffer.astype(np.float64),
+                    p_len,
+                    self.pitch,
+                    self.f0_method,
+                    self.hop_length,
+                    self.f0_autotune,
+                    self.f0_autotune_strength,
+                    use_cache=False,
+                )
+                pitch = torch.tensor(pitch[:p_len], device=self.device)
+                pitchf = torch.tensor(pitchf[:p_len], device=self.device).float()
+                pitch, pitchf = pitch.unsqueeze(0).long(), pitchf.unsqueeze(0)
+
+            feats = torch.from_numpy(self.input_buffer).view(1, -1).to(self.device)
+            output = model(feats)
+            feats = output["last_hidden_state"]
+            if self.converter.version == "v1":
+                feats = (
+                    output["final_proj"]
+                    if "final_proj" in output
+                    else model.final_proj(feats)
+                )
+            feats0 = feats.clone() if pitch is not None else None
+            if self.index:
+                feats = pipeline._retrieve_speaker_embeddings(
+                    feats, self.index, self.big_npy, self.index_rate
+                )
+            feats = self.upsample(feats, p_len)
+
+            if pitch is not None and self.protect < 0.5:
+                feats0 = self.upsample(feats0, p_len)
+                pitchff = pitchf.clone()
+                pitchff[pitchf > 0] = 1
+                pitchff[pitchf < 1] = self.protect
+                feats = feats * pitchff.unsqueeze(-1) + feats0 * (
+                    1 - pitchff.unsqueeze(-1)
+                )
+
+            rate = torch.tensor([self.return_frames / p_len])
+            audio = self.converter.net_g.infer(
+                feats.float(),
+                torch.tensor([p_len], device=self.device).long(),
+                pitch,
+                pitchf,
+                self.sid,
+                rate,
+            )[0][0, 0]
+        return audio[-self.return_frames * self.upp :].data.cpu().float().numpy()
+
+    @staticmethod
+    def upsample(feats, p_len):
+        # the embedder yields slightly fewer frames than the window holds, so the last
+        # frame is repeated to keep the features aligned with the F0 frames
+        feats = F.interpolate(feats.permute(0, 2, 1), scale_factor=2)
+        if feats.shape[-1] < p_len:
+            feats = F.pad(feats, (0, p_len - feats.shape[-1]), mode="replicate")
+        return feats[:, :, :p_len].permute(0, 2, 1)
+
+    def crossfade(self, audio):
+        """
+        Aligns the converted audio with the previous block using SOLA and crossfades them.
+
+        Args:
+            audio (np.ndarray): The converted tail of the context window.
+        """
+        crossfade_size = self.crossfade_frames * self.upp
+        block_size = self.block_frames * self.upp
+        offset = 0
+        if self.sola_buffer is not None and crossfade_size > 0:
+            head = audio[: crossfade_size + self.sola_search_frames * self.upp]
+            correlation = np.correlate(head, self.sola_buffer, mode="valid")
+            energy = np.sqrt(
+                np.convolve(np.square(head), np.ones(crossfade_size), mode="valid")
+                + 1e-8
+            )
+            offset = int(np.argmax(correlation / energy))
+
+        output = audio[offset : offset + block_size].copy()
+        if self.sola_buffer is not None:
+            output[:crossfade_size] = (
+                output[:crossfade_size] * self.fade_in
+                + self.sola_buffer * self.fade_out
+            )
+        self.sola_buffer = audio[
+            offset + block_size : offset + block_size + crossfade_size
+        ].copy()
+        return output
+
+    def get_stats(self):
+        """
+        Returns the per-block compute time statistics of the stream.
+
+        `real_time_factor` is the mean compute time divided by the block duration; the
+        stream keeps up with real time while the maximum compute time stays below it.
+        """
+        times = np.array(self.compute_times) if self.compute_times else np.zeros(1)
+        return {
+            "blocks": len(self.compute_times),
+            "block_time": self.block_time,
+            "latency": self.latency,
+            "last_compute_time": float(times[-1]),
+            "mean_compute_time": float(times.mean()),
+            "max_compute_time": float(times.max()),
+            "real_time_factor": float(times.mean() / self.block_time),
+            "keeps_up": bool(times.max() < self.block_time),
+        }
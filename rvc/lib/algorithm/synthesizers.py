@@ -1,5 +1,6 @@
 import torch
 from typing import Optional
+from torch.nn.utils import parametrize
 from rvc.lib.algorithm.generators.hifigan_mrf import HiFiGANMRFGenerator
 from rvc.lib.algorithm.generators.hifigan_nsf import HiFiGANNSFGenerator
 from rvc.lib.algorithm.generators.hifigan import HiFiGANGenerator
@@ -162,6 +163,30 @@ class Synthesizer(torch.nn.Module):
         for module in [self.dec, self.flow, self.enc_q]:
             self._remove_weight_norm_from(module)
 
+    def prepare_for_inference(self):
+        """
+        Turns the model into a plain inference graph.
+
+        Weight norm and any other parametrization are folded into ordinary weights, so
+        forward passes stop recomputing them, the posterior encoder used only in training
+        is dropped, and gradients are disabled.
+        """
+        if hasattr(self, "enc_q"):
+            del self.enc_q
+        for module in list(self.modules()):
+            if parametrize.is_parametrized(module):
+                for name in list(module.parametrizations.keys()):
+                    parametrize.remove_parametrizations(
+                        module, name, leave_parametrized=True
+                    )
+            for hook in list(module._forward_pre_hooks.values()):
+                if getattr(hook, "__class__", None).__name__ == "WeightNorm":
+                    torch.nn.utils.remove_weight_norm(module)
+                    break
+        for parameter in self.parameters():
+            parameter.requires_grad_(False)
+        return self.eval()
+
     def __prepare_scriptable__(self):
         self.remove_weight_norm()
         return self
@@ -212,6 +237,7 @@ class Synthesizer(torch.nn.Module):
         nsff0: Optional[torch.Tensor] = None,
         sid: torch.Tensor = None,
         rate: Optional[torch.Tensor] = None,
+        noise: Optional[torch.Tensor] = None,
     ):
         """
         Inference of the model.
@@ -223,10 +249,13 @@ class Synthesizer(torch.nn.Module):
             nsff0 (torch.Tensor, optional): Fine-grained pitch sequence.
             sid (torch.Tensor): Speaker embedding.
             rate (torch.Tensor, optional): Rate for time-stretching.
+            noise (torch.Tensor, optional): Standard normal noise shaped like the prior, sampled if None.
         """
         g = self.emb_g(sid).unsqueeze(-1)
         m_p, logs_p, x_mask = self.enc_p(phone, pitch, phone_lengths)
-        z_p = (m_p + torch.exp(logs_p) * torch.randn_like(m_p) * 0.66666) * x_mask
+        if noise is None:
+            noise = torch.randn_like(m_p)
+        z_p = (m_p + torch.exp(logs_p) * noise * 0.66666) * x_mask
 
         if rate is not None:
             head = int(z_p.shape[2] * (1.0 - rate.item()))
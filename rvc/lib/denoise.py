@@ -0,0 +1,173 @@
+import os
+import sys
+import librosa
+import collections
+import concurrent.futures
+import numpy as np
+from scipy import signal
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+# defaults of `noisereduce.reduce_noise`, which this gate reproduces
+N_FFT = 1024
+TIME_CONSTANT_SECONDS = 2.0
+FREQ_MASK_SMOOTH_HZ = 500
+TIME_MASK_SMOOTH_MS = 50
+THRESH_N_MULT = 2
+SIGMOID_SLOPE = 10
+CHUNK_SIZE = 600000  # longest chunk gated at once
+PADDING = 30000  # samples of context gated on each side of a chunk and then cut away
+MIN_CHUNK_SIZE = 4 * PADDING  # shortest chunk a signal is split into for parallelism
+
+
+def get_smoothing_filter(n_grad_freq, n_grad_time):
+    """
+    Returns the normalized triangular kernel that smooths the mask across frequency and time.
+
+    Args:
+        n_grad_freq (int): Frequency bins of the ramp on each side of the center.
+        n_grad_time (int): Frames of the ramp on each side of the center.
+    """
+
+    def ramp(n):
+        return np.concatenate(
+            [np.linspace(0, 1, n + 1, endpoint=False), np.linspace(1, 0, n + 2)]
+        )[1:-1]
+
+    smoothing_filter = np.outer(ramp(n_grad_freq), ramp(n_grad_time))
+    return smoothing_filter / np.sum(smoothing_filter)
+
+
+class SpectralGate:
+    """
+    Non-stationary spectral gating, the default algorithm of `noisereduce.reduce_noise`.
+
+    Each frequency bin is gated against its own magnitude smoothed over
+    `time_constant_s`, so the noise floor follows the signal. The signal is gated in
+    chunks with `padding` samples of context on each side, like noisereduce does for long
+    signals, but the chunks run in parallel on a thread pool and at most `workers` of
+    them are in flight, which bounds the memory of the spectrograms. The STFT window,
+    mask smoothing kernel and smoothing filter are computed once and shared by all chunks.
+
+    Args:
+        sample_rate (int): Sampling rate of the audio.
+        prop_decrease (float, optional): Proportion of the noise removed, from 0 to 1.
+        workers (int, optional): Number of threads; defaults to the number of CPU cores.
+        chunk_size (int, optional): Longest chunk gated at once.
+        padding (int, optional): Samples of context on each side of a chunk.
+    """
+
+    def __init__(
+        self,
+        sample_rate,
+        prop_decrease=1.0,
+        workers=None,
+        chunk_size=CHUNK_SIZE,
+        padding=PADDING,
+    ):
+        self.sample_rate = sample_rate
+        self.prop_decrease = prop_decrease
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.padding = padding
+        self.hop_length = N_FFT // 4
+        n_grad_freq = int(FREQ_MASK_SMOOTH_HZ / (sample_rate / (N_FFT / 2)))
+        n_grad_time = int(TIME_MASK_SMOOTH_MS / (self.hop_length / sample_rate * 1000))
+        self.smoothing_filter = get_smoothing_filter(
+            max(1, n_grad_freq), max(1, n_grad_time)
+        )
+        # one-pole low-pass whose squared response has the width of the time constant
+        t_frames = TIME_CONSTANT_SECONDS * sample_rate / self.hop_length
+        self.smoothing_b = (np.sqrt(1 + 4 * t_frames**2) - 1) / (2 * t_frames**2)
+
+    def get_mask(self, magnitude):
+        smoothed = signal.filtfilt(
+            [self.smoothing_b],
+            [1, self.smoothing_b - 1],
+            magnitude,
+            axis=-1,
+            padtype=None,
+        )
+        # how far each bin rises above its local floor; silent bins count as noise
+        above = np.divide(
+            magnitude - smoothed,
+            smoothed,
+            out=np.full_like(magnitude, -1.0),
+            where=smoothed > 0,
+        )
+        mask = 1 / (1 + np.exp(-(above - THRESH_N_MULT) * SIGMOID_SLOPE))
+        mask = signal.fftconvolve(mask, self.smoothing_filter, mode="same")
+        return mask * self.prop_decrease + (1.0 - self.prop_decrease)
+
+    def gate_chunk(self, audio, start, end):
+        """
+        Returns the gated samples from `start` to `end`, computed with the surrounding
+        context and zeros beyond the ends of the signal.
+
+        Args:
+            audio (numpy.ndarray): The whole mono signal.
+            start (int): First sample of the chunk.
+            end (int): End of the chunk.
+        """
+        padded = np.zeros(end - start + 2 * self.padding, dtype=audio.dtype)
+        first, last = max(0, start - self.padding), min(len(audio), end + self.padding)
+        padded[first - start + self.padding : last - start + self.padding] = audio[
+            first:last
+        ]
+        spectrogram = librosa.stft(padded, n_fft=N_FFT, hop_length=self.hop_length)
+        spectrogram *= self.get_mask(np.abs(spectrogram))
+        gated = librosa.istft(
+            spectrogram, hop_length=self.hop_length, length=padded.shape[0]
+        )
+        return gated[self.padding : self.padding + end - start]
+
+    def __call__(self, audio):
+        """
+        Returns the gated signal, with the length and dtype of the input.
+
+        Args:
+            audio (numpy.ndarray): The mono signal.
+        """
+        audio = np.asarray(audio)
+        output = np.empty_like(audio)
+        chunk_size = -(-audio.shape[0] // self.workers)
+        chunk_size = min(self.chunk_size, max(MIN_CHUNK_SIZE, chunk_size))
+        starts = range(0, audio.shape[0], chunk_size)
+        if len(starts) <= 1 or self.workers == 1:
+            for start in starts:
+                end = min(start + chunk_size, audio.shape[0])
+                output[start:end] = self.gate_chunk(audio, start, end)
+            return output
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            pending = collections.deque()
+            for start in starts:
+                if len(pending) >= self.workers:
+                    done_start, future = pending.popleft()
+                    result = future.result()
+                    output[done_start : done_start + result.shape[0]] = result
+                end = min(start + chunk_size, audio.shape[0])
+                pending.append(
+                    (start, executor.submit(self.gate_chunk, audio, start, end))
+                )
+            for done_start, future in pending:
+                result = future.result()
+                output[done_start : done_start + result.shape[0]] = result
+        return output
+
+
+def reduce_noise(audio, sample_rate, prop_decrease=1.0, workers=None):
+    """
+    Removes noise from mono audio with `SpectralGate`, a multi-core equivalent of
+    `noisereduce.reduce_noise(y=audio, sr=sample_rate, prop_decrease=prop_decrease)`.
+
+    The gate is non-stationary, so there is no noise profile to estimate once; the
+    stationary mode of noisereduce is not reproduced.
+
+    Args:
+        audio (numpy.ndarray): The mono signal.
+        sample_rate (int): Sampling rate of the audio.
+        prop_decrease (float, optional): Proportion of the noise removed, from 0 to 1.
+        workers (int, optional): Number of threads; defaults to the number of CPU cores.
+    """
+    return SpectralGate(sample_rate, prop_decrease, workers)(audio)
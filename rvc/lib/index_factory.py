@@ -0,0 +1,288 @@
+import os
+import sys
+import faiss
+import numpy as np
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+import logging
+
+logging.getLogger("faiss").setLevel(logging.WARNING)
+
+INDEX_TYPES = ["Auto", "Flat", "IVF-Flat", "IVF-PQ", "OPQ-IVF-PQ", "HNSW"]
+DEFAULT_TARGET_LATENCY_US = 50  # search time per feature frame
+# rough batched search throughput of one process; only used to compare index types
+SEARCH_FLOPS_PER_US = 20000
+PQ_MIN_VECTORS = 500000  # below this, uncompressed vectors keep the index small enough
+PQ_SUBVECTOR_DIM = 8  # dimensions per one-byte PQ code
+PQ_CODEBOOK_SIZE = 256  # centroids per one-byte PQ code, each needs a training vector
+HNSW_NEIGHBORS = 32
+HNSW_QUANTIZER_MIN_LISTS = 4096  # above this, lists are found by HNSW, not exhaustively
+HNSW_QUANTIZER_EF_SEARCH = 16
+MAX_EF_SEARCH = 256
+DEFAULT_SEARCH_K = 8
+ADD_BATCH_SIZE = 8192
+TRAIN_POINTS_PER_CENTROID = 40  # faiss warns below 39
+RETRIEVAL_BLOCK_SIZE = 4096
+
+
+def get_speaker_index_path(index_path, sid):
+    """
+    Returns the path of the partition of an index that holds the vectors of one speaker.
+
+    Args:
+        index_path (str): Path to the index of all speakers.
+        sid (int): Speaker ID.
+    """
+    root, extension = os.path.splitext(index_path)
+    return f"{root}.sid{int(sid)}{extension}"
+
+
+def resolve_index_path(index_path, sid=None):
+    """
+    Returns the partition of an index for a speaker if one was built, else the index itself.
+
+    Args:
+        index_path (str): Path to the index of all speakers.
+        sid (int, optional): Speaker ID.
+    """
+    if str(sid).isdigit():
+        speaker_path = get_speaker_index_path(index_path, sid)
+        if os.path.isfile(speaker_path):
+            return speaker_path
+    return index_path
+
+
+def get_nlist(n_vectors):
+    """
+    Returns the number of IVF lists for a dataset, keeping at least 39 training vectors per list.
+
+    Args:
+        n_vectors (int): Number of vectors in the index.
+    """
+    return max(1, min(int(16 * np.sqrt(n_vectors)), n_vectors // 39))
+
+
+def get_pq_size(dim):
+    # the largest code count up to one per `PQ_SUBVECTOR_DIM` dimensions that divides `dim`
+    for m in range(max(1, dim // PQ_SUBVECTOR_DIM), 0, -1):
+        if dim % m == 0:
+            return m
+
+
+def get_factory_string(index_type, n_vectors, dim):
+    """
+    Returns the `faiss.index_factory` description of an index type for a dataset.
+
+    Args:
+        index_type (str): One of `INDEX_TYPES` other than "Auto".
+        n_vectors (int): Number of vectors in the index.
+        dim (int): Dimension of the vectors.
+    """
+    nlist = get_nlist(n_vectors)
+    ivf = f"IVF{nlist}"
+    if nlist >= HNSW_QUANTIZER_MIN_LISTS:
+        ivf += f"_HNSW{HNSW_NEIGHBORS}"
+    m = get_pq_size(dim)
+    if index_type == "Flat":
+        return "Flat"
+    if index_type == "IVF-Flat":
+        return f"{ivf},Flat"
+    if index_type == "IVF-PQ":
+        return f"{ivf},PQ{m}x8"
+    if index_type == "OPQ-IVF-PQ":
+        return f"OPQ{m},{ivf},PQ{m}x8"
+    if index_type == "HNSW":
+        return f"HNSW{HNSW_NEIGHBORS}"
+    raise ValueError(f"Unknown index type '{index_type}'.")
+
+
+def estimate_latency_us(index_type, n_vectors, dim, nprobe=1, ef_search=None):
+    """
+    Estimates the search time per query vector in microseconds from the distances computed.
+
+    Args:
+        index_type (str): One of `INDEX_TYPES` other than "Auto".
+        n_vectors (int): Number of vectors in the index.
+        dim (int): Dimension of the vectors.
+        nprobe (int, optional): IVF lists scanned per query.
+        ef_search (int, optional): HNSW candidate list size.
+    """
+    if index_type == "Flat":
+        flops = n_vectors * dim
+    elif index_type == "HNSW":
+        flops = (ef_search or MAX_EF_SEARCH) * HNSW_NEIGHBORS * dim
+    else:
+        nlist = get_nlist(n_vectors)
+        if nlist >= HNSW_QUANTIZER_MIN_LISTS:
+            flops = HNSW_QUANTIZER_EF_SEARCH * HNSW_NEIGHBORS * dim
+        else:
+            flops = nlist * dim
+        # PQ codes are scanned with one table lookup per code instead of `dim` products
+        code_cost = dim if index_type == "IVF-Flat" else get_pq_size(dim)
+        flops += nprobe * n_vectors / nlist * code_cost
+        if index_type == "OPQ-IVF-PQ":
+            flops += dim * dim
+    return flops / SEARCH_FLOPS_PER_US
+
+
+def select_index_type(n_vectors, dim, target_latency_us=DEFAULT_TARGET_LATENCY_US):
+    """
+    Picks the index type for a dataset.
+
+    Exact search is used while it meets the target latency. Beyond that, IVF-Flat is used
+    until the dataset reaches `PQ_MIN_VECTORS`, then OPQ-IVF-PQ, whose one-byte codes per
+    `PQ_SUBVECTOR_DIM` dimensions keep both the file and the scanned data small.
+
+    Args:
+        n_vectors (int): Number of vectors in the index.
+        dim (int): Dimension of the vectors.
+        target_latency_us (float, optional): Search time per query vector in microseconds.
+    """
+    if estimate_latency_us("Flat", n_vectors, dim) <= target_latency_us:
+        return "Flat"
+    if n_vectors < PQ_MIN_VECTORS:
+        return "IVF-Flat"
+    return "OPQ-IVF-PQ"
+
+
+def get_search_params(
+    index_type, n_vectors, dim, target_latency_us=DEFAULT_TARGET_LATENCY_US
+):
+    """
+    Returns the largest search parameters of an index type that meet the target latency.
+
+    IVF indexes get `nprobe` (and `quantizer_efSearch` when their lists are found by
+    HNSW), HNSW indexes `efSearch`; other types have none.
+
+    Args:
+        index_type (str): One of `INDEX_TYPES` other than "Auto".
+        n_vectors (int): Number of vectors in the index.
+        dim (int): Dimension of the vectors.
+        target_latency_us (float, optional): Search time per query vector in microseconds.
+    """
+    if index_type == "HNSW":
+        ef_search = int(
+            target_latency_us * SEARCH_FLOPS_PER_US / (HNSW_NEIGHBORS * dim)
+        )
+        return {"efSearch": min(max(ef_search, 2 * DEFAULT_SEARCH_K), MAX_EF_SEARCH)}
+    if "IVF" not in index_type:
+        return {}
+    nlist = get_nlist(n_vectors)
+    base = estimate_latency_us(index_type, n_vectors, dim, nprobe=0)
+    per_list = estimate_latency_us(index_type, n_vectors, dim, nprobe=1) - base
+    nprobe = int((target_latency_us - base) / per_list) if per_list > 0 else nlist
+    params = {"nprobe": min(max(nprobe, 1), nlist)}
+    if nlist >= HNSW_QUANTIZER_MIN_LISTS:
+        params["quantizer_efSearch"] = HNSW_QUANTIZER_EF_SEARCH
+    return params
+
+
+def set_search_params(index, params):
+    # ParameterSpace reaches the IVF or HNSW index inside pre-transforms such as OPQ
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        space.set_index_parameter(index, name, value)
+
+
+def create_index(
+    n_vectors, dim, index_type="Auto", target_latency_us=DEFAULT_TARGET_LATENCY_US
+):
+    """
+    Returns an empty, untrained index sized for a dataset, with its search parameters set,
+    and the resolved index type.
+
+    Search parameters are stored in the index file, so inference picks them up without
+    configuration.
+
+    Args:
+        n_vectors (int): Number of vectors the index will hold.
+        dim (int): Dimension of the vectors.
+        index_type (str, optional): One of `INDEX_TYPES`; "Auto" uses `select_index_type`.
+        target_latency_us (float, optional): Search time per query vector in microseconds.
+    """
+    if index_type == "Auto":
+        index_type = select_index_type(n_vectors, dim, target_latency_us)
+    if "PQ" in index_type and n_vectors < PQ_CODEBOOK_SIZE:
+        print(
+            f"{n_vectors} vectors are too few to train {index_type} codebooks; using IVF-Flat."
+        )
+        index_type = "IVF-Flat"
+    factory = get_factory_string(index_type, n_vectors, dim)
+    index = faiss.index_factory(dim, factory)
+    params = get_search_params(index_type, n_vectors, dim, target_latency_us)
+    set_search_params(index, params)
+    settings = "".join(f", {name}={value}" for name, value in params.items())
+    print(
+        f"Creating a {index_type} index ({factory}{settings}) for {n_vectors} vectors."
+    )
+    return index, index_type
+
+
+def get_train_size(index_type, n_vectors):
+    """
+    Returns how many vectors to train an index on: enough for every IVF list and PQ
+    codebook entry to get `TRAIN_POINTS_PER_CENTROID` of them.
+
+    Args:
+        index_type (str): One of `INDEX_TYPES` other than "Auto".
+        n_vectors (int): Number of vectors the index will hold.
+    """
+    centroids = get_nlist(n_vectors) if "IVF" in index_type else 0
+    if "PQ" in index_type:
+        centroids = max(centroids, PQ_CODEBOOK_SIZE)
+    return min(n_vectors, centroids * TRAIN_POINTS_PER_CENTROID)
+
+
+def build_index(
+    vectors, index_type="Auto", target_latency_us=DEFAULT_TARGET_LATENCY_US
+):
+    """
+    Builds a FAISS index of retrieval vectors held in memory.
+
+    The dimension is taken from the vectors.
+
+    Args:
+        vectors (numpy.ndarray): The (n, dim) retrieval vectors.
+        index_type (str, optional): One of `INDEX_TYPES`; "Auto" uses `select_index_type`.
+        target_latency_us (float, optional): Search time per query vector in microseconds.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    index, _ = create_index(n_vectors, dim, index_type, target_latency_us)
+    index.train(vectors)
+    for i in range(0, n_vectors, ADD_BATCH_SIZE):
+        index.add(vectors[i : i + ADD_BATCH_SIZE])
+    return index
+
+
+def retrieve_weighted(
+    index, big_npy, vectors, k=DEFAULT_SEARCH_K, block_size=RETRIEVAL_BLOCK_SIZE
+):
+    """
+    Returns, for each vector, the average of its `k` nearest retrieval vectors weighted by
+    inverse squared distance.
+
+    Rows are searched in blocks and the neighbours are accumulated one rank at a time, so
+    the largest temporary is (block_size, dim) instead of (rows, k, dim).
+
+    Args:
+        index (faiss.Index): The FAISS index.
+        big_npy (numpy.ndarray): The retrieval vectors of the index, possibly memory-mapped.
+        vectors (numpy.ndarray): The (rows, dim) query vectors.
+        k (int, optional): Number of neighbours averaged.
+        block_size (int, optional): Number of rows searched at once.
+    """
+    k = max(1, min(k, index.ntotal))
+    output = np.empty(vectors.shape, dtype=np.float32)
+    for start in range(0, vectors.shape[0], block_size):
+        block = np.ascontiguousarray(vectors[start : start + block_size], np.float32)
+        score, ix = index.search(block, k)
+        weight = np.square(1 / score)
+        weight /= weight.sum(axis=1, keepdims=True)
+        result = output[start : start + block.shape[0]]
+        np.multiply(big_npy[ix[:, 0]], weight[:, :1], out=result)
+        for j in range(1, k):
+            result += big_npy[ix[:, j]] * weight[:, j : j + 1]
+    return output
@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import torch
+from collections.abc import Mapping
+from safetensors import safe_open
+from safetensors.torch import save
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+MODEL_EXTENSION = ".safetensors"
+EMBEDDER_WEIGHTS_NAME = "model.safetensors"
+HEADER_RESERVE = 4096  # spare header bytes so metadata edits fit in place
+COPY_BLOCK_SIZE = 16 * 1024**2
+
+
+def is_model_file(path):
+    return path.endswith(MODEL_EXTENSION)
+
+
+def read_header(path):
+    """
+    Reads the JSON header of a model file without touching the tensor data.
+
+    Returns the header and the byte offset where the tensor data starts.
+
+    Args:
+        path (str): Path to the model file.
+    """
+    with open(path, "rb") as file:
+        header_size = int.from_bytes(file.read(8), "little")
+        header = json.loads(file.read(header_size))
+    return header, 8 + header_size
+
+
+def read_metadata(path):
+    """
+    Returns the metadata stored in the header of a model file.
+
+    Args:
+        path (str): Path to the model file.
+    """
+    with safe_open(path, framework="pt") as file:
+        return decode_metadata(file.metadata() or {})
+
+
+def encode_metadata(metadata):
+    # the format only allows string values: strings that do not parse as JSON are stored
+    # as they are (tools such as transformers expect that), everything else as JSON
+    encoded = {}
+    for key, value in metadata.items():
+        if isinstance(value, str):
+            try:
+                json.loads(value)
+            except ValueError:
+                encoded[key] = value
+                continue
+        encoded[key] = json.dumps(value, default=str)
+    return encoded
+
+
+def decode_metadata(metadata):
+    decoded = {}
+    for key, value in metadata.items():
+        try:
+            decoded[key] = json.loads(value)
+        except ValueError:
+            decoded[key] = value
+    return decoded
+
+
+def encode_header(header, reserve=HEADER_RESERVE):
+    data = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # keep the tensor data 8-byte aligned
+    size = (len(data) + reserve + 7) // 8 * 8
+    return data + b" " * (size - len(data))
+
+
+class LazyTensors(Mapping):
+    """
+    A read-only mapping of the tensors of a model file, memory-mapped when opened.
+
+    Each tensor is read from the mapping when it is accessed, so only the weights
+    actually used are read from disk.
+
+    Args:
+        path (str): Path to the model file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = safe_open(path, framework="pt")
+        self.names = list(self.file.keys())
+
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        return self.file.get_tensor(name)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def save_model(path, tensors, metadata=None):
+    """
+    Writes tensors and metadata to a model file.
+
+    The file is written by safetensors, with spare header space so `update_metadata`
+    can usually rewrite the metadata in place.
+
+    Args:
+        path (str): Path to the model file.
+        tensors (dict): Tensors by name.
+        metadata (dict, optional): JSON-serializable metadata.
+    """
+    tensors = {
+        name: tensor.detach().cpu().contiguous() for name, tensor in tensors.items()
+    }
+    data = save(tensors, metadata=encode_metadata(metadata or {}))
+    data_offset = 8 + int.from_bytes(data[:8], "little")
+    header_bytes = encode_header(json.loads(data[8:data_offset]))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(len(header_bytes).to_bytes(8, "little"))
+            file.write(header_bytes)
+            file.write(memoryview(data)[data_offset:])
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def update_metadata(path, updates, output_path=None):
+    """
+    Changes metadata entries of a model file without rewriting its tensors.
+
+    The header is rewritten in place when it still fits in the reserved space; otherwise,
+    or when writing to `output_path`, the tensor data is copied unchanged after the new header.
+
+    Args:
+        path (str): Path to the model file.
+        updates (dict): Metadata entries to set; entries set to None are removed.
+        output_path (str, optional): Where to write the result, defaults to `path`.
+    """
+    header, data_offset = read_header(path)
+    metadata = decode_metadata(header.get("__metadata__", {}))
+    for key, value in updates.items():
+        if value is None:
+            metadata.pop(key, None)
+        else:
+            metadata[key] = value
+    header["__metadata__"] = encode_metadata(metadata)
+
+    output_path = output_path or path
+    header_bytes = encode_header(header, reserve=0)
+    if os.path.abspath(output_path) == os.path.abspath(path) and (
+        len(header_bytes) <= data_offset - 8
+    ):
+        with open(path, "r+b") as file:
+            file.seek(8)
+            file.write(header_bytes + b" " * (data_offset - 8 - len(header_bytes)))
+        return output_path
+
+    header_bytes = encode_header(header)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(path, "rb") as source, open(tmp_path, "wb") as target:
+            target.write(len(header_bytes).to_bytes(8, "little"))
+            target.write(header_bytes)
+            source.seek(data_offset)
+            for block in iter(lambda: source.read(COPY_BLOCK_SIZE), b""):
+                target.write(block)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+def load_checkpoint(path):
+    """
+    Loads a voice model as the checkpoint dict that `torch.load` returns for a `.pth`.
+
+    Model files are memory-mapped and their weights are read lazily; `.pth` files are
+    loaded with `torch.load`.
+
+    Args:
+        path (str): Path to the `.pth` or model file.
+    """
+    if is_model_file(path):
+        checkpoint = read_metadata(path)
+        checkpoint["weight"] = LazyTensors(path)
+        return checkpoint
+    return torch.load(path, map_location="cpu", weights_only=True)
+
+
+def load_checkpoint_metadata(path):
+    """
+    Returns the checkpoint entries of a voice model other than its weights.
+
+    Model files only have their header read; `.pth` files are memory-mapped, so their
+    weights are not read either.
+
+    Args:
+        path (str): Path to the `.pth` or model file.
+    """
+    if is_model_file(path):
+        return read_metadata(path)
+    try:
+        checkpoint = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+    except RuntimeError:
+        # checkpoints in the legacy (non-zip) format cannot be memory-mapped
+        checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    checkpoint.pop("weight", None)
+    checkpoint.pop("model", None)
+    return checkpoint
+
+
+def convert_checkpoint(path, output_path=None):
+    """
+    Converts a `.pth` voice model into the model file format.
+
+    Returns the path of the written file.
+
+    Args:
+        path (str): Path to the `.pth` file.
+        output_path (str, optional): Path of the model file, defaults to `path` with the model extension.
+    """
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    weight = checkpoint.pop("weight")
+    output_path = output_path or os.path.splitext(path)[0] + MODEL_EXTENSION
+    save_model(output_path, weight, checkpoint)
+    return output_path
+
+
+def convert_embedder(folder):
+    """
+    Stores the weights of an embedder folder as `model.safetensors`.
+
+    `from_pretrained` prefers that file over `pytorch_model.bin` and memory-maps it.
+    Returns the path of the written file.
+
+    Args:
+        folder (str): Path to the embedder folder.
+    """
+    from rvc.lib.utils import HubertModelWithFinalProj
+
+    model = HubertModelWithFinalProj.from_pretrained(folder)
+    output_path = os.path.join(folder, EMBEDDER_WEIGHTS_NAME)
+    # transformers only loads safetensors weights tagged with the PyTorch format
+    save_model(output_path, model.state_dict(), {"format": "pt"})
+    return output_path
+
+
+def convert_model(path, output_path=None):
+    """
+    Converts a `.pth` voice model or an embedder folder, returning the written path.
+
+    Args:
+        path (str): Path to the `.pth` file or the embedder folder.
+        output_path (str, optional): Path of the converted voice model.
+    """
+    if os.path.isdir(path):
+        return convert_embedder(path)
+    return convert_checkpoint(path, output_path)
@@ -5,11 +5,8 @@ import numpy as np
 import resampy
 import torch
 import torchcrepe
-import torchfcpe
-import os
 
-# from tools.anyf0.rmvpe import RMVPE
-from rvc.lib.predictors.RMVPE import RMVPE0Predictor
+from rvc.lib.predictors.registry import get_predictor_registry
 from rvc.configs.config import Config
 
 config = Config()
@@ -41,15 +38,16 @@ class F0Extractor:
         method = self.method
         if method == "crepe":
             wav16k_torch = torch.FloatTensor(self.wav16k).unsqueeze(0).to(config.device)
-            f0 = torchcrepe.predict(
-                wav16k_torch,
-                sample_rate=16000,
-                hop_length=160,
-                batch_size=512,
-                fmin=self.f0_min,
-                fmax=self.f0_max,
-                device=config.device,
-            )
+            with get_predictor_registry().crepe("full", config.device):
+                f0 = torchcrepe.predict(
+                    wav16k_torch,
+                    sample_rate=16000,
+                    hop_length=160,
+                    batch_size=512,
+                    fmin=self.f0_min,
+                    fmax=self.f0_max,
+                    device=config.device,
+                )
             f0 = f0[0].cpu().numpy()
         elif method == "fcpe":
             audio = librosa.to_mono(self.x)
@@ -62,7 +60,7 @@ class F0Extractor:
                 .unsqueeze(-1)
                 .to(config.device)
             )
-            model = torchfcpe.spawn_bundled_infer_model(device=config.device)
+            model = get_predictor_registry().get_torchfcpe(config.device)
 
             f0 = model.infer(
                 audio,
@@ -76,11 +74,7 @@ class F0Extractor:
             )
             f0 = f0.squeeze().cpu().numpy()
         elif method == "rmvpe":
-            model_rmvpe = RMVPE0Predictor(
-                os.path.join("rvc", "models", "predictors", "rmvpe.pt"),
-                device=config.device,
-                # hop_length=80
-            )
+            model_rmvpe = get_predictor_registry().get_rmvpe(config.device)
             f0 = model_rmvpe.infer_from_audio(self.wav16k, thred=0.03)
 
         else:
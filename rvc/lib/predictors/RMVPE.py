@@ -8,6 +8,8 @@ from typing import List
 
 N_MELS = 128
 N_CLASS = 360
+HOP_LENGTH = 160
+CHUNK_OVERLAP_FRAMES = 256
 
 
 class ConvBlockRes(nn.Module):
@@ -424,14 +426,16 @@ class RMVPE0Predictor:
     Args:
         model_path (str): Path to the RMVPE0 model file.
         device (str, optional): Device to use for computation. Defaults to None, which uses CUDA if available.
+        model (callable, optional): Network used instead of the `E2E` weights at `model_path`, such as an ONNX Runtime session.
     """
 
-    def __init__(self, model_path, device=None):
+    def __init__(self, model_path, device=None, model=None):
         self.resample_kernel = {}
-        model = E2E(4, 1, (2, 2))
-        ckpt = torch.load(model_path, map_location="cpu", weights_only=True)
-        model.load_state_dict(ckpt)
-        model.eval()
+        if model is None:
+            model = E2E(4, 1, (2, 2))
+            ckpt = torch.load(model_path, map_location="cpu", weights_only=True)
+            model.load_state_dict(ckpt)
+            model.eval()
         self.model = model
         self.resample_kernel = {}
         self.device = device
@@ -470,14 +474,43 @@ class RMVPE0Predictor:
         f0[f0 == 10] = 0
         return f0
 
-    def infer_from_audio(self, audio, thred=0.03):
+    def infer_from_audio(
+        self,
+        audio,
+        thred=0.03,
+        chunk_frames=None,
+        overlap_frames=CHUNK_OVERLAP_FRAMES,
+    ):
         """
         Infers F0 from audio.
 
+        With `chunk_frames` set, the audio is processed in chunks of that many frames, each
+        extended by `overlap_frames` of context on both sides that is discarded afterwards.
+        Peak memory then stays bounded regardless of the input length.
+
         Args:
             audio (np.ndarray): Audio signal.
             thred (float, optional): Threshold for salience. Defaults to 0.03.
+            chunk_frames (int, optional): Number of 10 ms frames per chunk. Defaults to None (no chunking).
+            overlap_frames (int, optional): Context frames added on each side of a chunk.
         """
+        n_frames = audio.shape[0] // HOP_LENGTH + 1
+        if not chunk_frames or n_frames <= chunk_frames + overlap_frames:
+            return self.infer_from_chunk(audio, thred)
+
+        chunk_frames = max(chunk_frames, 32)
+        f0 = np.zeros(n_frames)
+        for start in range(0, n_frames, chunk_frames):
+            end = min(start + chunk_frames, n_frames)
+            context_start = max(0, start - overlap_frames)
+            context_end = min(n_frames, end + overlap_frames)
+            chunk = audio[context_start * HOP_LENGTH : context_end * HOP_LENGTH]
+            f0[start:end] = self.infer_from_chunk(chunk, thred)[
+                start - context_start : end - context_start
+            ]
+        return f0
+
+    def infer_from_chunk(self, audio, thred=0.03):
         audio = torch.from_numpy(audio).float().to(self.device).unsqueeze(0)
         mel = self.mel_extractor(audio, center=True)
         hidden = self.mel2hidden(mel)
@@ -495,16 +528,10 @@ class RMVPE0Predictor:
         """
         center = np.argmax(salience, axis=1)
         salience = np.pad(salience, ((0, 0), (4, 4)))
-        center += 4
-        todo_salience = []
-        todo_cents_mapping = []
-        starts = center - 4
-        ends = center + 5
-        for idx in range(salience.shape[0]):
-            todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
-            todo_cents_mapping.append(self.cents_mapping[starts[idx] : ends[idx]])
-        todo_salience = np.array(todo_salience)
-        todo_cents_mapping = np.array(todo_cents_mapping)
+        # window of 9 bins around the peak, shifted by the padding
+        indices = center[:, None] + np.arange(9)
+        todo_salience = np.take_along_axis(salience, indices, axis=1)
+        todo_cents_mapping = self.cents_mapping[indices]
         product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
         weight_sum = np.sum(todo_salience, 1)
         devided = product_sum / weight_sum
@@ -0,0 +1,236 @@
+import os
+import sys
+import torch
+import threading
+from contextlib import contextmanager
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.predictors.RMVPE import RMVPE0Predictor
+from rvc.lib.predictors.FCPE import FCPEF0Predictor
+
+RMVPE_PATH = os.path.join("rvc", "models", "predictors", "rmvpe.pt")
+FCPE_PATH = os.path.join("rvc", "models", "predictors", "fcpe.pt")
+PREDICTORS = ["rmvpe", "fcpe", "torchfcpe", "crepe", "crepe-tiny"]
+
+
+class PredictorRegistry:
+    """
+    A process-wide registry of F0 predictors that loads each model once per device.
+
+    Loading is serialized per predictor, so concurrent first requests share one load, and
+    the loaded predictors can be used from several threads at once. Crepe keeps its model
+    in module globals of `torchcrepe`; `crepe` swaps the requested model in and only lets
+    callers of the same model run concurrently.
+    """
+
+    def __init__(self):
+        self.predictors = {}
+        self.load_locks = {}
+        self.lock = threading.Lock()
+        self.crepe_condition = threading.Condition()
+        self.crepe_active = None
+        self.crepe_users = 0
+
+    def _get(self, key, loader):
+        with self.lock:
+            if key in self.predictors:
+                return self.predictors[key]
+            load_lock = self.load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self.lock:
+                if key in self.predictors:
+                    return self.predictors[key]
+            predictor = loader()
+            with self.lock:
+                self.predictors[key] = predictor
+            return predictor
+
+    def get_rmvpe(self, device, backend="torch"):
+        """
+        Returns the RMVPE predictor for a device.
+
+        With the "onnx" backend, the network runs on ONNX Runtime (see `load_onnx_rmvpe`)
+        while the mel spectrogram is still computed on `device`.
+
+        Args:
+            device (str): Device the model runs on.
+            backend (str, optional): Inference backend; "onnx" uses ONNX Runtime, anything else PyTorch.
+        """
+        if backend == "onnx":
+            from rvc.infer.onnx_backend import load_onnx_rmvpe
+
+            return self._get(
+                ("rmvpe", str(device), backend),
+                lambda: RMVPE0Predictor(
+                    RMVPE_PATH, device=device, model=load_onnx_rmvpe(device)
+                ),
+            )
+        return self._get(
+            ("rmvpe", str(device)), lambda: RMVPE0Predictor(RMVPE_PATH, device=device)
+        )
+
+    def get_fcpe(
+        self,
+        device,
+        hop_length=160,
+        f0_min=50,
+        f0_max=1100,
+        sample_rate=16000,
+        threshold=0.03,
+    ):
+        """
+        Returns the FCPE predictor for a device and set of decoding settings.
+
+        Args:
+            device (str): Device the model runs on.
+            hop_length (int, optional): Hop length of the F0 frames.
+            f0_min (int, optional): Minimum F0 value.
+            f0_max (int, optional): Maximum F0 value.
+            sample_rate (int, optional): Sampling rate of the input audio.
+            threshold (float, optional): Voicing threshold.
+        """
+        settings = (hop_length, int(f0_min), int(f0_max), sample_rate, threshold)
+        return self._get(
+            ("fcpe", str(device)) + settings,
+            lambda: FCPEF0Predictor(
+                FCPE_PATH,
+                hop_length=hop_length,
+                f0_min=int(f0_min),
+                f0_max=int(f0_max),
+                dtype=torch.float32,
+                device=device,
+                sample_rate=sample_rate,
+                threshold=threshold,
+            ),
+        )
+
+    def get_torchfcpe(self, device):
+        """
+        Returns the bundled torchfcpe model for a device.
+
+        Args:
+            device (str): Device the model runs on.
+        """
+        import torchfcpe
+
+        return self._get(
+            ("torchfcpe", str(device)),
+            lambda: torchfcpe.spawn_bundled_infer_model(device=device),
+        )
+
+    def get_crepe(self, model, device):
+        """
+        Returns the torchcrepe network of a given capacity for a device.
+
+        Args:
+            model (str): Crepe model capacity ("full" or "tiny").
+            device (str): Device the model runs on.
+        """
+        return self._get(
+            ("crepe", model, str(device)), lambda: self._load_crepe(model, device)
+        )
+
+    def _load_crepe(self, model, device):
+        import torchcrepe
+
+        # torchcrepe only loads into its globals, so wait until nobody predicts with them
+        with self.crepe_condition:
+            while self.crepe_users:
+                self.crepe_condition.wait()
+            previous = getattr(torchcrepe.infer, "model", None)
+            previous_capacity = getattr(torchcrepe.infer, "capacity", None)
+            torchcrepe.load.model(torch.device(device), model)
+            crepe_model = torchcrepe.infer.model
+            if previous is not None:
+                torchcrepe.infer.model = previous
+                torchcrepe.infer.capacity = previous_capacity
+            return crepe_model
+
+    @contextmanager
+    def crepe(self, model, device):
+        """
+        Makes `torchcrepe.predict` use the registry's crepe model inside the `with` block.
+
+        Args:
+            model (str): Crepe model capacity ("full" or "tiny").
+            device (str): Device the model runs on.
+        """
+        import torchcrepe
+
+        crepe_model = self.get_crepe(model, device)
+        with self.crepe_condition:
+            while self.crepe_users and self.crepe_active is not crepe_model:
+                self.crepe_condition.wait()
+            torchcrepe.infer.model = crepe_model
+            torchcrepe.infer.capacity = model
+            self.crepe_active = crepe_model
+            self.crepe_users += 1
+        try:
+            yield crepe_model
+        finally:
+            with self.crepe_condition:
+                self.crepe_users -= 1
+                self.crepe_condition.notify_all()
+
+    def warmup(self, methods, device, backend="torch"):
+        """
+        Loads the predictors of the given F0 methods ahead of their first use.
+
+        Args:
+            methods (list): F0 methods, any of `PREDICTORS`.
+            device (str): Device the models run on.
+            backend (str, optional): Inference backend of RMVPE, see `get_rmvpe`.
+        """
+        for method in methods:
+            if method == "rmvpe":
+                self.get_rmvpe(device, backend)
+            elif method == "fcpe":
+                self.get_fcpe(device)
+            elif method == "torchfcpe":
+                self.get_torchfcpe(device)
+            elif method in ("crepe", "crepe-tiny"):
+                self.get_crepe("tiny" if method == "crepe-tiny" else "full", device)
+            else:
+                raise ValueError(f"Unknown F0 predictor: {method}")
+
+    def unload(self, name=None, device=None):
+        """
+        Drops loaded predictors, optionally restricted to one predictor name or device.
+
+        Args:
+            name (str, optional): Predictor name ("rmvpe", "fcpe", "torchfcpe" or "crepe").
+            device (str, optional): Device of the predictors to drop.
+        """
+        with self.lock:
+            for key in list(self.predictors):
+                if name is not None and key[0] != name:
+                    continue
+                if device is not None and str(device) not in key:
+                    continue
+                del self.predictors[key]
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def loaded(self):
+        """
+        Returns the keys of the currently loaded predictors.
+        """
+        with self.lock:
+            return list(self.predictors)
+
+
+_predictor_registry = None
+_predictor_registry_lock = threading.Lock()
+
+
+def get_predictor_registry():
+    """
+    Returns the process-wide predictor registry, creating it on first use.
+    """
+    global _predictor_registry
+    with _predictor_registry_lock:
+        if _predictor_registry is None:
+            _predictor_registry = PredictorRegistry()
+        return _predictor_registry
@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import multiprocessing
+import faiss
+import numpy as np
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.index_factory import (
+    ADD_BATCH_SIZE,
+    DEFAULT_SEARCH_K,
+    DEFAULT_TARGET_LATENCY_US,
+    RETRIEVAL_BLOCK_SIZE,
+    create_index,
+    get_factory_string,
+    get_search_params,
+    get_train_size,
+    set_search_params,
+)
+from rvc.train.process.index_builder import (
+    get_feature_files,
+    get_feature_rows,
+    sample_vectors,
+)
+
+DEFAULT_CONFIGS = [
+    "Flat",
+    "IVF-Flat:nprobe=1",
+    "IVF-Flat:nprobe=8",
+    "IVF-Flat:nprobe=32",
+    "IVF-PQ:nprobe=8",
+    "OPQ-IVF-PQ:nprobe=8",
+    "HNSW:efSearch=64",
+    "Auto",
+]
+DEFAULT_MAX_VECTORS = 200000
+DEFAULT_QUERIES = 10000
+SEARCH_RUNS = 3
+SYNTHETIC_CLUSTERS = 256
+SYNTHETIC_SPREAD = 0.5
+
+
+def parse_config(config):
+    """
+    Parses a candidate written as `<index type>[:<param>=<value>,...]`, such as
+    "IVF-Flat:nprobe=8", into the index type and its search parameter overrides.
+
+    Args:
+        config (str): The candidate description.
+    """
+    index_type, _, params = config.partition(":")
+    overrides = {}
+    for param in filter(None, params.split(",")):
+        name, _, value = param.partition("=")
+        overrides[name.strip()] = int(value)
+    return index_type.strip(), overrides
+
+
+def get_resident_memory():
+    # resident set size of this process in bytes, or None where it cannot be read
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def make_synthetic_vectors(count, dim, seed=0):
+    """
+    Returns clustered Gaussian vectors standing in for embedder features.
+
+    Args:
+        count (int): Number of vectors.
+        dim (int): Dimension of the vectors.
+        seed (int, optional): Seed of the generator.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((SYNTHETIC_CLUSTERS, dim), dtype=np.float32)
+    labels = rng.integers(SYNTHETIC_CLUSTERS, size=count)
+    noise = rng.standard_normal((count, dim), dtype=np.float32)
+    return centers[labels] + SYNTHETIC_SPREAD * noise
+
+
+def load_benchmark_vectors(
+    feature_dir=None,
+    max_vectors=DEFAULT_MAX_VECTORS,
+    n_queries=DEFAULT_QUERIES,
+    synthetic_dim=768,
+    seed=0,
+):
+    """
+    Returns the database and held-out query vectors of a benchmark, both in random order.
+
+    With a feature folder, up to `max_vectors` database vectors and `n_queries` queries
+    are drawn from it without overlap; otherwise synthetic vectors are generated.
+
+    Args:
+        feature_dir (str, optional): Path to an experiment's `extracted` folder.
+        max_vectors (int, optional): Largest number of database vectors.
+        n_queries (int, optional): Number of query vectors.
+        synthetic_dim (int, optional): Dimension of synthetic vectors.
+        seed (int, optional): Seed of the draw.
+    """
+    if feature_dir:
+        paths = get_feature_files(feature_dir)
+        rows, _ = get_feature_rows(paths)
+        n_queries = min(n_queries, sum(rows) // 10)
+        vectors = sample_vectors(paths, rows, max_vectors + n_queries, seed)
+        vectors = vectors[np.random.default_rng(seed).permutation(len(vectors))]
+    else:
+        vectors = make_synthetic_vectors(max_vectors + n_queries, synthetic_dim, seed)
+    return vectors[n_queries:], vectors[:n_queries]
+
+
+def get_exact_neighbors(database, queries, k=DEFAULT_SEARCH_K):
+    index = faiss.IndexFlatL2(database.shape[1])
+    index.add(database)
+    return index.search(queries, k)[1]
+
+
+def measure_index(index_path, queries, truth, k=DEFAULT_SEARCH_K, runs=SEARCH_RUNS):
+    """
+    Loads an index file and measures its resident memory, search latency and recall.
+
+    Meant to run in a fresh process, so the memory growth is the index alone. Latency is
+    the best of `runs` searches of all queries, in the blocks used for retrieval.
+
+    Args:
+        index_path (str): Path to the index file.
+        queries (numpy.ndarray): The (n, dim) query vectors.
+        truth (numpy.ndarray): The exact `k` nearest neighbours of each query.
+        k (int, optional): Number of neighbours searched.
+        runs (int, optional): Number of timed searches.
+    """
+    before = get_resident_memory()
+    index = faiss.read_index(index_path)
+    after = get_resident_memory()
+    memory = after - before if before is not None and after is not None else None
+
+    def search():
+        return np.concatenate(
+            [
+                index.search(queries[i : i + RETRIEVAL_BLOCK_SIZE], k)[1]
+                for i in range(0, len(queries), RETRIEVAL_BLOCK_SIZE)
+            ]
+        )
+
+    neighbors = search()  # warm up
+    elapsed = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        search()
+        elapsed.append(time.perf_counter() - start_time)
+    found = (neighbors[:, :, None] == truth[:, None, :]).any(axis=2).sum(axis=1)
+    return {
+        "memory_mb": memory / 1024**2 if memory is not None else None,
+        "latency_us": min(elapsed) / len(queries) * 1e6,
+        f"recall@{k}": float(found.mean() / truth.shape[1]),
+    }
+
+
+def measure_in_subprocess(index_path, queries, truth, k=DEFAULT_SEARCH_K):
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(measure_index, (index_path, queries, truth, k))
+
+
+def benchmark_config(
+    config,
+    database,
+    queries,
+    truth,
+    tmp_dir,
+    k=DEFAULT_SEARCH_K,
+    target_latency_us=DEFAULT_TARGET_LATENCY_US,
+):
+    """
+    Builds one candidate index on the database vectors and measures it.
+
+    Args:
+        config (str): The candidate, see `parse_config`.
+        database (numpy.ndarray): The (n, dim) database vectors, in random order.
+        queries (numpy.ndarray): The (n, dim) query vectors.
+        truth (numpy.ndarray): The exact `k` nearest neighbours of each query.
+        tmp_dir (str): Folder the candidate index file is written to.
+        k (int, optional): Number of neighbours searched.
+        target_latency_us (float, optional): Target latency of automatic settings.
+    """
+    index_type, overrides = parse_config(config)
+    n_vectors, dim = database.shape
+    start_time = time.perf_counter()
+    index, index_type = create_index(n_vectors, dim, index_type, target_latency_us)
+    if not index.is_trained:
+        # the database is in random order, so its head is a uniform training sample
+        index.train(database[: get_train_size(index_type, n_vectors)])
+    for i in range(0, n_vectors, ADD_BATCH_SIZE):
+        index.add(database[i : i + ADD_BATCH_SIZE])
+    build_time = time.perf_counter() - start_time
+    set_search_params(index, overrides)
+
+    index_path = os.path.join(tmp_dir, "candidate.index")
+    faiss.write_index(index, index_path)
+    del index
+    result = {
+        "config": config,
+        "index_type": index_type,
+        "factory": get_factory_string(index_type, n_vectors, dim),
+        "search_params": {
+            **get_search_params(index_type, n_vectors, dim, target_latency_us),
+            **overrides,
+        },
+        "build_time": build_time,
+        "file_size_mb": os.path.getsize(index_path) / 1024**2,
+    }
+    result.update(measure_in_subprocess(index_path, queries, truth, k))
+    os.remove(index_path)
+    return result
+
+
+def benchmark_existing_index(index_path, queries, k=DEFAULT_SEARCH_K):
+    """
+    Measures an index file as it is, against exact search over its own vectors.
+
+    Args:
+        index_path (str): Path to the index file.
+        queries (numpy.ndarray): The (n, dim) query vectors.
+        k (int, optional): Number of neighbours searched.
+    """
+    index = faiss.read_index(index_path)
+    if index.d != queries.shape[1]:
+        raise ValueError(
+            f"'{index_path}' holds {index.d}-dimensional vectors, not {queries.shape[1]}."
+        )
+    vectors = index.reconstruct_n(0, index.ntotal)
+    del index
+    result = {
+        "config": os.path.basename(index_path),
+        "index_type": "existing",
+        "factory": None,
+        "search_params": {},
+        "build_time": None,
+        "file_size_mb": os.path.getsize(index_path) / 1024**2,
+    }
+    truth = get_exact_neighbors(vectors, queries, k)
+    result.update(measure_in_subprocess(index_path, queries, truth, k))
+    return result
+
+
+def format_table(results, k=DEFAULT_SEARCH_K):
+    columns = [
+        ("config", "{}", 24),
+        ("build_time", "{:.2f}", 10),
+        ("file_size_mb", "{:.1f}", 10),
+        ("memory_mb", "{:.1f}", 10),
+        ("latency_us", "{:.1f}", 10),
+        (f"recall@{k}", "{:.3f}", 10),
+    ]
+    titles = ["config", "build s", "file MB", "memory MB", "us/frame", f"recall@{k}"]
+    lines = [
+        "".join(
+            title.ljust(width) if i == 0 else title.rjust(width)
+            for i, (title, (_, _, width)) in enumerate(zip(titles, columns))
+        )
+    ]
+    for result in results:
+        cells = []
+        for i, (name, fmt, width) in enumerate(columns):
+            value = result.get(name)
+            text = "n/a" if value is None else fmt.format(value)
+            cells.append(text.ljust(width) if i == 0 else text.rjust(width))
+        lines.append("".join(cells))
+    return "\n".join(lines)
+
+
+def benchmark_indexes(
+    feature_dir=None,
+    index_path=None,
+    configs=None,
+    max_vectors=DEFAULT_MAX_VECTORS,
+    n_queries=DEFAULT_QUERIES,
+    synthetic_dim=768,
+    k=DEFAULT_SEARCH_K,
+    output_path=None,
+    seed=0,
+):
+    """
+    Compares index configurations on real or synthetic features, on the CPU.
+
+    For every candidate, the build time, file size, resident memory once loaded, search
+    latency per frame and recall@k against exact search are measured. The results are
+    printed as a table and, with `output_path`, written as JSON.
+
+    Args:
+        feature_dir (str, optional): Path to an experiment's `extracted` folder; synthetic
+            features are used without one.
+        index_path (str, optional): An existing index file to measure alongside.
+        configs (list, optional): Candidates, see `parse_config`; defaults to `DEFAULT_CONFIGS`.
+        max_vectors (int, optional): Largest number of database vectors.
+        n_queries (int, optional): Number of query vectors.
+        synthetic_dim (int, optional): Dimension of synthetic vectors.
+        k (int, optional): Number of neighbours searched.
+        output_path (str, optional): Path of the JSON report.
+        seed (int, optional): Seed of the vector draw.
+    """
+    database, queries = load_benchmark_vectors(
+        feature_dir, max_vectors, n_queries, synthetic_dim, seed
+    )
+    print(
+        f"Benchmarking on {len(database)} vectors of dimension {database.shape[1]} "
+        f"with {len(queries)} queries and {faiss.omp_get_max_threads()} threads..."
+    )
+    truth = get_exact_neighbors(database, queries, k)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for config in configs or DEFAULT_CONFIGS:
+            try:
+                results.append(
+                    benchmark_config(config, database, queries, truth, tmp_dir, k)
+                )
+            except Exception as error:
+                print(f"An error occurred benchmarking '{config}': {error}")
+    if index_path and os.path.isfile(index_path):
+        try:
+            results.append(benchmark_existing_index(index_path, queries, k))
+        except Exception as error:
+            print(f"An error occurred benchmarking '{index_path}': {error}")
+
+    print(format_table(results, k))
+    report = {
+        "source": feature_dir or "synthetic",
+        "vectors": len(database),
+        "dim": database.shape[1],
+        "queries": len(queries),
+        "k": k,
+        "threads": faiss.omp_get_max_threads(),
+        "results": results,
+    }
+    if output_path:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"Benchmark report saved to '{output_path}'.")
+    return report
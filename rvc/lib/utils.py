@@ -93,7 +93,7 @@ def format_title(title):
     return formatted_title
 
 
-def load_embedding(embedder_model, custom_embedder=None):
+def get_embedder_path(embedder_model, custom_embedder=None):
     embedder_root = os.path.join(now_dir, "rvc", "models", "embedders")
     embedding_list = {
         "contentvec": os.path.join(embedder_root, "contentvec"),
@@ -125,9 +125,11 @@ def load_embedding(embedder_model, custom_embedder=None):
     else:
         model_path = embedding_list[embedder_model]
         bin_file = os.path.join(model_path, "pytorch_model.bin")
+        safetensors_file = os.path.join(model_path, "model.safetensors")
         json_file = os.path.join(model_path, "config.json")
         os.makedirs(model_path, exist_ok=True)
-        if not os.path.exists(bin_file):
+        # folders converted with `convert_embedder` load from model.safetensors
+        if not os.path.exists(bin_file) and not os.path.exists(safetensors_file):
             url = online_embedders[embedder_model]
             print(f"Downloading {url} to {model_path}...")
             wget.download(url, out=bin_file)
@@ -135,6 +137,10 @@ def load_embedding(embedder_model, custom_embedder=None):
             url = config_files[embedder_model]
             print(f"Downloading {url} to {model_path}...")
             wget.download(url, out=json_file)
+    return model_path
+
 
+def load_embedding(embedder_model, custom_embedder=None):
+    model_path = get_embedder_path(embedder_model, custom_embedder)
     models = HubertModelWithFinalProj.from_pretrained(model_path)
     return models
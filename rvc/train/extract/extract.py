@@ -18,7 +18,7 @@ import rvc.lib.zluda
 
 from rvc.lib.utils import load_audio, load_embedding
 from rvc.train.extract.preparing_files import generate_config, generate_filelist
-from rvc.lib.predictors.RMVPE import RMVPE0Predictor
+from rvc.lib.predictors.registry import get_predictor_registry
 from rvc.configs.config import Config
 
 # Load config
@@ -50,17 +50,18 @@ class FeatureInput:
         audio = torch.from_numpy(x.astype(np.float32)).to(self.device)
         audio /= torch.quantile(torch.abs(audio), 0.999)
         audio = audio.unsqueeze(0)
-        pitch = torchcrepe.predict(
-            audio,
-            self.fs,
-            hop_length,
-            self.f0_min,
-            self.f0_max,
-            type,
-            batch_size=hop_length * 2,
-            device=audio.device,
-            pad=True,
-        )
+        with get_predictor_registry().crepe(type, self.device):
+            pitch = torchcrepe.predict(
+                audio,
+                self.fs,
+                hop_length,
+                self.f0_min,
+                self.f0_max,
+                type,
+                batch_size=hop_length * 2,
+                device=audio.device,
+                pad=True,
+            )
         source = pitch.squeeze(0).cpu().float().numpy()
         source[source < 0.001] = np.nan
         return np.nan_to_num(
@@ -103,10 +104,7 @@ class FeatureInput:
     def process_files(self, files, f0_method, hop_length, device, threads):
         self.device = device
         if f0_method == "rmvpe":
-            self.model_rmvpe = RMVPE0Predictor(
-                os.path.join("rvc", "models", "predictors", "rmvpe.pt"),
-                device=device,
-            )
+            self.model_rmvpe = get_predictor_registry().get_rmvpe(device)
 
         def worker(file_info):
             self.process_file(file_info, f0_method, hop_length)
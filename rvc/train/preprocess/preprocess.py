@@ -10,12 +10,12 @@ import json
 from distutils.util import strtobool
 import librosa
 import multiprocessing
-import noisereduce as nr
 import soxr
 
 now_directory = os.getcwd()
 sys.path.append(now_directory)
 
+from rvc.lib.denoise import reduce_noise
 from rvc.lib.utils import load_audio
 from rvc.train.preprocess.slicer import Slicer
 
@@ -35,7 +35,7 @@ RES_TYPE = "soxr_vhq"
 
 
 class PreProcess:
-    def __init__(self, sr: int, exp_dir: str):
+    def __init__(self, sr: int, exp_dir: str, denoise_workers: int = 1):
         self.slicer = Slicer(
             sr=sr,
             threshold=-42,
@@ -49,6 +49,7 @@ class PreProcess:
             N=5, Wn=HIGH_PASS_CUTOFF, btype="high", fs=self.sr
         )
         self.exp_dir = exp_dir
+        self.denoise_workers = denoise_workers
         self.device = "cpu"
         self.gt_wavs_dir = os.path.join(exp_dir, "sliced_audios")
         self.wavs16k_dir = os.path.join(exp_dir, "sliced_audios_16k")
@@ -146,8 +147,13 @@ class PreProcess:
                 audio = signal.lfilter(self.b_high, self.a_high, audio)
                 audio = self._normalize_audio(audio)
             if noise_reduction:
-                audio = nr.reduce_noise(
-                    y=audio, sr=self.sr, prop_decrease=reduction_strength
+                # non-stationary like noisereduce: the noise floor is tracked per bin
+                # over time, not estimated once from a noise profile
+                audio = reduce_noise(
+                    audio,
+                    self.sr,
+                    prop_decrease=reduction_strength,
+                    workers=self.denoise_workers,
                 )
             if cut_preprocess == "Skip":
                 # no cutting
@@ -261,7 +267,9 @@ def preprocess_training_set(
     overlap_len: float,
 ):
     start_time = time.time()
-    pp = PreProcess(sr, exp_dir)
+    # files already run in parallel, so each one denoises on its share of the cores
+    denoise_workers = max(1, (os.cpu_count() or 1) // num_processes)
+    pp = PreProcess(sr, exp_dir, denoise_workers)
     print(f"Starting preprocess with {num_processes} processes...")
 
     files = []
@@ -1,18 +1,29 @@
 import os
 import torch
 
+from rvc.lib.model_format import MODEL_EXTENSION, is_model_file, update_metadata
+
 
 def change_info(path, info, name):
     try:
-        ckpt = torch.load(path, map_location="cpu", weights_only=True)
-        ckpt["info"] = info
-
         if not name:
             name = os.path.splitext(os.path.basename(path))[0]
 
         target_dir = os.path.join("logs", name)
         os.makedirs(target_dir, exist_ok=True)
 
+        if is_model_file(path):
+            # only the header changes, the weights are copied as they are
+            update_metadata(
+                path,
+                {"info": info},
+                os.path.join(target_dir, f"{name}{MODEL_EXTENSION}"),
+            )
+            return "Success."
+
+        ckpt = torch.load(path, map_location="cpu", weights_only=True)
+        ckpt["info"] = info
+
         torch.save(ckpt, os.path.join(target_dir, f"{name}.pth"))
 
         return "Success."
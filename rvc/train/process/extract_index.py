@@ -1,13 +1,20 @@
 import os
 import sys
-import faiss
-import numpy as np
-from sklearn.cluster import MiniBatchKMeans
-from multiprocessing import cpu_count
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.train.process.index_builder import (
+    append_to_index,
+    build_index_from_features,
+    build_speaker_indexes,
+)
 
 # Parse command line arguments
 exp_dir = str(sys.argv[1])
 index_algorithm = str(sys.argv[2])
+index_type = str(sys.argv[3]) if len(sys.argv) > 3 else "Auto"
+index_per_speaker = sys.argv[4] == "True" if len(sys.argv) > 4 else False
 
 try:
     feature_dir = os.path.join(exp_dir, f"extracted")
@@ -17,51 +24,24 @@ try:
     index_filepath_added = os.path.join(exp_dir, index_filename_added)
 
     if os.path.exists(index_filepath_added):
-        pass
+        added = append_to_index(feature_dir, index_filepath_added)
+        if added is None:
+            print(
+                f"Index file '{index_filepath_added}' already exists; delete it to rebuild it."
+            )
+        elif added:
+            print(f"Added {added} vectors to index file '{index_filepath_added}'")
     else:
-        npys = []
-        listdir_res = sorted(os.listdir(feature_dir))
-
-        for name in listdir_res:
-            file_path = os.path.join(feature_dir, name)
-            phone = np.load(file_path)
-            npys.append(phone)
-
-        big_npy = np.concatenate(npys, axis=0)
-
-        big_npy_idx = np.arange(big_npy.shape[0])
-        np.random.shuffle(big_npy_idx)
-        big_npy = big_npy[big_npy_idx]
+        build_index_from_features(
+            feature_dir, index_filepath_added, index_algorithm, index_type
+        )
+        print(f"Saved index file '{index_filepath_added}'")
 
-        if big_npy.shape[0] > 2e5 and (
-            index_algorithm == "Auto" or index_algorithm == "KMeans"
+    if index_per_speaker:
+        for speaker_path in build_speaker_indexes(
+            feature_dir, index_filepath_added, index_algorithm, index_type
         ):
-            big_npy = (
-                MiniBatchKMeans(
-                    n_clusters=10000,
-                    verbose=True,
-                    batch_size=256 * cpu_count(),
-                    compute_labels=False,
-                    init="random",
-                )
-                .fit(big_npy)
-                .cluster_centers_
-            )
-
-        n_ivf = min(int(16 * np.sqrt(big_npy.shape[0])), big_npy.shape[0] // 39)
-
-        # index_added
-        index_added = faiss.index_factory(768, f"IVF{n_ivf},Flat")
-        index_ivf_added = faiss.extract_index_ivf(index_added)
-        index_ivf_added.nprobe = 1
-        index_added.train(big_npy)
-
-        batch_size_add = 8192
-        for i in range(0, big_npy.shape[0], batch_size_add):
-            index_added.add(big_npy[i : i + batch_size_add])
-
-        faiss.write_index(index_added, index_filepath_added)
-        print(f"Saved index file '{index_filepath_added}'")
+            print(f"Saved index file '{speaker_path}'")
 
 except Exception as error:
     print(f"An error occurred extracting the index: {error}")
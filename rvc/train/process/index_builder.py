@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import faiss
+import numpy as np
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+from rvc.lib.index_factory import (
+    DEFAULT_TARGET_LATENCY_US,
+    build_index,
+    create_index,
+    get_speaker_index_path,
+    get_train_size,
+)
+
+FEATURE_BATCH_SIZE = 65536  # vectors read from disk and added at once
+KMEANS_MIN_VECTORS = 200000  # datasets above this are reduced to cluster centers
+KMEANS_CLUSTERS = 10000
+KMEANS_POINTS_PER_CENTROID = 64
+KMEANS_ITERATIONS = 20
+MANIFEST_SUFFIX = ".files.json"
+REBUILD_GROWTH = 2.0  # growth since training after which a rebuild is suggested
+
+
+def get_feature_speaker(path):
+    # feature files are named <sid>_<file>_<slice>.npy, like the training file list
+    prefix = os.path.basename(path).split("_")[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+def get_feature_files(feature_dir, speaker=None):
+    """
+    Returns the sorted paths of the feature files in a folder.
+
+    Args:
+        feature_dir (str): Path to the folder of extracted features.
+        speaker (int, optional): Only return the files of this speaker ID.
+    """
+    return [
+        os.path.join(feature_dir, name)
+        for name in sorted(os.listdir(feature_dir))
+        if name.endswith(".npy")
+        and (speaker is None or get_feature_speaker(name) == speaker)
+    ]
+
+
+def get_feature_speakers(feature_dir):
+    """
+    Returns the sorted speaker IDs of the feature files in a folder.
+
+    Args:
+        feature_dir (str): Path to the folder of extracted features.
+    """
+    speakers = {get_feature_speaker(path) for path in get_feature_files(feature_dir)}
+    return sorted(speakers - {None})
+
+
+def get_feature_rows(paths):
+    """
+    Returns the number of vectors in each feature file and their dimension, reading only
+    the file headers.
+
+    Args:
+        paths (list): Paths to the feature files.
+    """
+    rows, dim = [], None
+    for path in paths:
+        shape = np.load(path, mmap_mode="r").shape
+        if dim is not None and shape[1] != dim:
+            raise ValueError(
+                f"'{path}' has {shape[1]}-dimensional features instead of {dim}."
+            )
+        rows.append(shape[0])
+        dim = shape[1]
+    return rows, dim
+
+
+def iter_feature_batches(paths, batch_size=FEATURE_BATCH_SIZE):
+    """
+    Yields the vectors of the feature files as float32 blocks of about `batch_size` rows.
+
+    Files are memory-mapped one at a time, so only one block is held in memory; small
+    files are gathered into one block and large ones split.
+
+    Args:
+        paths (list): Paths to the feature files.
+        batch_size (int, optional): Number of rows per block.
+    """
+    pending, count = [], 0
+    for path in paths:
+        features = np.load(path, mmap_mode="r")
+        for start in range(0, features.shape[0], batch_size):
+            pending.append(np.array(features[start : start + batch_size], np.float32))
+            count += pending[-1].shape[0]
+            if count >= batch_size:
+                yield np.concatenate(pending)
+                pending, count = [], 0
+        del features
+    if pending:
+        yield np.concatenate(pending)
+
+
+def sample_vectors(paths, rows, count, seed=0):
+    """
+    Returns `count` vectors drawn uniformly without replacement from the feature files.
+
+    Args:
+        paths (list): Paths to the feature files.
+        rows (list): Number of vectors in each file, see `get_feature_rows`.
+        count (int): Number of vectors to draw.
+        seed (int, optional): Seed of the draw.
+    """
+    offsets = np.concatenate(([0], np.cumsum(rows)))
+    count = min(count, int(offsets[-1]))
+    picks = np.sort(np.random.default_rng(seed).choice(offsets[-1], count, False))
+    bounds = np.searchsorted(picks, offsets)
+    sample = None
+    for i, path in enumerate(paths):
+        start, end = bounds[i], bounds[i + 1]
+        if start == end:
+            continue
+        features = np.load(path, mmap_mode="r")
+        if sample is None:
+            sample = np.empty((count, features.shape[1]), np.float32)
+        sample[start:end] = features[picks[start:end] - offsets[i]]
+        del features
+    return sample
+
+
+def cluster_vectors(sample, n_clusters=KMEANS_CLUSTERS, seed=0):
+    """
+    Returns the k-means cluster centers of a sample, computed by faiss on all CPU cores.
+
+    Args:
+        sample (numpy.ndarray): The (n, dim) float32 vectors to cluster.
+        n_clusters (int, optional): Number of clusters.
+        seed (int, optional): Seed of the initialization.
+    """
+    kmeans = faiss.Kmeans(
+        sample.shape[1],
+        n_clusters,
+        niter=KMEANS_ITERATIONS,
+        max_points_per_centroid=KMEANS_POINTS_PER_CENTROID,
+        seed=seed,
+        verbose=True,
+    )
+    kmeans.train(sample)
+    return kmeans.centroids
+
+
+def get_manifest_path(index_path):
+    return index_path + MANIFEST_SUFFIX
+
+
+def load_manifest(index_path):
+    manifest_path = get_manifest_path(index_path)
+    if not os.path.isfile(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r") as file:
+            return json.load(file)
+    except Exception as error:
+        print(f"An error occurred reading the index manifest: {error}")
+        return None
+
+
+def save_index(index, index_path, manifest):
+    """
+    Writes an index and the manifest of the feature files it holds, replacing both atomically.
+
+    Args:
+        index (faiss.Index): The index to write.
+        index_path (str): Path to the index file.
+        manifest (dict): Feature files added so far and how the index was built.
+    """
+    manifest_path = get_manifest_path(index_path)
+    tmp_paths = [f"{path}.{os.getpid()}.tmp" for path in (index_path, manifest_path)]
+    try:
+        faiss.write_index(index, tmp_paths[0])
+        with open(tmp_paths[1], "w") as file:
+            json.dump(manifest, file, indent=4)
+        os.replace(tmp_paths[0], index_path)
+        os.replace(tmp_paths[1], manifest_path)
+    finally:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def build_index_from_features(
+    feature_dir,
+    index_path,
+    index_algorithm="Auto",
+    index_type="Auto",
+    target_latency_us=DEFAULT_TARGET_LATENCY_US,
+    speaker=None,
+):
+    """
+    Builds the index of a folder of feature files without loading the dataset into memory.
+
+    With the "Auto" and "KMeans" algorithms, datasets above `KMEANS_MIN_VECTORS` are
+    reduced to `KMEANS_CLUSTERS` k-means centers computed on a sample. Otherwise the index
+    is trained on a sample sized for its lists and codebooks (see `get_train_size`) and
+    the vectors are added batch by batch. The manifest written next to the index lets
+    `append_to_index` add features extracted later.
+
+    Args:
+        feature_dir (str): Path to the folder of extracted features.
+        index_path (str): Path of the index file to write.
+        index_algorithm (str, optional): "Auto", "Faiss" or "KMeans".
+        index_type (str, optional): Index type, see `rvc.lib.index_factory.INDEX_TYPES`.
+        target_latency_us (float, optional): Search time per query vector in microseconds.
+        speaker (int, optional): Only index the features of this speaker ID.
+    """
+    paths = get_feature_files(feature_dir, speaker)
+    rows, dim = get_feature_rows(paths)
+    n_vectors = sum(rows)
+    if n_vectors == 0:
+        raise ValueError(f"No features found in '{feature_dir}'.")
+
+    reduced = n_vectors > KMEANS_MIN_VECTORS and index_algorithm in ("Auto", "KMeans")
+    if reduced:
+        sample = sample_vectors(
+            paths, rows, KMEANS_CLUSTERS * KMEANS_POINTS_PER_CENTROID
+        )
+        centers = cluster_vectors(sample)
+        del sample
+        index = build_index(centers, index_type, target_latency_us)
+        trained_vectors = KMEANS_CLUSTERS
+    else:
+        index, index_type = create_index(n_vectors, dim, index_type, target_latency_us)
+        if not index.is_trained:
+            index.train(
+                sample_vectors(paths, rows, get_train_size(index_type, n_vectors))
+            )
+        for batch in iter_feature_batches(paths):
+            index.add(batch)
+        trained_vectors = n_vectors
+
+    manifest = {
+        "files": {os.path.basename(p): n for p, n in zip(paths, rows)},
+        "reduced": reduced,
+        "trained_vectors": trained_vectors,
+    }
+    save_index(index, index_path, manifest)
+    return index_path
+
+
+def append_to_index(feature_dir, index_path, speaker=None):
+    """
+    Adds the feature files not yet in an index, batch by batch, without retraining it.
+
+    Returns the number of vectors added, or None if the index has no manifest and must
+    be rebuilt instead. Indexes reduced to k-means centers get the new vectors as they are.
+
+    Args:
+        feature_dir (str): Path to the folder of extracted features.
+        index_path (str): Path to the index file.
+        speaker (int, optional): Only add the features of this speaker ID.
+    """
+    manifest = load_manifest(index_path)
+    if manifest is None:
+        return None
+    paths = [
+        path
+        for path in get_feature_files(feature_dir, speaker)
+        if os.path.basename(path) not in manifest["files"]
+    ]
+    if not paths:
+        return 0
+    rows, dim = get_feature_rows(paths)
+    index = faiss.read_index(index_path)
+    if dim != index.d:
+        raise ValueError(
+            f"The new features are {dim}-dimensional but the index holds {index.d}-dimensional vectors."
+        )
+    for batch in iter_feature_batches(paths):
+        index.add(batch)
+    manifest["files"].update({os.path.basename(p): n for p, n in zip(paths, rows)})
+    save_index(index, index_path, manifest)
+    if index.ntotal > REBUILD_GROWTH * manifest["trained_vectors"]:
+        print(
+            f"The index has grown to {index.ntotal} vectors since it was trained; "
+            "rebuild it for the best search speed."
+        )
+    return sum(rows)
+
+
+def build_speaker_indexes(
+    feature_dir,
+    index_path,
+    index_algorithm="Auto",
+    index_type="Auto",
+    target_latency_us=DEFAULT_TARGET_LATENCY_US,
+):
+    """
+    Builds or extends one index per speaker next to the index of all speakers.
+
+    Inference searches only the partition of the requested speaker (see
+    `rvc.lib.index_factory.resolve_index_path`), so search cost and memory shrink roughly
+    by the number of speakers. Returns the paths of the partitions, none for datasets with
+    a single speaker.
+
+    Args:
+        feature_dir (str): Path to the folder of extracted features.
+        index_path (str): Path to the index of all speakers.
+        index_algorithm (str, optional): "Auto", "Faiss" or "KMeans".
+        index_type (str, optional): Index type, see `rvc.lib.index_factory.INDEX_TYPES`.
+        target_latency_us (float, optional): Search time per query vector in microseconds.
+    """
+    speakers = get_feature_speakers(feature_dir)
+    if len(speakers) < 2:
+        print("The dataset has a single speaker; no per-speaker indexes are needed.")
+        return []
+    speaker_paths = []
+    for speaker in speakers:
+        speaker_path = get_speaker_index_path(index_path, speaker)
+        if not os.path.exists(speaker_path):
+            build_index_from_features(
+                feature_dir,
+                speaker_path,
+                index_algorithm,
+                index_type,
+                target_latency_us,
+                speaker,
+            )
+        elif append_to_index(feature_dir, speaker_path, speaker) is None:
+            print(
+                f"Index file '{speaker_path}' already exists; delete it to rebuild it."
+            )
+        speaker_paths.append(speaker_path)
+    return speaker_paths
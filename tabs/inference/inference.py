@@ -4,7 +4,6 @@ import regex as re
 import shutil
 import datetime
 import json
-import torch
 
 from core import (
     run_infer_script,
@@ -14,6 +13,7 @@ from core import (
 from assets.i18n.i18n import I18nAuto
 
 from rvc.lib.utils import format_title
+from rvc.lib.model_format import MODEL_EXTENSION, load_checkpoint_metadata
 from tabs.settings.sections.restart import stop_infer
 
 i18n = I18nAuto()
@@ -57,7 +57,7 @@ names = [
     for root, _, files in os.walk(model_root_relative, topdown=False)
     for file in files
     if (
-        file.endswith((".pth", ".onnx"))
+        file.endswith((".pth", ".onnx", MODEL_EXTENSION))
         and not (file.startswith("G_") or file.startswith("D_"))
     )
 ]
@@ -180,7 +180,7 @@ def change_choices(model):
         for root, _, files in os.walk(model_root_relative, topdown=False)
         for file in files
         if (
-            file.endswith((".pth", ".onnx"))
+            file.endswith((".pth", ".onnx", MODEL_EXTENSION))
             and not (file.startswith("G_") or file.startswith("D_"))
         )
     ]
@@ -335,9 +335,7 @@ def refresh_embedders_folders():
 def get_speakers_id(model):
     if model:
         try:
-            model_data = torch.load(
-                os.path.join(now_dir, model), map_location="cpu", weights_only=True
-            )
+            model_data = load_checkpoint_metadata(os.path.join(now_dir, model))
             speakers_id = model_data.get("speakers_id")
             if speakers_id:
                 return list(range(speakers_id))
@@ -0,0 +1,86 @@
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from rvc.infer.analysis_cache import AnalysisCache
+
+MB = 1024**2
+ARRAY_BYTES = 8000  # 1000 float64 values
+FILE_BYTES = ARRAY_BYTES + 128  # with the .npy header
+
+
+def make_array(value):
+    return np.full(1000, value, dtype=np.float64)
+
+
+def test_memory_budget_evicts_least_recently_used(tmp_path):
+    cache = AnalysisCache(
+        str(tmp_path), max_memory_mb=2.5 * ARRAY_BYTES / MB, max_disk_mb=0
+    )
+    cache.put("a", make_array(1))
+    cache.put("b", make_array(2))
+    assert cache.get("a")[0] == 1  # "b" is now the least recently used
+    cache.put("c", make_array(3))
+    assert cache.get("b") is None
+    assert cache.get("a")[0] == 1 and cache.get("c")[0] == 3
+    assert cache.memory == 2 * ARRAY_BYTES
+    assert not os.listdir(tmp_path)
+
+
+def test_arrays_larger_than_the_budget_are_not_kept(tmp_path):
+    cache = AnalysisCache(
+        str(tmp_path), max_memory_mb=ARRAY_BYTES / 2 / MB, max_disk_mb=0
+    )
+    cache.put("a", make_array(1))
+    assert cache.get("a") is None
+    assert cache.memory == 0
+
+
+def test_disk_budget_evicts_least_recently_used(tmp_path):
+    cache = AnalysisCache(
+        str(tmp_path), max_memory_mb=0, max_disk_mb=2.5 * FILE_BYTES / MB
+    )
+    cache.put("a", make_array(1))
+    cache.put("b", make_array(2))
+    assert cache.get("a")[0] == 1
+    cache.put("c", make_array(3))
+    assert sorted(os.listdir(tmp_path)) == ["a.npy", "c.npy"]
+    assert cache.disk == 2 * FILE_BYTES
+    assert cache.get("b") is None
+
+    # a new process finds the entries on disk
+    reopened = AnalysisCache(str(tmp_path), max_memory_mb=1, max_disk_mb=1)
+    assert reopened.get("c")[0] == 3
+    assert reopened.get_stats()["disk_hits"] == 1
+    assert reopened.get("c")[0] == 3
+    assert reopened.get_stats()["hits"] == 1
+
+
+def test_smaller_budgets_evict_on_configure(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_memory_mb=1, max_disk_mb=1)
+    for key in "abc":
+        cache.put(key, make_array(ord(key)))
+    cache.configure(
+        max_memory_mb=1.5 * ARRAY_BYTES / MB, max_disk_mb=1.5 * FILE_BYTES / MB
+    )
+    assert list(cache.entries) == ["c"]
+    assert os.listdir(tmp_path) == ["c.npy"]
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = AnalysisCache(str(tmp_path), max_memory_mb=0, max_disk_mb=0)
+    assert not cache.enabled
+    cache.put("a", make_array(1))
+    assert cache.get("a") is None
+    assert not os.listdir(tmp_path)
+
+
+def test_keys_depend_on_samples_dtype_and_settings():
+    audio = np.arange(100, dtype=np.float32)
+    key = AnalysisCache.get_key("f0", audio, "rmvpe", 128)
+    assert key.startswith("f0-")
+    assert key == AnalysisCache.get_key("f0", audio.copy(), "rmvpe", 128)
+    assert key != AnalysisCache.get_key("f0", audio.astype(np.float64), "rmvpe", 128)
+    assert key != AnalysisCache.get_key("f0", audio, "rmvpe", 64)
+    assert key != AnalysisCache.get_key("feats", audio, "rmvpe", 128)
@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pipeline = pytest.importorskip("rvc.infer.pipeline")
+
+Autotune = pipeline.Autotune
+NOTE_NAMES = pipeline.NOTE_NAMES
+SCALES = pipeline.SCALES
+
+# C2 to C6, rounded like the table of `Pipeline`
+REF_FREQS = [round(440 * 2 ** ((note - 69) / 12), 2) for note in range(36, 85)]
+
+
+def loop_autotune(f0, strength):
+    # the per-frame snapping `autotune_f0` replaced
+    autotuned_f0 = np.zeros_like(f0)
+    for i, freq in enumerate(f0):
+        closest_note = min(REF_FREQS, key=lambda x: abs(x - freq))
+        autotuned_f0[i] = freq + (closest_note - freq) * strength
+    return autotuned_f0
+
+
+def get_pitch_classes(f0):
+    return np.round(69 + 12 * np.log2(f0 / 440.0)).astype(int) % 12
+
+
+@pytest.mark.parametrize("strength", [1.0, 0.5])
+def test_chromatic_snapping_matches_loop(strength):
+    generator = np.random.default_rng(0)
+    f0 = generator.uniform(40, 1500, 2000)  # includes frames outside the note range
+    f0 = np.concatenate([f0, REF_FREQS])
+    autotune = Autotune(REF_FREQS)
+    np.testing.assert_allclose(
+        autotune.autotune_f0(f0, strength), loop_autotune(f0, strength), rtol=1e-12
+    )
+
+
+def test_unvoiced_frames_are_left_alone():
+    f0 = np.array([0.0, 220.5, 0.0, 329.0], dtype=np.float32)
+    output = Autotune(REF_FREQS).autotune_f0(f0, 1.0)
+    assert output.dtype == np.float32
+    np.testing.assert_array_equal(output[[0, 2]], 0)
+    np.testing.assert_allclose(output[[1, 3]], [220.0, 329.63], rtol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "key, scale",
+    [("C", "major"), ("A", "minor"), ("Bb", "pentatonic_major"), ("f#", "blues")],
+)
+def test_scale_snapping_keeps_notes_of_the_key(key, scale):
+    generator = np.random.default_rng(1)
+    f0 = generator.uniform(70, 1000, 2000)
+    output = Autotune(REF_FREQS).autotune_f0(f0, 1.0, key=key, scale=scale)
+    key = pipeline.NOTE_ALIASES.get(key.capitalize(), key.capitalize())
+    root = NOTE_NAMES.index(key)
+    allowed = {(root + step) % 12 for step in SCALES[scale]}
+    assert set(get_pitch_classes(output)) <= allowed
+    # every frame lands on the closest allowed note
+    notes = np.array([freq for freq in REF_FREQS if get_pitch_classes(freq) in allowed])
+    closest = notes[np.abs(f0[:, None] - notes).argmin(axis=1)]
+    np.testing.assert_allclose(np.abs(output - f0), np.abs(closest - f0))
+
+
+def test_relative_keys_share_notes():
+    f0 = np.random.default_rng(2).uniform(70, 1000, 500)
+    autotune = Autotune(REF_FREQS)
+    np.testing.assert_array_equal(
+        autotune.autotune_f0(f0, 1.0, key="C", scale="major"),
+        autotune.autotune_f0(f0, 1.0, key="A", scale="minor"),
+    )
+
+
+def test_chromatic_scale_ignores_the_key():
+    f0 = np.random.default_rng(3).uniform(70, 1000, 500)
+    autotune = Autotune(REF_FREQS)
+    np.testing.assert_array_equal(
+        autotune.autotune_f0(f0, 1.0, key="D"), autotune.autotune_f0(f0, 1.0)
+    )
+
+
+def test_unknown_keys_and_scales_are_rejected():
+    autotune = Autotune(REF_FREQS)
+    with pytest.raises(ValueError):
+        autotune.autotune_f0(np.array([220.0]), 1.0, key="H", scale="major")
+    with pytest.raises(ValueError):
+        autotune.autotune_f0(np.array([220.0]), 1.0, key="C", scale="lydian")
@@ -0,0 +1,54 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("librosa")
+pytest.importorskip("scipy")
+noisereduce = pytest.importorskip("noisereduce")
+
+from rvc.lib.denoise import CHUNK_SIZE, MIN_CHUNK_SIZE, SpectralGate, reduce_noise
+
+SAMPLE_RATE = 16000
+
+
+def make_audio(length, seed=0):
+    # a tone that fades in and out over a noise floor, so the gate opens and closes
+    generator = np.random.default_rng(seed)
+    t = np.arange(length) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 0.2 * t)
+    audio = 0.3 * envelope * np.sin(2 * np.pi * 220 * t)
+    audio += 0.02 * generator.standard_normal(length)
+    return audio.astype(np.float32)
+
+
+def reference(audio, prop_decrease):
+    return noisereduce.reduce_noise(
+        y=audio,
+        sr=SAMPLE_RATE,
+        stationary=False,
+        prop_decrease=prop_decrease,
+        n_jobs=1,
+    )
+
+
+@pytest.mark.parametrize(
+    "length",
+    [CHUNK_SIZE + 20 * SAMPLE_RATE, CHUNK_SIZE, CHUNK_SIZE + 1, 2 * CHUNK_SIZE - 1],
+)
+@pytest.mark.parametrize("prop_decrease", [1.0, 0.7])
+def test_single_worker_matches_noisereduce(length, prop_decrease):
+    # one worker splits the signal like noisereduce does, so only rounding differs
+    audio = make_audio(length)
+    output = reduce_noise(audio, SAMPLE_RATE, prop_decrease, workers=1)
+    assert output.shape == audio.shape
+    assert output.dtype == audio.dtype
+    np.testing.assert_allclose(output, reference(audio, prop_decrease), atol=1e-3)
+
+
+@pytest.mark.parametrize("length", [3 * MIN_CHUNK_SIZE, 3 * MIN_CHUNK_SIZE + 7])
+def test_parallel_chunks_stay_close_to_noisereduce(length):
+    # smaller chunks see less context than noisereduce's, which only shows near their edges
+    audio = make_audio(length, seed=1)
+    expected = reference(audio, 1.0)
+    output = SpectralGate(SAMPLE_RATE, workers=4)(audio)
+    error = np.sqrt(np.mean(np.square(output - expected)))
+    assert error <= 0.05 * np.sqrt(np.mean(np.square(expected)))
@@ -0,0 +1,50 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("torchcrepe")
+pytest.importorskip("faiss")
+
+from rvc.infer.pipeline import embed_segments
+
+
+def make_embedder():
+    torch.manual_seed(0)
+    config = transformers.HubertConfig(
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        conv_dim=(16,) * 7,
+        num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=2,
+        feat_extract_norm="group",
+    )
+    return transformers.HubertModel(config).eval()
+
+
+def test_batched_features_match_single_segments():
+    model = make_embedder()
+    sources = [torch.randn(length) for length in (16000, 9600, 4000)]
+    with torch.no_grad():
+        batched = embed_segments(model, sources)
+        for source, output in zip(sources, batched):
+            single = model(source.view(1, -1))["last_hidden_state"]
+            assert output["last_hidden_state"].shape == single.shape
+            torch.testing.assert_close(
+                output["last_hidden_state"], single, atol=1e-4, rtol=1e-4
+            )
+
+
+def test_unsplittable_embedders_get_unpadded_groups():
+    calls = []
+
+    def model(source):
+        calls.append(tuple(source.shape))
+        return {"last_hidden_state": source.unsqueeze(-1)}
+
+    sources = [torch.randn(length) for length in (800, 400, 800)]
+    outputs = embed_segments(model, sources)
+    assert sorted(calls) == [(1, 400), (2, 800)]
+    for source, output in zip(sources, outputs):
+        torch.testing.assert_close(output["last_hidden_state"][0, :, 0], source)
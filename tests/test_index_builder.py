@@ -0,0 +1,115 @@
+import os
+import json
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+from rvc.lib.index_factory import get_speaker_index_path
+from rvc.train.process.index_builder import (
+    append_to_index,
+    build_index_from_features,
+    build_speaker_indexes,
+    get_manifest_path,
+    iter_feature_batches,
+    load_manifest,
+)
+
+DIM = 16
+
+
+def write_features(folder, name, n_vectors, dim=DIM, seed=0):
+    features = np.random.default_rng(seed).standard_normal((n_vectors, dim))
+    np.save(os.path.join(folder, name), features.astype(np.float32))
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    write_features(tmp_path, "0_a_0.npy", 40, seed=0)
+    write_features(tmp_path, "1_b_0.npy", 30, seed=1)
+    path = str(tmp_path / "added.index")
+    build_index_from_features(str(tmp_path), path, "Faiss", "Flat")
+    return path
+
+
+def test_build_writes_the_manifest(index_path):
+    manifest = load_manifest(index_path)
+    assert manifest == {
+        "files": {"0_a_0.npy": 40, "1_b_0.npy": 30},
+        "reduced": False,
+        "trained_vectors": 70,
+    }
+    assert faiss.read_index(index_path).ntotal == 70
+
+
+def test_append_adds_only_new_files(index_path, tmp_path):
+    write_features(tmp_path, "0_c_0.npy", 25, seed=2)
+    assert append_to_index(str(tmp_path), index_path) == 25
+    assert faiss.read_index(index_path).ntotal == 95
+    manifest = load_manifest(index_path)
+    assert manifest["files"]["0_c_0.npy"] == 25
+    assert manifest["trained_vectors"] == 70
+    # nothing left to add
+    assert append_to_index(str(tmp_path), index_path) == 0
+    assert faiss.read_index(index_path).ntotal == 95
+
+
+def test_append_only_adds_files_of_the_speaker(index_path, tmp_path):
+    write_features(tmp_path, "0_c_0.npy", 25, seed=2)
+    write_features(tmp_path, "1_d_0.npy", 10, seed=3)
+    assert append_to_index(str(tmp_path), index_path, speaker=1) == 10
+    assert "0_c_0.npy" not in load_manifest(index_path)["files"]
+
+
+@pytest.mark.parametrize("manifest", [None, "{not json"])
+def test_append_without_a_readable_manifest_asks_for_a_rebuild(
+    index_path, tmp_path, manifest
+):
+    if manifest is None:
+        os.remove(get_manifest_path(index_path))
+    else:
+        with open(get_manifest_path(index_path), "w") as file:
+            file.write(manifest)
+    write_features(tmp_path, "0_c_0.npy", 25, seed=2)
+    assert append_to_index(str(tmp_path), index_path) is None
+    assert faiss.read_index(index_path).ntotal == 70
+
+
+def test_append_rejects_other_dimensions(index_path, tmp_path):
+    write_features(tmp_path, "0_c_0.npy", 25, dim=DIM * 2)
+    with pytest.raises(ValueError):
+        append_to_index(str(tmp_path), index_path)
+    with open(get_manifest_path(index_path)) as file:
+        assert "0_c_0.npy" not in json.load(file)["files"]
+    assert faiss.read_index(index_path).ntotal == 70
+
+
+def test_feature_batches_keep_every_row_in_order(tmp_path):
+    for i, n_vectors in enumerate([5, 23, 1, 12]):
+        write_features(tmp_path, f"0_{i}_0.npy", n_vectors, seed=i)
+    paths = sorted(str(path) for path in tmp_path.iterdir())
+    batches = list(iter_feature_batches(paths, batch_size=10))
+    assert all(batch.shape[0] <= 2 * 10 for batch in batches)
+    np.testing.assert_array_equal(
+        np.concatenate(batches), np.concatenate([np.load(path) for path in paths])
+    )
+
+
+def test_speaker_indexes_hold_only_their_speaker(index_path, tmp_path):
+    speaker_paths = build_speaker_indexes(str(tmp_path), index_path, "Faiss", "Flat")
+    assert speaker_paths == [
+        get_speaker_index_path(index_path, 0),
+        get_speaker_index_path(index_path, 1),
+    ]
+    assert [faiss.read_index(path).ntotal for path in speaker_paths] == [40, 30]
+    # a second run appends the new files of each speaker
+    write_features(tmp_path, "1_c_0.npy", 5, seed=2)
+    build_speaker_indexes(str(tmp_path), index_path, "Faiss", "Flat")
+    assert [faiss.read_index(path).ntotal for path in speaker_paths] == [40, 35]
+
+
+def test_single_speaker_datasets_get_no_partitions(tmp_path):
+    write_features(tmp_path, "0_a_0.npy", 40)
+    index_path = str(tmp_path / "added.index")
+    assert build_speaker_indexes(str(tmp_path), index_path) == []
+    assert not os.path.exists(get_speaker_index_path(index_path, 0))
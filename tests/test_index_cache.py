@@ -0,0 +1,68 @@
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+from rvc.infer.index_cache import IndexCache
+
+DIM = 16
+
+
+def write_index(path, n_vectors, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n_vectors, DIM))
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors.astype(np.float32))
+    faiss.write_index(index, str(path))
+    return vectors.astype(np.float32)
+
+
+def test_hits_return_the_loaded_index(tmp_path):
+    vectors = write_index(tmp_path / "a.index", 50)
+    cache = IndexCache()
+    index, big_npy = cache.get(str(tmp_path / "a.index"))
+    assert isinstance(big_npy, np.memmap)
+    np.testing.assert_array_equal(big_npy, vectors)
+    assert os.path.isfile(cache.get_vectors_path(str(tmp_path / "a.index")))
+    assert cache.get(str(tmp_path / "a.index"))[0] is index
+    assert len(cache.entries) == 1
+
+
+def test_float16_vectors(tmp_path):
+    vectors = write_index(tmp_path / "a.index", 50)
+    cache = IndexCache(vectors_dtype="float16")
+    _, big_npy = cache.get(str(tmp_path / "a.index"))
+    assert big_npy.dtype == np.float16
+    np.testing.assert_allclose(big_npy, vectors, rtol=1e-3, atol=1e-3)
+
+
+def test_rebuilt_indexes_are_reloaded(tmp_path):
+    path = tmp_path / "a.index"
+    write_index(path, 50)
+    cache = IndexCache()
+    cache.get(str(path))
+    vectors = write_index(path, 60, seed=1)
+    # a rebuild within the timestamp resolution still changes the file size
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 10**9,) * 2)
+    index, big_npy = cache.get(str(path))
+    assert index.ntotal == 60
+    np.testing.assert_array_equal(big_npy, vectors)
+    assert len(cache.entries) == 1
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    paths = [str(tmp_path / f"{name}.index") for name in "abc"]
+    for i, path in enumerate(paths):
+        write_index(path, 50, seed=i)
+    size = os.path.getsize(paths[0])
+    cache = IndexCache(max_memory_mb=2.5 * size / 1024**2)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # "b" is now the least recently used
+    cache.get(paths[2])
+    assert [key[0] for key in cache.entries] == [
+        os.path.realpath(paths[0]),
+        os.path.realpath(paths[2]),
+    ]
+    cache.configure(max_memory_mb=0)
+    assert len(cache.entries) == 1 and cache.memory == size
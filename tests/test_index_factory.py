@@ -0,0 +1,93 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+from rvc.lib import index_factory
+from rvc.lib.index_factory import (
+    INDEX_TYPES,
+    build_index,
+    create_index,
+    get_factory_string,
+    get_nlist,
+    get_speaker_index_path,
+    resolve_index_path,
+    retrieve_weighted,
+)
+
+
+def make_vectors(n_vectors, dim, seed=0):
+    return np.random.default_rng(seed).standard_normal((n_vectors, dim), np.float32)
+
+
+@pytest.mark.parametrize(
+    "n_vectors, nlist",
+    [(1, 1), (38, 1), (39, 1), (78, 2), (100, 2), (10000, 256), (1000000, 16000)],
+)
+def test_nlist_keeps_enough_training_vectors(n_vectors, nlist):
+    assert get_nlist(n_vectors) == nlist
+    assert nlist == 1 or n_vectors // nlist >= 39
+
+
+def test_factory_strings_on_small_datasets():
+    assert get_factory_string("Flat", 10, 768) == "Flat"
+    assert get_factory_string("IVF-Flat", 10, 768) == "IVF1,Flat"
+    assert get_factory_string("IVF-PQ", 100, 768) == "IVF2,PQ96x8"
+    assert get_factory_string("OPQ-IVF-PQ", 100, 256) == "OPQ32,IVF2,PQ32x8"
+    assert get_factory_string("HNSW", 10, 768) == "HNSW32"
+    # the code count divides dimensions that are not a multiple of 8
+    assert get_factory_string("IVF-PQ", 100, 100) == "IVF2,PQ10x8"
+
+
+def test_factory_strings_on_large_datasets():
+    assert get_factory_string("IVF-Flat", 10000, 768) == "IVF256,Flat"
+    assert get_factory_string("IVF-PQ", 1000000, 768) == "IVF16000_HNSW32,PQ96x8"
+
+
+def test_unknown_index_types_are_rejected():
+    with pytest.raises(ValueError):
+        get_factory_string("LSH", 100, 768)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+@pytest.mark.parametrize("n_vectors", [1, 50, 300])
+def test_small_datasets_build_and_search(index_type, n_vectors):
+    vectors = make_vectors(n_vectors, 64)
+    index = build_index(vectors, index_type)
+    assert index.ntotal == n_vectors and index.d == 64
+    _, ix = index.search(vectors[:1], 1)
+    assert ix[0, 0] >= 0
+
+
+def test_pq_types_fall_back_below_the_codebook_size():
+    _, index_type = create_index(100, 64, "OPQ-IVF-PQ")
+    assert index_type == "IVF-Flat"
+    _, index_type = create_index(index_factory.PQ_CODEBOOK_SIZE, 64, "IVF-PQ")
+    assert index_type == "IVF-PQ"
+
+
+@pytest.mark.parametrize("block_size", [7, 4096])
+def test_retrieval_matches_the_gathered_average(block_size):
+    big_npy = make_vectors(500, 16)
+    vectors = make_vectors(40, 16, seed=1)
+    index = build_index(big_npy, "Flat")
+    # the (rows, k, dim) gather `retrieve_weighted` replaced
+    score, ix = index.search(vectors, 8)
+    weight = np.square(1 / score)
+    weight /= weight.sum(axis=1, keepdims=True)
+    expected = np.sum(big_npy[ix] * np.expand_dims(weight, axis=2), axis=1)
+    output = retrieve_weighted(index, big_npy, vectors, block_size=block_size)
+    np.testing.assert_allclose(output, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_speaker_partitions_are_used_when_built(tmp_path):
+    index_path = str(tmp_path / "added_model_v2.index")
+    speaker_path = get_speaker_index_path(index_path, 1)
+    assert speaker_path == str(tmp_path / "added_model_v2.sid1.index")
+    open(speaker_path, "wb").close()
+    assert resolve_index_path(index_path, 1) == speaker_path
+    assert resolve_index_path(index_path, "1") == speaker_path
+    # speakers without a partition, and no speaker, search the whole index
+    assert resolve_index_path(index_path, 0) == index_path
+    assert resolve_index_path(index_path, None) == index_path
+    assert resolve_index_path(index_path, -1) == index_path
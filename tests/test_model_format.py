@@ -0,0 +1,104 @@
+import os
+import pytest
+
+torch = pytest.importorskip("torch")
+safetensors = pytest.importorskip("safetensors")
+
+from safetensors import safe_open
+from rvc.lib.model_format import (
+    HEADER_RESERVE,
+    load_checkpoint,
+    load_checkpoint_metadata,
+    read_header,
+    save_model,
+    update_metadata,
+)
+
+METADATA = {
+    "config": [513, 32, 192, [3, 7, 11], [[1, 3, 5]]],
+    "f0": 1,
+    "version": "v2",
+    "info": "trained for 300 epochs",
+    "sr": "40k",
+}
+
+
+def make_tensors():
+    torch.manual_seed(0)
+    return {
+        "enc_p.weight": torch.randn(16, 8),
+        "dec.bias": torch.randn(5).half(),
+        "flow.scale": torch.randn(3, 2).bfloat16(),
+        "emb_g.weight": torch.randn(2, 4).double(),
+        "steps": torch.arange(7),
+        "mask": torch.tensor([True, False, True]),
+    }
+
+
+def assert_tensors_equal(loaded, tensors):
+    assert sorted(loaded) == sorted(tensors)
+    for name, tensor in tensors.items():
+        assert loaded[name].dtype == tensor.dtype
+        assert torch.equal(loaded[name], tensor)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / "model.safetensors")
+    save_model(path, make_tensors(), METADATA)
+    return path
+
+
+def test_saved_models_load_back(model_path):
+    checkpoint = load_checkpoint(model_path)
+    assert_tensors_equal(checkpoint.pop("weight"), make_tensors())
+    assert checkpoint == METADATA
+    assert load_checkpoint_metadata(model_path) == METADATA
+    # the file stays a plain safetensors file
+    with safe_open(model_path, framework="pt") as file:
+        assert file.metadata()["info"] == METADATA["info"]
+        assert torch.equal(file.get_tensor("steps"), torch.arange(7))
+
+
+def test_update_metadata_in_place(model_path):
+    size = os.path.getsize(model_path)
+    _, data_offset = read_header(model_path)
+    assert data_offset % 8 == 0 and data_offset > HEADER_RESERVE
+
+    update_metadata(model_path, {"info": "fine-tuned", "sr": None, "speakers": 2})
+
+    assert os.path.getsize(model_path) == size
+    assert read_header(model_path)[1] == data_offset
+    checkpoint = load_checkpoint(model_path)
+    assert_tensors_equal(checkpoint.pop("weight"), make_tensors())
+    assert checkpoint == {
+        **{key: value for key, value in METADATA.items() if key != "sr"},
+        "info": "fine-tuned",
+        "speakers": 2,
+    }
+
+
+def test_update_metadata_rewrites_a_full_header(model_path):
+    _, data_offset = read_header(model_path)
+    info = "x" * (2 * HEADER_RESERVE)
+
+    update_metadata(model_path, {"info": info})
+
+    assert read_header(model_path)[1] > data_offset
+    checkpoint = load_checkpoint(model_path)
+    assert_tensors_equal(checkpoint.pop("weight"), make_tensors())
+    assert checkpoint["info"] == info
+    # the grown header keeps spare space for the next edit
+    size = os.path.getsize(model_path)
+    update_metadata(model_path, {"version": "v1"})
+    assert os.path.getsize(model_path) == size
+    assert load_checkpoint_metadata(model_path)["version"] == "v1"
+
+
+def test_update_metadata_to_another_file(model_path, tmp_path):
+    output_path = str(tmp_path / "renamed.safetensors")
+    update_metadata(model_path, {"info": "copy"}, output_path)
+    assert load_checkpoint_metadata(model_path)["info"] == METADATA["info"]
+    checkpoint = load_checkpoint(output_path)
+    assert_tensors_equal(checkpoint.pop("weight"), make_tensors())
+    assert checkpoint["info"] == "copy"
@@ -0,0 +1,170 @@
+import pytest
+from types import SimpleNamespace
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("librosa")
+pytest.importorskip("soundfile")
+pytest.importorskip("wget")
+
+from rvc.infer.materialize import create_synthesizer, get_test_inputs
+from rvc.infer.onnx_backend import (
+    PARITY_ATOL,
+    OnnxEmbedder,
+    OnnxModule,
+    OnnxSynthesizer,
+    export_embedder,
+    export_synthesizer,
+)
+from rvc.lib.utils import HubertModelWithFinalProj
+
+# amplitudes of the vocoders' harmonic sources, the only randomness sampled in the graph
+SOURCE_AMPLITUDES = ("sine_amplitude", "noise_stddev", "sine_amp", "noise_std")
+
+
+def make_metadata(vocoder="HiFi-GAN", use_f0=1):
+    config = [
+        513,  # spec_channels
+        32,  # segment_size
+        16,  # inter_channels
+        16,  # hidden_channels
+        32,  # filter_channels
+        2,  # n_heads
+        1,  # n_layers
+        3,  # kernel_size
+        0,  # p_dropout
+        "1",  # resblock
+        [3],  # resblock_kernel_sizes
+        [[1, 3, 5]],  # resblock_dilation_sizes
+        [10, 8, 2, 2],  # upsample_rates
+        32,  # upsample_initial_channel
+        [20, 16, 4, 4],  # upsample_kernel_sizes
+        1,  # spk_embed_dim
+        16,  # gin_channels
+        32000,  # sr
+    ]
+    return {"config": config, "use_f0": use_f0, "version": "v1", "vocoder": vocoder}
+
+
+def make_synthesizer(metadata):
+    torch.manual_seed(0)
+    net_g = create_synthesizer(metadata)
+    del net_g.enc_q
+    for module in net_g.modules():
+        for name in SOURCE_AMPLITUDES:
+            if isinstance(getattr(module, name, None), (int, float)):
+                setattr(module, name, 0.0)
+    return net_g.prepare_for_inference().float().eval()
+
+
+@pytest.mark.parametrize("use_f0", [1, 0])
+def test_synthesizer_export_matches_eager(tmp_path, use_f0):
+    metadata = make_metadata(use_f0=use_f0)
+    net_g, _, onnx_path = export_voice(tmp_path, metadata)
+
+    # a different length than the export, to exercise the dynamic axes
+    phone, lengths, pitch, pitchf, sid = get_test_inputs(metadata, 48, seed=1)
+    noise = torch.randn(1, metadata["config"][2], 48)
+    with torch.no_grad():
+        reference = net_g.infer(phone, lengths, pitch, pitchf, sid, noise=noise)[0]
+    inputs = {"phone": phone, "phone_lengths": lengths, "sid": sid, "noise": noise}
+    if use_f0:
+        inputs.update({"pitch": pitch, "pitchf": pitchf})
+    (output,) = OnnxModule(onnx_path).run(**inputs)
+
+    assert output.shape == reference.shape
+    torch.testing.assert_close(output, reference, atol=PARITY_ATOL, rtol=0)
+
+
+def make_embedder(folder):
+    torch.manual_seed(0)
+    config = transformers.HubertConfig(
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        conv_dim=(16,) * 7,
+        num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=2,
+        classifier_proj_size=256,
+    )
+    model = HubertModelWithFinalProj(config).eval()
+    model.save_pretrained(folder)
+    return model, export_embedder("custom", str(folder), str(folder / "model.onnx"))
+
+
+def export_voice(folder, metadata):
+    net_g = make_synthesizer(metadata)
+    model_path = folder / "model.pth"
+    model_path.write_bytes(b"")
+    onnx_path = export_synthesizer(
+        str(model_path), str(folder / "model.onnx"), net_g=net_g, metadata=metadata
+    )
+    return net_g, str(model_path), onnx_path
+
+
+def test_embedder_export_matches_eager(tmp_path):
+    model, onnx_path = make_embedder(tmp_path)
+
+    source = torch.randn(1, 24000)
+    with torch.no_grad():
+        reference = model(source)["last_hidden_state"]
+        projected = model.final_proj(reference)
+    output = OnnxEmbedder(onnx_path)(source)
+
+    assert output["last_hidden_state"].shape == reference.shape
+    torch.testing.assert_close(
+        output["last_hidden_state"], reference, atol=PARITY_ATOL, rtol=0
+    )
+    torch.testing.assert_close(
+        output["final_proj"], projected, atol=PARITY_ATOL, rtol=0
+    )
+
+
+def test_synthesizer_rate_keeps_the_eager_length(tmp_path):
+    metadata = make_metadata()
+    net_g, _, onnx_path = export_voice(tmp_path, metadata)
+    phone, lengths, pitch, pitchf, sid = get_test_inputs(metadata, 60)
+    rate = torch.tensor([0.3])
+    with torch.no_grad():
+        reference = net_g.infer(phone, lengths, pitch, pitchf, sid, rate)[0]
+    output = OnnxSynthesizer(onnx_path).infer(phone, lengths, pitch, pitchf, sid, rate)
+    assert output[0].shape == reference.shape
+
+
+class StubConverter:
+    def __init__(self, net_g, hubert_model, metadata):
+        self.net_g = net_g
+        self.hubert_model = hubert_model
+        self.last_embedder_model = "contentvec"
+        self.use_f0 = metadata["use_f0"]
+        self.version = metadata["version"]
+        self.tgt_sr = metadata["config"][-1]
+        self.vc = SimpleNamespace(device="cpu", window=160, sample_rate=16000)
+
+    def get_vc(self, model_path, sid):
+        pass
+
+
+def test_streaming_runs_on_onnx_backend(tmp_path):
+    streaming = pytest.importorskip("rvc.infer.streaming")
+    metadata = make_metadata(use_f0=0)
+    (tmp_path / "embedder").mkdir()
+    _, embedder_path = make_embedder(tmp_path / "embedder")
+    _, model_path, onnx_path = export_voice(tmp_path, metadata)
+    converter = StubConverter(
+        OnnxSynthesizer(onnx_path), OnnxEmbedder(embedder_path), metadata
+    )
+    stream = streaming.StreamingVoiceConverter(
+        model_path, extra_time=0.5, voice_converter=converter
+    )
+
+    generator = torch.Generator().manual_seed(0)
+    for _ in range(3):
+        block = 0.1 * torch.randn(stream.block_size, generator=generator)
+        output = stream.push(block.numpy())
+        assert output.shape == (stream.block_frames * stream.upp,)
+        assert np.isfinite(output).all()
@@ -0,0 +1,121 @@
+import os
+
+from rvc.infer.output_cache import OutputCache
+
+MB = 1024**2
+OUTPUT_BYTES = 1000
+
+
+def make_job(folder, name="song", **settings):
+    job = {
+        "audio_input_path": str(folder / f"{name}.wav"),
+        "audio_output_path": str(folder / "out" / f"{name}_output.wav"),
+        "model_path": str(folder / "model.pth"),
+        "index_path": "",
+        "index_rate": 0.75,
+        "f0_file": None,
+        "embedder_model": "contentvec",
+        "embedder_model_custom": None,
+        "export_format": "FLAC",
+        "pitch": 0,
+        "protect": 0.5,
+        "batch_size": 1,
+        "output_cache": True,
+        "kwargs": {},
+    }
+    job.update(settings)
+    return job
+
+
+def write_inputs(folder, names=("song",)):
+    (folder / "model.pth").write_bytes(b"model")
+    for name in names:
+        (folder / f"{name}.wav").write_bytes(name.encode("utf-8"))
+
+
+def write_output(job, content=b"x"):
+    path = OutputCache.get_output_paths(job)[0]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content * OUTPUT_BYTES)
+    return path
+
+
+def test_keys_follow_contents_and_settings(tmp_path):
+    write_inputs(tmp_path, ("song", "copy"))
+    cache = OutputCache(str(tmp_path / "cache"))
+    key = cache.get_key(make_job(tmp_path))
+    # same contents under another name, and settings that do not change the output
+    (tmp_path / "copy.wav").write_bytes(b"song")
+    assert cache.get_key(make_job(tmp_path, "copy")) == key
+    assert cache.get_key(make_job(tmp_path, batch_size=8, pitch=0.0)) == key
+    assert cache.get_key(make_job(tmp_path, kwargs={"num_workers": 4})) == key
+    # settings and contents that do
+    assert cache.get_key(make_job(tmp_path, pitch=2)) != key
+    assert cache.get_key(make_job(tmp_path, kwargs={"reverb": True})) != key
+    (tmp_path / "model.pth").write_bytes(b"other model")
+    assert cache.get_key(make_job(tmp_path)) != key
+    assert cache.get_key(make_job(tmp_path, "missing")) is None
+
+
+def test_index_only_counts_when_used(tmp_path):
+    write_inputs(tmp_path)
+    # like the pipeline, the key reads the "added" index of a "trained" path
+    (tmp_path / "added.index").write_bytes(b"index")
+    cache = OutputCache(str(tmp_path / "cache"))
+    index_path = str(tmp_path / "trained.index")
+    unused = make_job(tmp_path, index_rate=0, index_path=index_path)
+    assert cache.get_key(unused) == cache.get_key(make_job(tmp_path, index_rate=0))
+    used = make_job(tmp_path, index_path=index_path)
+    assert cache.get_key(used) != cache.get_key(make_job(tmp_path))
+
+
+def test_store_and_restore(tmp_path):
+    write_inputs(tmp_path)
+    cache = OutputCache(str(tmp_path / "cache"))
+    job = make_job(tmp_path)
+    key = cache.get_key(job)
+    assert cache.restore(key, job) is None
+
+    output_path = write_output(job, b"a")
+    cache.store(key, job)
+    os.remove(output_path)
+    assert cache.restore(key, job) == output_path
+    with open(output_path, "rb") as file:
+        assert file.read() == b"a" * OUTPUT_BYTES
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    write_inputs(tmp_path, ("a", "b", "c"))
+    cache = OutputCache(str(tmp_path / "cache"), max_disk_mb=2.5 * OUTPUT_BYTES / MB)
+    jobs = {name: make_job(tmp_path, name) for name in "abc"}
+    keys = {name: cache.get_key(job) for name, job in jobs.items()}
+    for age, name in enumerate("ab"):
+        write_output(jobs[name])
+        cache.store(keys[name], jobs[name])
+        # distinct modification times, "a" being the oldest
+        entry_path = cache.get_entry_paths(keys[name], jobs[name])[0]
+        os.utime(entry_path, ns=(age * 10**9, age * 10**9))
+
+    assert cache.restore(keys["a"], jobs["a"])  # "b" is now the least recently used
+    write_output(jobs["c"])
+    cache.store(keys["c"], jobs["c"])
+
+    assert cache.restore(keys["b"], jobs["b"]) is None
+    assert cache.restore(keys["a"], jobs["a"])
+    assert cache.restore(keys["c"], jobs["c"])
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_smaller_quota_evicts_on_configure(tmp_path):
+    write_inputs(tmp_path)
+    cache = OutputCache(str(tmp_path / "cache"))
+    job = make_job(tmp_path)
+    key = cache.get_key(job)
+    write_output(job)
+    cache.store(key, job)
+    cache.configure(max_disk_mb=OUTPUT_BYTES / 2 / MB)
+    assert cache.restore(key, job) is None
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,42 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sf = pytest.importorskip("soundfile")
+postprocess = pytest.importorskip("rvc.infer.postprocess")
+
+SAMPLE_RATE = 40000
+EFFECTS = [
+    {"reverb": True},
+    {"delay": True, "delay_seconds": 0.1, "delay_feedback": 0.3},
+    {"chorus": True},
+    {"compressor": True, "compressor_threshold": -20, "compressor_ratio": 4},
+    {"pitch_shift": True, "pitch_shift_semitones": 3},
+    {"reverb": True, "pitch_shift": True, "pitch_shift_semitones": -2},
+]
+
+
+def get_test_audio(seconds=3.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t)
+    return (tone + 0.05 * rng.standard_normal(t.shape[0])).astype(np.float32)
+
+
+@pytest.mark.parametrize("kwargs", EFFECTS)
+def test_block_output_matches_single_call(kwargs, tmp_path):
+    audio = get_test_audio()
+    expected = postprocess.build_effect_chain(**kwargs)(audio, SAMPLE_RATE)
+    expected = np.clip(expected.reshape(-1), -1, 1)
+
+    output_path = str(tmp_path / "output.wav")
+    board = postprocess.build_effect_chain(**kwargs)
+    with postprocess.PostProcessor(
+        output_path, SAMPLE_RATE, "WAV", board, block_seconds=0.25
+    ) as post:
+        post.run(audio)
+    output, sample_rate = sf.read(output_path, dtype="float32")
+
+    assert sample_rate == SAMPLE_RATE
+    assert output.shape == expected.shape
+    # the WAV file holds 16-bit samples
+    np.testing.assert_allclose(output, expected, atol=2e-3)
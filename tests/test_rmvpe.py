@@ -0,0 +1,115 @@
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("librosa")
+
+from rvc.lib.predictors.RMVPE import (
+    CHUNK_OVERLAP_FRAMES,
+    HOP_LENGTH,
+    N_CLASS,
+    N_MELS,
+    RMVPE0Predictor,
+)
+from rvc.lib.predictors.registry import RMVPE_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FrameModel(torch.nn.Module):
+    # maps each mel frame to a salience on its own, so chunking cannot change the output
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.linear = torch.nn.Linear(N_MELS, N_CLASS)
+
+    def forward(self, mel):
+        return torch.sigmoid(self.linear(mel.transpose(1, 2)))
+
+
+def loop_local_average_cents(cents_mapping, salience, thred):
+    # the per-frame decoder `to_local_average_cents` replaced
+    center = np.argmax(salience, axis=1)
+    salience = np.pad(salience, ((0, 0), (4, 4)))
+    center += 4
+    todo_salience = []
+    todo_cents_mapping = []
+    starts = center - 4
+    ends = center + 5
+    for idx in range(salience.shape[0]):
+        todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
+        todo_cents_mapping.append(cents_mapping[starts[idx] : ends[idx]])
+    todo_salience = np.array(todo_salience)
+    todo_cents_mapping = np.array(todo_cents_mapping)
+    product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
+    weight_sum = np.sum(todo_salience, 1)
+    devided = product_sum / weight_sum
+    maxx = np.max(salience, axis=1)
+    devided[maxx <= thred] = 0
+    return devided
+
+
+@pytest.fixture
+def predictor():
+    return RMVPE0Predictor(None, device="cpu", model=FrameModel())
+
+
+def test_decoder_matches_loop(predictor):
+    generator = np.random.default_rng(0)
+    salience = generator.random((200, N_CLASS)).astype(np.float32)
+    salience[:20] = 0  # silent frames
+    salience[20:40] *= 0.01  # below the threshold
+    salience[40, 0] = 2  # peaks on the first and last bins
+    salience[41, -1] = 2
+    salience[42, :3] = [2, 0, 0]
+    salience[43, -3:] = [0, 0, 2]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for thred in (0.03, 0.05):
+            np.testing.assert_array_equal(
+                predictor.to_local_average_cents(salience, thred=thred),
+                loop_local_average_cents(predictor.cents_mapping, salience, thred),
+            )
+    assert not predictor.to_local_average_cents(salience[:20]).any()
+
+
+@pytest.mark.parametrize(
+    "n_frames",
+    [
+        300 + CHUNK_OVERLAP_FRAMES,  # longest input run in one pass
+        300 + CHUNK_OVERLAP_FRAMES + 1,
+        900,  # ends on a chunk boundary
+        901,
+        1234,
+    ],
+)
+def test_chunked_inference_matches_single_pass(predictor, n_frames):
+    generator = np.random.default_rng(n_frames)
+    audio = 0.1 * generator.standard_normal((n_frames - 1) * HOP_LENGTH + 37)
+    audio = audio.astype(np.float32)
+    single = predictor.infer_from_audio(audio, thred=0.03)
+    chunked = predictor.infer_from_audio(audio, thred=0.03, chunk_frames=300)
+    assert chunked.shape == single.shape == (n_frames,)
+    np.testing.assert_allclose(chunked, single, rtol=1e-4, atol=1e-3)
+
+
+@pytest.mark.skipif(
+    not os.path.isfile(os.path.join(ROOT, RMVPE_PATH)),
+    reason="the RMVPE weights are not downloaded",
+)
+def test_chunked_inference_matches_single_pass_with_weights():
+    predictor = RMVPE0Predictor(os.path.join(ROOT, RMVPE_PATH), device="cpu")
+    # a gliding harmonic tone with pauses, so frames are voiced and unvoiced
+    t = np.arange(20 * 16000) / 16000
+    f0 = 150 + 50 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / 16000
+    audio = sum(np.sin(k * phase) / k for k in range(1, 6))
+    audio *= np.sin(2 * np.pi * 0.2 * t) > -0.5
+    audio = (0.3 * audio).astype(np.float32)
+
+    single = predictor.infer_from_audio(audio, thred=0.03)
+    chunked = predictor.infer_from_audio(audio, thred=0.03, chunk_frames=500)
+    voiced = (single > 0) & (chunked > 0)
+    assert np.mean((single > 0) == (chunked > 0)) >= 0.99
+    cents = 1200 * np.abs(np.log2(chunked[voiced] / single[voiced]))
+    assert np.percentile(cents, 99) <= 10
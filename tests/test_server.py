@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import queue
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+server_module = pytest.importorskip("rvc.infer.server")
+VoiceConverter = server_module.VoiceConverter
+
+
+class StubConverter:
+    def __init__(self):
+        self.calls = []
+        self.model_pool = SimpleNamespace(get_stats=lambda: {})
+
+    def convert_jobs_cached(self, jobs, batch_size=1, staged=True):
+        self.calls.append((jobs, staged))
+        results = []
+        for job in jobs:
+            output_path = VoiceConverter.get_output_path(job)
+            open(output_path, "wb").close()
+            results.append(output_path)
+        return results
+
+
+@pytest.fixture
+def server():
+    converter = StubConverter()
+    server = server_module.InferenceServer(port=0, converter=converter)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+def post(server, path, body):
+    host, port = server.address[:2]
+    request = urllib.request.Request(
+        f"http://{host}:{port}{path}",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_convert_passes_options_to_converter(server, tmp_path):
+    status, body = post(
+        server,
+        "/convert",
+        {
+            "audio_input_path": str(tmp_path / "input.wav"),
+            "audio_output_path": str(tmp_path / "output.wav"),
+            "model_path": "model.pth",
+            "export_format": "FLAC",
+            "output_cache": True,
+            "progressive": True,
+        },
+    )
+    assert status == 200
+    assert body["output_path"] == str(tmp_path / "output.flac")
+    [(jobs, staged)] = server.converter.calls
+    assert not staged
+    assert jobs[0]["output_cache"] and jobs[0]["progressive"]
+
+
+def test_convert_rejects_invalid_requests(server, tmp_path):
+    request = {
+        "audio_input_path": str(tmp_path / "input.wav"),
+        "audio_output_path": str(tmp_path / "output.wav"),
+    }
+    assert post(server, "/convert", request)[0] == 400
+    request["model_path"] = "model.pth"
+    assert post(server, "/convert", {**request, "progressive": "yes"})[0] == 400
+    assert not server.converter.calls
+
+
+def test_batch_skips_files_converted_to_export_format(server, tmp_path):
+    input_folder, output_folder = tmp_path / "input", tmp_path / "output"
+    input_folder.mkdir()
+    output_folder.mkdir()
+    for name in ("a.wav", "b.mp3", "notes.txt"):
+        (input_folder / name).touch()
+    (output_folder / "b_output.mp3").touch()
+    status, body = post(
+        server,
+        "/batch_convert",
+        {
+            "input_folder": str(input_folder),
+            "output_folder": str(output_folder),
+            "model_path": "model.pth",
+            "export_format": "MP3",
+        },
+    )
+    assert status == 200
+    assert [output["output_path"] for output in body["outputs"]] == [
+        os.path.join(str(output_folder), "a_output.mp3")
+    ]
+
+
+def test_batch_reports_missing_input_folder(server, tmp_path):
+    status, body = post(
+        server,
+        "/batch_convert",
+        {
+            "input_folder": str(tmp_path / "missing"),
+            "output_folder": str(tmp_path),
+            "model_path": "model.pth",
+        },
+    )
+    assert status == 400
+    assert "does not exist" in body["error"]
+
+
+class BlockingConverter(StubConverter):
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def convert_jobs_cached(self, jobs, batch_size=1, staged=True):
+        self.started.set()
+        self.release.wait(10)
+        return super().convert_jobs_cached(jobs, batch_size, staged)
+
+
+def test_shutdown_fails_waiting_jobs(tmp_path):
+    converter = BlockingConverter()
+    server = server_module.InferenceServer(port=0, converter=converter)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(name, model_path):
+        return {
+            "audio_input_path": str(tmp_path / f"{name}.wav"),
+            "audio_output_path": str(tmp_path / f"{name}_output.wav"),
+            "model_path": model_path,
+        }
+
+    running = server.submit([request("a", "a.pth")])
+    assert converter.started.wait(10)
+    # jobs of other models cannot join the running batch and wait behind it
+    waiting = server.submit([request("b", "b.pth"), request("c", "c.pth")])
+    stopper = threading.Thread(target=server.shutdown)
+    stopper.start()
+    while not server.closed:
+        time.sleep(0.01)
+    with pytest.raises(queue.Full):
+        server.submit([request("d", "d.pth")])
+    converter.release.set()
+    stopper.join(10)
+    thread.join(10)
+
+    for job in running + waiting:
+        assert job.done.wait(10)
+    assert running[0].error is None
+    assert all(job.error == "The server was shut down." for job in waiting)
+    assert len(converter.calls) == 1
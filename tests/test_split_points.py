@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pipeline = pytest.importorskip("rvc.infer.pipeline")
+
+# 16 kHz sizes of a shortened config: 0.1 s query, 1 s centers, 2 s maximum
+SIZES = SimpleNamespace(window=160, t_query=1600, t_center=16000, t_max=32000)
+
+
+def loop_split_points(audio, window, t_query, t_center, t_max):
+    # the per-window search `get_split_points` replaced
+    audio_pad = np.pad(audio, (window // 2, window // 2), mode="reflect")
+    opt_ts = []
+    if audio_pad.shape[0] > t_max:
+        audio_sum = np.zeros_like(audio)
+        for i in range(window):
+            audio_sum += audio_pad[i : i - window]
+        for t in range(t_center, audio.shape[0], t_center):
+            query = np.abs(audio_sum[t - t_query : t + t_query])
+            opt_ts.append(t - t_query + np.where(query == query.min())[0][0])
+    return opt_ts
+
+
+def make_audio(length, seed):
+    generator = np.random.default_rng(seed)
+    t = np.arange(length) / 16000
+    envelope = 0.1 + np.abs(np.sin(2 * np.pi * 0.7 * t))
+    audio = envelope * generator.standard_normal(length)
+    audio[length // 3 : length // 3 + 4000] = 0  # silence gives tied minima
+    return audio
+
+
+@pytest.mark.parametrize(
+    "length",
+    [
+        32000 - 160,  # longest input that is not split
+        32000 - 159,
+        100000,
+        4 * 16000 + 1,  # the last query window reaches far past the end
+        4 * 16000 + 1000,
+        123457,
+    ],
+)
+def test_split_points_match_loop(length):
+    audio = make_audio(length, length)
+    points = pipeline.Pipeline.get_split_points(SIZES, audio)
+    assert points == loop_split_points(audio, **vars(SIZES))